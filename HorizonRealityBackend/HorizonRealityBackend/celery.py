@@ -15,6 +15,26 @@ app.conf.beat_schedule = {
     'send-weekly-property-newsletter': {
         'task': 'services.tasks.send_weekly_property_newsletter',
         'schedule': crontab(hour=11, minute=0, day_of_week='1,4'),  # Every Monday and Thursday at 11 AM
+    },
+    'rebuild-similar-properties': {
+        'task': 'services.tasks.rebuild_similar_properties_task',
+        'schedule': crontab(hour=3, minute=0),  # Every night at 3 AM
+    },
+    'match-saved-searches': {
+        'task': 'services.tasks.match_saved_searches_task',
+        'schedule': crontab(minute='*/15'),  # Catches listings whose matching could not be enqueued
+    },
+    'send-saved-search-alerts': {
+        'task': 'services.tasks.send_saved_search_alerts_task',
+        'schedule': crontab(hour='8-20', minute=30),  # Hourly during the day
+    },
+    'bake-pages': {
+        'task': 'services.tasks.bake_pages_task',
+        'schedule': crontab(hour=4, minute=0),  # Every night at 4 AM, after the similar properties rebuild
+    },
+    'clean-chunked-uploads': {
+        'task': 'services.tasks.clean_chunked_uploads_task',
+        'schedule': crontab(minute=45),  # Hourly
     }
 }
 
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "home.baking.BakedPageMiddleware",
+    "home.page_cache.PageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -95,6 +97,27 @@ DATABASES = {
         }
     }
 }
+# Cache
+# Listing result caches and their generation counters must be shared by every worker,
+# so production sets CACHE_URL to a Redis database (e.g. redis://127.0.0.1:6379/1).
+# Without it each process keeps its own local-memory cache, which is fine for development.
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "KEY_PREFIX": "horizon",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "horizon",
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -162,6 +185,16 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 MEDIA_URL = '/media/' 
 MEDIA_ROOT = BASE_DIR / "images" 
+# Uploads are stored once per distinct content, under its SHA-256 (services.storage)
+STORAGES = {
+    "default": {"BACKEND": "services.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# Serve MEDIA_URL through services.media (byte ranges, ETags) rather than only in DEBUG
+SERVE_MEDIA = config("SERVE_MEDIA", default=True, cast=bool)
+# nginx `internal` location aliased to MEDIA_ROOT; when set, services.media hands transfers to nginx
+MEDIA_X_ACCEL_REDIRECT = config("MEDIA_X_ACCEL_REDIRECT", default="")
+MEDIA_CACHE_MAX_AGE = config("MEDIA_CACHE_MAX_AGE", default=60 * 60 * 24, cast=int)
 
 #celery settings
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://127.0.0.1:6379")
@@ -173,6 +206,21 @@ CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="django-db")
 #celery beat
 CELERY_BEAT_SCHEDULER = config("CELERY_BEAT_SCHEDULER", default="django_celery_beat.schedulers:DatabaseScheduler")
 BASE_URL = config("BASE_URL", default="http://127.0.0.1:8000")
+# Serve listing filters from the in-process bitmap index (services.bitmaps) instead of SQL
+LISTING_BITMAP_INDEX = config("LISTING_BITMAP_INDEX", default=False, cast=bool)
+# Bearer token a metrics scraper sends to /metrics/site-content/; staff sessions need none
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+# Serve the public pages from the full-page cache (home.page_cache). Purges must reach every
+# worker, so it is only on by default with a shared CACHE_URL.
+PAGE_CACHE = config("PAGE_CACHE", default=bool(CACHE_URL), cast=bool)
+# Serve the content pages from files written by `manage.py bake_pages` (home.baking)
+BAKED_PAGES = config("BAKED_PAGES", default=False, cast=bool)
+BAKED_PAGES_DIR = config("BAKED_PAGES_DIR", default=str(BASE_DIR / "baked"))
+BAKE_PROPERTY_PAGES = config("BAKE_PROPERTY_PAGES", default=False, cast=bool)
+# Widths of the responsive image copies written by services.images
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+# Where resumable video uploads are assembled before a sell form claims them (services.uploads)
+CHUNKED_UPLOAD_DIR = config("CHUNKED_UPLOAD_DIR", default=str(BASE_DIR / "chunked_uploads"))
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config("EMAIL_HOST")
 EMAIL_PORT = config("EMAIL_PORT", cast=int)
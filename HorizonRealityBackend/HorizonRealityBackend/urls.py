@@ -18,7 +18,9 @@ Including another URLconf
 from django.contrib import admin
 from django.conf import settings
 from django.conf.urls.static import static
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
+from services.media import serve_media
 from services import views as services_views
 admin.site.site_header = "Admin Dashboard"
 admin.site.site_title = "Horizon Reality Admin Portal"
@@ -32,6 +34,15 @@ urlpatterns = [
     path('favorite/<int:property_id>/', services_views.toggle_favorite, name='toggle_favorite'),
     path('favorite-status/<int:property_id>/', services_views.get_favorite_status, name='get_favorite_status'),
     path('my-favorites/', services_views.my_favorites, name='my_favorites'),
+    path('session-state/', services_views.session_state, name='session_state'),
+    path('uploads/', services_views.start_chunked_upload, name='start_chunked_upload'),
+    path('uploads/<uuid:upload_id>/', services_views.chunked_upload, name='chunked_upload'),
+    path('saved-searches/', services_views.my_saved_searches, name='my_saved_searches'),
+    path('saved-searches/save/', services_views.save_search, name='save_search'),
+    path('saved-searches/<int:search_id>/delete/', services_views.delete_saved_search, name='delete_saved_search'),
+    path('api/v1/listings/', services_views.listings_api, name='listings_api'),
+    path('properties/facets/', services_views.property_facets, name='property_facets'),
+    path('properties/feed/', services_views.property_list_feed, name='property_list_feed'),
     path('properties/', services_views.property_list_view, name='property_list'),
     path('property-calc/', services_views.property_calculator_view, name='property_calc'),
     path('property/', include(('services.urls', 'property'), namespace='property')),
@@ -42,4 +53,7 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA and settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
\ No newline at end of file
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['updated_at', 'is_visible'], name='blogs_blog_updated_9b148c_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
+from services.tracking import TrackedFieldsMixin
 # Create your models here.
 '''
 This module defines the data models for a blogging feature in a Django application.
@@ -36,7 +37,8 @@ The models are set up with verbose names for better readability in the Django ad
 '''
 
 
-class Blog(models.Model):
+class Blog(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('title', 'slug')
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     image = models.ImageField(upload_to='blogs/', null=True, blank=True)
@@ -53,13 +55,17 @@ class Blog(models.Model):
         return reverse('blogs:blog_detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.pk or Blog.objects.filter(pk=self.pk).exists() and Blog.objects.get(pk=self.pk).title != self.title:
+        if self.field_changed('title'):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Blog"
         verbose_name_plural = "Blogs"
+        indexes = [
+            # blogs_view Last-Modified: the latest change to a visible post
+            models.Index(fields=['updated_at', 'is_visible']),
+        ]
 
 
 class BlogImage(models.Model):
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+from home.baking import schedule_bake, schedule_unbake
+from home.page_cache import bump_blog_pages_version
+from .models import Blog, BlogImage
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def blog_changed(sender, instance, **kwargs):
+    """Drop the cached blog list and detail pages (see home.page_cache)"""
+    bump_blog_pages_version()
+
+
+@receiver(post_save, sender=Blog)
+def rebake_blog_page(sender, instance, **kwargs):
+    """Hidden posts are dropped by the bake, as their page no longer renders"""
+    schedule_bake([instance.get_absolute_url()])
+    previous_slug = instance.loaded_value('slug')
+    if previous_slug and previous_slug != instance.slug:
+        schedule_unbake([reverse('blogs:blog_detail', kwargs={'slug': previous_slug})])
+
+
+@receiver(post_delete, sender=Blog)
+def unbake_blog_page(sender, instance, **kwargs):
+    schedule_unbake([instance.get_absolute_url()])
+
+
+@receiver(post_save, sender=BlogImage)
+@receiver(post_delete, sender=BlogImage)
+def blog_image_changed(sender, instance, **kwargs):
+    """Images edited on their own admin page change the post's cached and baked page"""
+    if kwargs.get('raw'):
+        return
+    bump_blog_pages_version()
+    try:
+        schedule_bake([instance.blog.get_absolute_url()])
+    except Blog.DoesNotExist:
+        pass
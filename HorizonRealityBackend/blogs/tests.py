@@ -1,3 +1,43 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from home.baking import bake_pages, is_baked, load_manifest
+from home.page_cache import BLOG_PAGES_VERSION_KEY
+from services.listings import get_generation
+from services.tasks import bake_pages_task
+from .models import Blog, BlogImage
 
-# Create your tests here.
+
+@override_settings(PAGE_CACHE=False, BAKED_PAGES=True)
+class BlogPageBakingTests(TestCase):
+    """Baked and cached blog pages follow their images and renames."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(override_settings(BAKED_PAGES_DIR=directory))
+        # Run the bake task in-process instead of through the broker.
+        conf = bake_pages_task.app.conf
+        self.addCleanup(setattr, conf, 'task_always_eager', conf.task_always_eager)
+        conf.task_always_eager = True
+        self.blog = Blog.objects.create(title="Buying in Whitefield", description="A guide", is_visible=True)
+        self.path = self.blog.get_absolute_url()
+        bake_pages([self.path])
+
+    def test_standalone_image_edit_rebakes_the_post(self):
+        etag = load_manifest()[self.path]['etag']
+        version = get_generation(BLOG_PAGES_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            BlogImage.objects.create(blog=self.blog, image='blog_images/lake.jpg', caption="Lake promenade")
+        self.assertNotEqual(load_manifest()[self.path]['etag'], etag)
+        self.assertNotEqual(get_generation(BLOG_PAGES_VERSION_KEY), version)
+
+    def test_renamed_post_is_unbaked_at_its_old_url(self):
+        self.assertTrue(is_baked(self.path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.title = "Buying in Whitefield in 2026"
+            self.blog.save()
+        self.assertFalse(is_baked(self.path))
+        self.assertTrue(is_baked(self.blog.get_absolute_url()))
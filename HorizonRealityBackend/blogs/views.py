@@ -1,8 +1,42 @@
 from django.shortcuts import render,get_object_or_404
 from django.core.paginator import Paginator
+from django.db.models import Max
 from django.http import JsonResponse
+from django.views.decorators.http import condition
+from home.page_cache import BLOG_PAGES_VERSION_KEY, normalized_query, page_etag
+from services.listings import get_generation
 from .models import Blog
+
+
+def blogs_last_modified(request):
+    """Latest change to a visible post; deleted posts are caught by the ETag's version."""
+    if not hasattr(request, '_blogs_last_modified'):
+        request._blogs_last_modified = Blog.objects.filter(is_visible=True).aggregate(latest=Max('updated_at'))['latest']
+    return request._blogs_last_modified
+
+
+def blogs_etag(request):
+    return page_etag(
+        request, get_generation(BLOG_PAGES_VERSION_KEY), blogs_last_modified(request),
+        normalized_query(request.META.get('QUERY_STRING', ''))
+    )
+
+
+def blog_last_modified(request, slug):
+    if not hasattr(request, '_blog_last_modified'):
+        request._blog_last_modified = (
+            Blog.objects.filter(slug=slug, is_visible=True).values_list('updated_at', flat=True).first()
+        )
+    return request._blog_last_modified
+
+
+def blog_etag(request, slug):
+    updated_at = blog_last_modified(request, slug)
+    return page_etag(request, slug, updated_at) if updated_at else None
+
+
 # Create your views here.
+@condition(etag_func=blogs_etag, last_modified_func=blogs_last_modified)
 def blogs_view(request):
     '''
     Displays paginated blog list with support for AJAX loading.
@@ -31,6 +65,7 @@ def blogs_view(request):
     return render(request, 'blogs/blogs.html', {'page_obj': page_obj, 'no_blogs': not blogs.exists()})
 
 
+@condition(etag_func=blog_etag, last_modified_func=blog_last_modified)
 def blog_detail(request, slug):
     '''
     Displays the detailed view of a specific blog post.
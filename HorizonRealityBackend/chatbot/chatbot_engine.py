@@ -5,10 +5,15 @@ from django.db.models import Q, Avg
 from services.models import (
     BuyProperties, PropertyLocation, NearbyPlaces, FeatureAmenity,
     SellResidentialProperties, SellCommercialProperties,
-    InteriorDesignRequest, PropertyCalculatorInquiry
+    InteriorDesignRequest, PropertyCalculatorInquiry, ListingIndex, to_rupees
 )
+from services.listings import cached_ids, hydrate_listings, price_overlap_q
+from services.geo import locations_near
 from django.db import models
 
+# Radius for "properties near <location>" questions.
+NEARBY_RADIUS_KM = 5
+
 class PropertyChatBot:
     def __init__(self):
         self.bhk_types = ['1bhk', '2bhk', '3bhk', '4bhk', '5bhk', 'villa', 'bungalow', 'duplex', 'tenament']
@@ -128,8 +133,11 @@ class PropertyChatBot:
                 return [float(match) for match in matches]
         return []
 
-    def format_buy_property_response(self, properties, query_type="general"):
-        """Format response for buy properties with clickable links - each field on new line."""
+    def format_buy_property_response(self, properties, total=None, query_type="general"):
+        """
+        Format response for buy properties with clickable links - each field on new line.
+        `total` is the number of matches when `properties` holds only the first few.
+        """
         if not properties:
             suggestions = [
                 "Try searching with different location or configuration",
@@ -139,7 +147,8 @@ class PropertyChatBot:
             ]
             return f"Sorry, no matching properties found. {random.choice(suggestions)}"
 
-        response = f"Found {properties.count()} properties for you:<br><br>"
+        total = len(properties) if total is None else total
+        response = f"Found {total} properties for you:<br><br>"
 
         for prop in properties[:5]:
             budget_range = f"₹{int(prop.min_budget)}-{int(prop.max_budget)} {prop.min_budget_unit.title()}"
@@ -155,8 +164,8 @@ class PropertyChatBot:
             property_url = f"/property/{prop.slug}/"
             response += f'🔗 <a href="{property_url}" target="_blank" class="property-link">View Details</a><br><br>'
             response += f"<br>"
-        if properties.count() > 5:
-            response += f"... and {properties.count() - 5} more properties available!<br><br>"
+        if total > 5:
+            response += f"... and {total - 5} more properties available!<br><br>"
             
         return response.strip()
 
@@ -364,59 +373,82 @@ class PropertyChatBot:
             return response + market_response
         
         if any(keyword in user_input_lower for keyword in ['for sale', 'sell', 'selling', 'owner']):
-            residential_sell = SellResidentialProperties.objects.filter(is_approved=True)
-            commercial_sell = SellCommercialProperties.objects.filter(is_approved=True)
+            residential_sell = ListingIndex.objects.filter(source=ListingIndex.SOURCE_SELL_RESIDENTIAL)
+            commercial_sell = ListingIndex.objects.filter(source=ListingIndex.SOURCE_SELL_COMMERCIAL)
             
             if found_location:
-                residential_sell = residential_sell.filter(locations__name__icontains=found_location)
-                commercial_sell = commercial_sell.filter(locations__name__icontains=found_location)
+                residential_sell = residential_sell.filter(location__name__icontains=found_location)
+                commercial_sell = commercial_sell.filter(location__name__icontains=found_location)
             
             return response + self.format_sell_property_response(
-                list(residential_sell[:3]), 
-                list(commercial_sell[:2])
+                hydrate_listings(residential_sell.order_by('source_id')[:3], fields=None),
+                hydrate_listings(commercial_sell.order_by('source_id')[:2], fields=None)
             )
         
         query = Q(is_property_active=True)
+        # Normalized criteria behind `query`, the cache key of its results.
+        criteria = {}
         
         found_bhk = next((bhk for bhk in self.bhk_types if bhk in user_input_lower), None)
         if found_bhk:
             query &= Q(configuration=found_bhk)
+            criteria['configuration'] = found_bhk
         
         found_commercial = next((comm for comm in self.commercial_types if comm in user_input_lower), None)
         if found_commercial:
             if found_commercial == 'corporate floor':
                 found_commercial = 'corporate_floors'
             query &= Q(commercial_type=found_commercial)
+            criteria['commercial_type'] = found_commercial
         
         if found_location:
-            query &= Q(locations__name__icontains=found_location)
+            matched_locations = PropertyLocation.objects.filter(name__icontains=found_location)
+            location_ids = set(matched_locations.values_list('id', flat=True))
+            if any(keyword in user_input_lower for keyword in ['near', 'around', 'close to']):
+                for location in matched_locations.exclude(geohash=''):
+                    location_ids.update(
+                        nearby.id for nearby, _ in locations_near(location.latitude, location.longitude, NEARBY_RADIUS_KM)
+                    )
+            query &= Q(locations__in=location_ids)
+            criteria['locations'] = sorted(location_ids)
         
         found_status = next((status for status in self.property_statuses if status in user_input_lower), None)
         if found_status:
             query &= Q(status=found_status)
+            criteria['status'] = found_status
         
         budget_range = self.extract_budget_range(user_input)
         if budget_range:
-            if len(budget_range) == 1:
+            budgets_in_rupees = [to_rupees(Decimal(str(budget)), 'lakhs') for budget in budget_range]
+            if len(budgets_in_rupees) == 1:
                 if 'above' in user_input_lower or 'over' in user_input_lower:
-                    query &= Q(min_budget__gte=budget_range[0])
+                    query &= price_overlap_q(low=budgets_in_rupees[0])
+                    criteria['budget'] = [budgets_in_rupees[0], None]
                 else:
-                    query &= Q(max_budget__lte=budget_range[0])
-            elif len(budget_range) == 2:
-                query &= Q(min_budget__gte=min(budget_range), max_budget__lte=max(budget_range))
+                    query &= price_overlap_q(high=budgets_in_rupees[0])
+                    criteria['budget'] = [None, budgets_in_rupees[0]]
+            else:
+                query &= price_overlap_q(low=min(budgets_in_rupees), high=max(budgets_in_rupees))
+                criteria['budget'] = [min(budgets_in_rupees), max(budgets_in_rupees)]
         
         area_range = self.extract_area_range(user_input)
         if area_range:
             if len(area_range) == 1:
                 if 'above' in user_input_lower or 'over' in user_input_lower:
                     query &= Q(area__gte=area_range[0])
+                    criteria['area'] = [area_range[0], None]
                 else:
                     query &= Q(area__lte=area_range[0])
+                    criteria['area'] = [None, area_range[0]]
         
-        properties = BuyProperties.objects.filter(query).order_by('-id')
+        results = cached_ids(
+            'chatbot', criteria, BuyProperties.objects.filter(query).order_by('-id').values_list('id', flat=True)
+        )
         
-        if properties.exists():
-            return response + self.format_buy_property_response(properties)
+        if results['total']:
+            shown = BuyProperties.objects.select_related('locations').in_bulk(results['ids'][:5])
+            properties = [shown[property_id] for property_id in results['ids'][:5] if property_id in shown]
+            return response + self.format_buy_property_response(properties, results['total'])
         
         if found_location and not any([found_bhk, found_commercial, budget_range, area_range]):
             location_info = self.get_location_suggestions(user_input)
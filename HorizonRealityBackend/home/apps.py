@@ -6,4 +6,5 @@ class HomeConfig(AppConfig):
     name = "home"
     
     def ready(self):
+        import home.checks
         import home.signals
\ No newline at end of file
@@ -0,0 +1,247 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+from blogs.models import Blog
+from services.models import BuyProperties
+from .models import Service
+from .page_cache import normalized_query
+
+'''
+Pages baked to static files.
+
+The terms pages, About Us, the team page, the service pages and the blog posts only
+change when an admin edits them. bake_pages() renders them once, like the full-page
+cache does (the per-user parts are left to static/js/session-state.js), and writes
+each one gzipped to <BAKED_PAGES_DIR>/<path>/index.html.gz. manifest.json in the
+same directory lists every baked path with its file, ETag, size and bake time.
+
+BakedPageMiddleware answers GETs for the paths in the manifest from those files,
+before any session, database or template work. The signals in home.signals,
+blogs.signals and services.signals re-bake only the affected pages through
+bake_pages_task after the edit commits; the nightly full bake drops pages that no
+longer exist. Property detail pages are only baked when BAKE_PROPERTY_PAGES is set
+(or with `bake_pages --properties`), and then re-baked on every listing save.
+'''
+
+logger = logging.getLogger(__name__)
+
+BAKED_PAGE_FILE = 'index.html.gz'
+MANIFEST_FILE = 'manifest.json'
+# URL names of the content pages without parameters.
+CONTENT_PAGES = ('terms-of-services', 'terms-of-interior-services', 'about-us', 'team-members')
+
+
+def baked_pages_dir():
+    return Path(settings.BAKED_PAGES_DIR)
+
+
+def bakeable_paths(properties=None):
+    """Every page bake_pages() renders; property pages follow BAKE_PROPERTY_PAGES unless `properties` is given."""
+    if properties is None:
+        properties = getattr(settings, 'BAKE_PROPERTY_PAGES', False)
+    paths = [reverse(name) for name in CONTENT_PAGES]
+    paths += [service.get_absolute_url() for service in Service.objects.only('slug').order_by('id')]
+    paths += [blog.get_absolute_url() for blog in Blog.objects.filter(is_visible=True).only('slug').order_by('id')]
+    if properties:
+        paths += [listing.get_absolute_url() for listing in BuyProperties.objects.only('slug').order_by('id')]
+    return paths
+
+
+def baked_file(path):
+    relative = Path(path.strip('/')) / BAKED_PAGE_FILE
+    if '..' in relative.parts:
+        raise ValueError(f"Refusing to bake {path!r}")
+    return relative
+
+
+def render_page(path):
+    """The HTML of the page at `path` as an anonymous visitor sees it, or None if it does not render."""
+    base_url = urlsplit(getattr(settings, 'BASE_URL', '') or 'http://localhost')
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.META = {
+        'SERVER_NAME': base_url.hostname or 'localhost',
+        'SERVER_PORT': str(base_url.port or (443 if base_url.scheme == 'https' else 80)),
+        'HTTP_HOST': base_url.netloc or 'localhost',
+        'wsgi.url_scheme': base_url.scheme or 'http',
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+    }
+    request.user = AnonymousUser()
+    request.page_cache = True
+    try:
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+    except (Http404, Resolver404):
+        return None
+    if response.status_code != 200 or response.streaming:
+        return None
+    return response.content
+
+
+@contextmanager
+def locked_manifest():
+    """The manifest for reading and updating, locked against other bakers; saved on exit."""
+    directory = baked_pages_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{MANIFEST_FILE}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            manifest = json.loads((directory / MANIFEST_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            manifest = {'pages': {}}
+        yield manifest
+        write_atomically(directory / MANIFEST_FILE, json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+
+def write_atomically(target, data):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=target.parent, delete=False) as handle:
+        handle.write(data)
+    os.chmod(handle.name, 0o644)
+    os.replace(handle.name, target)
+
+
+def remove_baked_file(manifest, path):
+    entry = manifest['pages'].pop(path, None)
+    if entry:
+        (baked_pages_dir() / entry['file']).unlink(missing_ok=True)
+
+
+def bake_pages(paths=None, properties=None):
+    """
+    Render and write the pages at `paths`, or every bakeable page, pruning the ones
+    that no longer exist in that case. Returns (baked, removed) path lists.
+    """
+    full = paths is None
+    if full:
+        paths = bakeable_paths(properties)
+    baked, removed = [], []
+    rendered = {path: render_page(path) for path in dict.fromkeys(paths)}
+    with locked_manifest() as manifest:
+        for path, content in rendered.items():
+            if content is None:
+                if path in manifest['pages']:
+                    remove_baked_file(manifest, path)
+                    removed.append(path)
+                continue
+            relative = baked_file(path)
+            write_atomically(baked_pages_dir() / relative, gzip.compress(content, compresslevel=9, mtime=0))
+            manifest['pages'][path] = {
+                'file': str(relative),
+                'etag': hashlib.sha256(content).hexdigest()[:32],
+                'size': len(content),
+                'baked_at': timezone.now().isoformat(),
+            }
+            baked.append(path)
+        if full:
+            for path in set(manifest['pages']) - set(rendered):
+                remove_baked_file(manifest, path)
+                removed.append(path)
+    return baked, removed
+
+
+def unbake_pages(paths):
+    """Drop baked pages so requests for them reach the views again."""
+    with locked_manifest() as manifest:
+        for path in paths:
+            remove_baked_file(manifest, path)
+
+
+def is_baked(path):
+    return path in load_manifest()
+
+
+def enqueue_bake(paths=None):
+    from services.tasks import bake_pages_task
+    try:
+        bake_pages_task.delay(paths)
+    except Exception:
+        # The nightly full bake catches up if the broker is unavailable.
+        logger.exception("Could not enqueue baking of %s", paths or "every page")
+
+
+def schedule_bake(paths=None):
+    """Re-bake `paths` (every page when None) in the background once the current transaction commits."""
+    if getattr(settings, 'BAKED_PAGES', False):
+        transaction.on_commit(lambda: enqueue_bake(paths))
+
+
+def schedule_unbake(paths):
+    """Stop serving the baked `paths` once the current transaction commits."""
+    if getattr(settings, 'BAKED_PAGES', False):
+        transaction.on_commit(lambda: unbake_pages(paths))
+
+
+_manifest = (None, {})
+
+
+def load_manifest():
+    """path -> manifest entry, re-read when the manifest file changes."""
+    global _manifest
+    try:
+        mtime = (baked_pages_dir() / MANIFEST_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _manifest[0] != mtime:
+        try:
+            pages = json.loads((baked_pages_dir() / MANIFEST_FILE).read_text())['pages']
+        except (FileNotFoundError, ValueError, KeyError):
+            pages = {}
+        _manifest = (mtime, pages)
+    return _manifest[1]
+
+
+class BakedPageMiddleware:
+    """
+    Serves baked pages from BAKED_PAGES_DIR, gzipped to clients accepting it. Goes
+    right after SecurityMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            not getattr(settings, 'BAKED_PAGES', False)
+            or request.method not in ('GET', 'HEAD')
+            or normalized_query(request.META.get('QUERY_STRING', ''))
+        ):
+            return self.get_response(request)
+        entry = load_manifest().get(request.path)
+        if entry is None:
+            return self.get_response(request)
+        etag = f'"{entry["etag"]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                content = (baked_pages_dir() / entry['file']).read_bytes()
+            except FileNotFoundError:
+                return self.get_response(request)
+            response = HttpResponse(content_type='text/html; charset=utf-8')
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response['Content-Encoding'] = 'gzip'
+            else:
+                content = gzip.decompress(content)
+            response.content = content
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['X-Frame-Options'] = getattr(settings, 'X_FRAME_OPTIONS', 'DENY')
+        response['X-Baked-Page'] = entry['baked_at']
+        return response
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+'''
+Deployment checks for the caches behind home.page_cache.
+'''
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_page_cache_backend(app_configs, **kwargs):
+    """The page cache and the versioned listing caches need a cache every worker shares."""
+    if not getattr(settings, 'PAGE_CACHE', False):
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        "PAGE_CACHE is on but the default cache is local to each process.",
+        hint=(
+            "Purges and generation bumps then reach only the worker that made them, and the "
+            "others serve stale pages and search results until PAGE_CACHE_TIMEOUT. Set "
+            "CACHE_URL to a shared cache or turn PAGE_CACHE off."
+        ),
+        id='home.W001',
+    )]
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from services.listings import bump_generation, get_generation, get_listings_version
+from services.models import BuyProperties
+from .models import Statistics, Testimonial, Service
+
+'''
+Cached data for the home page.
+
+Everything index_view renders is read in one pass: a single listings query (with
+locations joined) split into the leasing, investment and resale tabs in Python, plus
+the testimonials, statistics and services. The result is cached under the listings
+version and a home content version bumped by the signals in home.signals, so a warm
+home page needs no queries and any relevant change shows up on the next request.
+'''
+
+HOME_CONTENT_VERSION_KEY = 'home:content:version'
+HOME_PAGE_TIMEOUT = 60 * 60
+
+# category -> home page tab; leasing was historically matched case-insensitively.
+HOME_PAGE_CATEGORIES = {
+    'leasing': 'leasing_properties',
+    'investment': 'investment_properties',
+    'resale_residential': 'resale_properties',
+}
+# Stored spellings of those categories. The casings leasing was matched with are listed
+# rather than compared case-insensitively, so the query can seek on the category index.
+HOME_PAGE_CATEGORY_VALUES = (*HOME_PAGE_CATEGORIES, 'Leasing', 'LEASING')
+
+# BuyProperties columns read by the home page cards (templates/home/index.html).
+HOME_PAGE_PROPERTY_FIELDS = (
+    'slug', 'project_name', 'property_type', 'category', 'configuration', 'commercial_type', 'area',
+    'min_budget', 'min_budget_unit', 'max_budget', 'max_budget_unit', 'image', 'locations__name',
+)
+
+
+def get_home_content_version():
+    return get_generation(HOME_CONTENT_VERSION_KEY)
+
+
+def bump_home_content_version():
+    return bump_generation(HOME_CONTENT_VERSION_KEY)
+
+
+def home_page_listings():
+    """The one listings query behind the home page tabs."""
+    return BuyProperties.objects.filter(category__in=HOME_PAGE_CATEGORY_VALUES).select_related(
+        'locations'
+    ).only(*HOME_PAGE_PROPERTY_FIELDS).order_by('-id')
+
+
+def build_home_page_data():
+    properties = list(home_page_listings())
+    data = {name: [] for name in HOME_PAGE_CATEGORIES.values()}
+    for listing in properties:
+        data[HOME_PAGE_CATEGORIES[listing.category.lower()]].append(listing)
+    data.update({
+        'all_properties': properties,
+        'testimonials': list(Testimonial.objects.filter(is_testimonial_active=True)),
+        'statistics': list(Statistics.objects.all()),
+        'services': list(Service.objects.filter(is_service_active=True)),
+    })
+    return data
+
+
+def get_home_page_data():
+    """Context for the home page, cached until a listing or a piece of home content changes."""
+    key = f"home:page:{get_listings_version()}:{get_home_content_version()}"
+    data = cache.get(key)
+    if data is None:
+        data = build_home_page_data()
+        cache.set(key, data, HOME_PAGE_TIMEOUT)
+    return data
@@ -1,10 +1,9 @@
-from .models import Service
+from .site_content import get_site_content
 
 def services_processor(request):
     """
     Context processor to make services available in all templates
     """
-    footer_services = Service.objects.all()
     return {
-        'footer_services': footer_services
-    }
\ No newline at end of file
+        'footer_services': get_site_content().services
+    }
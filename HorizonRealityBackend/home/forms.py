@@ -6,6 +6,7 @@ from users.models import CustomUser
 from django.core.validators import RegexValidator
 from django.contrib.auth.forms import SetPasswordForm
 from django.core.exceptions import ValidationError
+from services.uploads import claim_upload, discard_upload
 
 class UserRegistrationForm(forms.ModelForm):
     first_name_validator = RegexValidator(
@@ -228,7 +229,45 @@ class CustomPasswordResetForm(SetPasswordForm):
         
         return password2
 
-class SellResidentialPropertyForm(forms.ModelForm):
+class ChunkedVideoUploadMixin:
+    """
+    Lets a sell form take its video from a finished chunked upload (services.uploads):
+    the page sends the upload id in `video_upload` instead of the file. Views pass
+    the requesting `user` and call finish_chunked_upload() after saving.
+    """
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.chunked_video = None
+        self.fields['video_upload'] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload_id = cleaned_data.get('video_upload')
+        if upload_id and not self.chunked_video:
+            try:
+                self.chunked_video = claim_upload(upload_id, self.user)
+            except ValidationError as error:
+                self.add_error('video', error)
+        if self.chunked_video:
+            cleaned_data['video'] = self.chunked_video
+        return cleaned_data
+
+    def full_clean(self):
+        super().full_clean()
+        if self._errors and self.chunked_video:
+            # The form is shown again and the upload claimed anew on the next submit.
+            self.chunked_video.close()
+            self.chunked_video = None
+
+    def finish_chunked_upload(self):
+        if self.chunked_video:
+            self.chunked_video.close()
+            discard_upload(self.chunked_video.upload)
+            self.chunked_video = None
+
+class SellResidentialPropertyForm(ChunkedVideoUploadMixin, forms.ModelForm):
     locations = forms.ModelChoiceField(
         queryset=PropertyLocation.objects.all(),
         empty_label="Select Location",
@@ -275,7 +314,7 @@ class SellResidentialPropertyForm(forms.ModelForm):
         self.fields['contact_number'].required = True
         self.fields['contact_name'].required = True
 
-class SellCommercialPropertyForm(forms.ModelForm):
+class SellCommercialPropertyForm(ChunkedVideoUploadMixin, forms.ModelForm):
     locations = forms.ModelChoiceField(
         queryset=PropertyLocation.objects.all(),
         empty_label="Select Location",
@@ -0,0 +1,37 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from home.baking import bake_pages, baked_pages_dir, MANIFEST_FILE
+
+'''
+Renders the content pages to gzipped HTML files under BAKED_PAGES_DIR and writes
+their manifest (see home.baking). Without --path every bakeable page is baked and
+baked pages that no longer exist are removed.
+
+The files are only served while BAKED_PAGES is enabled.
+
+Usage:
+    python manage.py bake_pages
+    python manage.py bake_pages --properties
+    python manage.py bake_pages --path /about-us/ --path /blogs/some-post/
+'''
+
+
+class Command(BaseCommand):
+    help = "Pre-render the content pages to compressed HTML files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', action='store_true', help="Also bake every property detail page")
+        parser.add_argument('--path', action='append', dest='paths', help="Bake only this page (repeatable)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        baked, removed = bake_pages(options['paths'], properties=options['properties'] or None)
+        elapsed = time.perf_counter() - started
+        for path in removed:
+            self.stdout.write(f"Removed {path}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Baked {len(baked)} pages in {elapsed:.2f}s to {baked_pages_dir()} (manifest: {MANIFEST_FILE})"
+        ))
+        if not settings.BAKED_PAGES:
+            self.stdout.write(self.style.WARNING("BAKED_PAGES is off, so the baked files are not served yet."))
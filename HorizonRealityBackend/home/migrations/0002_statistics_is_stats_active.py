@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statistics',
+            name='is_stats_active',
+            field=models.BooleanField(default=False),
+        ),
+    ]
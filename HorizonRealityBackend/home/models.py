@@ -1,6 +1,7 @@
 from django.utils.text import slugify
 from django.urls import reverse
 from django.db import models
+from services.tracking import TrackedFieldsMixin
 
 '''
 This module defines the core models for the About Us, Team, Contact, Statistics, Testimonials, and Services sections
@@ -136,7 +137,8 @@ class Testimonial(models.Model):
         verbose_name = "Testimonial"
         verbose_name_plural = "Testimonials"
 
-class Service(models.Model):
+class Service(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('title',)
     title = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
     icon = models.ImageField(upload_to='services/', blank=True, null=True)
@@ -153,7 +155,7 @@ class Service(models.Model):
         return reverse('service_detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.pk or Service.objects.get(pk=self.pk).title != self.title:
+        if self.field_changed('title'):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
@@ -0,0 +1,162 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from services.listings import LISTINGS_VERSION_KEY, bump_generation, get_generation
+from .content import HOME_CONTENT_VERSION_KEY
+from .site_content import SITE_CONTENT_VERSION_KEY, get_site_content_version
+
+'''
+Full-page cache for the public pages.
+
+PageCacheMiddleware stores the rendered HTML of the pages in PAGE_CACHE_RULES and
+serves later GETs from the cache without touching the session or the database. The
+key is the path plus the normalized query string (parameters sorted by name,
+tracking parameters dropped), prefixed with the generation counters the page
+depends on, so purging is a counter bump:
+
+- the listing pages depend on the listings version, bumped for any listing change;
+- a property detail page has its own counter, bumped by purge_page() when that
+  BuyProperties row is saved or deleted (see services.signals);
+- the blog pages share BLOG_PAGES_VERSION_KEY, bumped when a Blog changes;
+- every page depends on the site content version (footer services, contact details).
+
+The cached pages are the same for every visitor. The per-user parts, namely the
+login state in the navigation, favorite hearts and the CSRF token of forms, are
+filled in by static/js/session-state.js from one session_state JSON call. Responses
+that read the session or set a cookie are never stored, so a page that still
+renders per-user data is simply not cached.
+
+page_etag() builds the ETags the cached views hand to Django's `condition`
+decorator; cache hits answer If-None-Match / If-Modified-Since with the stored
+validators, so revalidating a cached page costs no rendering either.
+'''
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+BLOG_PAGES_VERSION_KEY = 'pages:blogs:version'
+# Query parameters that never change a page's content.
+IGNORED_QUERY_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|_)$')
+
+# path pattern -> generation counters the page depends on, besides the site content
+# version; None stands for the page's own counter, bumped by purge_page().
+PAGE_CACHE_RULES = (
+    (re.compile(r'^/$'), (LISTINGS_VERSION_KEY, HOME_CONTENT_VERSION_KEY)),
+    (re.compile(r'^/properties/$'), (LISTINGS_VERSION_KEY,)),
+    (re.compile(r'^/property/[-\w]+/$'), (None,)),
+    (re.compile(r'^/blogs/(?:[-\w]+/)?$'), (BLOG_PAGES_VERSION_KEY,)),
+    (re.compile(r'^/about-us/$'), ()),
+)
+
+
+def page_version_key(path):
+    return f"pages:path:{hashlib.md5(path.encode()).hexdigest()}:version"
+
+
+def purge_page(path):
+    """Drop every cached variant of one page."""
+    bump_generation(page_version_key(path))
+
+
+def bump_blog_pages_version():
+    return bump_generation(BLOG_PAGES_VERSION_KEY)
+
+
+def page_cache_rule(path):
+    for pattern, versions in PAGE_CACHE_RULES:
+        if pattern.match(path):
+            return versions
+    return None
+
+
+def normalized_query(query_string):
+    params = [
+        (name, value) for name, value in parse_qsl(query_string, keep_blank_values=True)
+        if not IGNORED_QUERY_PARAMS.match(name)
+    ]
+    # A stable sort keeps the order of repeated parameters.
+    return urlencode(sorted(params, key=lambda param: param[0]))
+
+
+def page_cache_key(request, versions):
+    """Cache key of the page for `request` at the current generations of its data."""
+    keys = [SITE_CONTENT_VERSION_KEY] + [version or page_version_key(request.path) for version in versions]
+    values = cache.get_many(keys)
+    generations = ':'.join(str(values[key] if key in values else get_generation(key)) for key in keys)
+    query = normalized_query(request.META.get('QUERY_STRING', ''))
+    return f"pages:{generations}:{hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()}"
+
+
+def page_etag(request, *parts):
+    """
+    ETag of a page built from `parts` (timestamps, versions...), the site content
+    version and whether it was asked for as an XHR. Pages rendered outside the page
+    cache show the user's menu, so their ETag also carries the user.
+    """
+    parts += (get_site_content_version(), request.headers.get('x-requested-with', ''))
+    if not getattr(request, 'page_cache', False):
+        parts += (request.user.pk,)
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def is_cacheable_response(response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if 'cookie' in response.get('Vary', '').lower():
+        return False
+    cache_control = response.get('Cache-Control', '')
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+class PageCacheMiddleware:
+    """
+    Serves the pages in PAGE_CACHE_RULES from the cache. Goes right after
+    SecurityMiddleware, so cached pages skip the session, auth and CSRF middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        versions = None
+        if (
+            getattr(settings, 'PAGE_CACHE', True)
+            and request.method in ('GET', 'HEAD')
+            and request.headers.get('x-requested-with') != 'XMLHttpRequest'
+        ):
+            versions = page_cache_rule(request.path)
+        if versions is None:
+            return self.get_response(request)
+
+        # Computed before rendering, so a purge during the render is never missed.
+        key = page_cache_key(request, versions)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            validators = dict(headers)
+            response = get_conditional_response(
+                request,
+                etag=validators.get('ETag'),
+                last_modified=parse_http_date_safe(validators.get('Last-Modified', '')),
+            )
+            if response is not None:
+                for header in ('ETag', 'Last-Modified'):
+                    if header in validators:
+                        response[header] = validators[header]
+                return response
+            response = HttpResponse(content)
+            for header, value in headers:
+                response[header] = value
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        # Tells the templates to leave the per-user parts to session-state.js.
+        request.page_cache = True
+        response = self.get_response(request)
+        if request.method == 'GET' and is_cacheable_response(response):
+            cache.set(key, (response.content, list(response.items())), PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
@@ -1,29 +1,25 @@
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from services.models import SellResidentialProperties, SellCommercialProperties
+from users.models import ContactInformation
+from django.urls import reverse
+from .models import AboutUs, Statistics, Testimonial, Service, ServiceImage, TeamMember
+from .content import bump_home_content_version
+from .site_content import bump_site_content_version
+from .baking import schedule_bake
 
 
-@receiver(pre_save, sender=SellResidentialProperties)
-def store_previous_approval_status(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            instance._previous_approval_status = SellResidentialProperties.objects.get(pk=instance.pk).is_approved
-        except SellResidentialProperties.DoesNotExist:
-            instance._previous_approval_status = False
-    else:
-        instance._previous_approval_status = False
-
 @receiver(post_save, sender=SellResidentialProperties)
 def send_approval_email(sender, instance, created, **kwargs):
     """Send email when property gets approved"""
     
-    if not created and hasattr(instance, '_previous_approval_status'):
-        if not instance._previous_approval_status and instance.is_approved:
+    if not created:
+        if instance.is_approved and not instance.loaded_value('is_approved', False):
             
             try:
                 subject = f"Property Approved: {instance.project_name}"
@@ -54,24 +50,12 @@ def send_approval_email(sender, instance, created, **kwargs):
 
 
 
-@receiver(pre_save, sender=SellCommercialProperties)
-def store_previous_approval_status(sender, instance, **kwargs):
-    """Store the previous approval status before saving"""
-    if instance.pk:
-        try:
-            instance._previous_approval_status = SellCommercialProperties.objects.get(pk=instance.pk).is_approved
-        except SellCommercialProperties.DoesNotExist:
-            instance._previous_approval_status = False
-    else:
-        instance._previous_approval_status = False
-
-
 @receiver(post_save, sender=SellCommercialProperties)
 def send_approval_email(sender, instance, created, **kwargs):
     """Send email when property gets approved"""
     
-    if not created and hasattr(instance, '_previous_approval_status'):
-        if not instance._previous_approval_status and instance.is_approved:
+    if not created:
+        if instance.is_approved and not instance.loaded_value('is_approved', False):
             
             try:
                 subject = f"Property Approved: {instance.project_name}"
@@ -98,3 +82,52 @@ def send_approval_email(sender, instance, created, **kwargs):
                 )                
             except Exception as e:
                 print(f"Failed to send approval email to {instance.contact_email}: {str(e)}")
+
+
+@receiver(post_save, sender=Statistics)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Statistics)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_delete, sender=Service)
+def home_content_changed(sender, instance, **kwargs):
+    """Retire the cached home page (see home.content)"""
+    bump_home_content_version()
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=ContactInformation)
+@receiver(post_save, sender=AboutUs)
+@receiver(post_save, sender=Statistics)
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ContactInformation)
+@receiver(post_delete, sender=AboutUs)
+@receiver(post_delete, sender=Statistics)
+def site_content_changed(sender, instance, **kwargs):
+    """Make every process reload its SiteContent snapshot (see home.site_content)"""
+    bump_site_content_version()
+
+
+@receiver(post_save, sender=AboutUs)
+@receiver(post_delete, sender=AboutUs)
+def rebake_about_us(sender, instance, **kwargs):
+    schedule_bake([reverse('about-us')])
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def rebake_team_members(sender, instance, **kwargs):
+    schedule_bake([reverse('team-members')])
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def rebake_all_pages(sender, instance, **kwargs):
+    """Services are listed in the footer of every baked page"""
+    schedule_bake()
+
+
+@receiver(post_save, sender=ServiceImage)
+@receiver(post_delete, sender=ServiceImage)
+def rebake_service_page(sender, instance, **kwargs):
+    schedule_bake([reverse('service_detail', kwargs={'slug': instance.service.slug})])
@@ -0,0 +1,112 @@
+import threading
+from collections import namedtuple
+from django.core.cache import cache
+from services.listings import bump_generation, get_generation
+from users.models import ContactInformation
+from .models import AboutUs, Service, Statistics
+
+'''
+Per-process snapshot of the rarely edited site content.
+
+The footer services (rendered on every page), the contact information, the About Us
+page and the statistics change a few times a year, yet were queried on every request
+that showed them. get_site_content() loads them once into an immutable SiteContent
+and hands the same object to every request of the process. Saving or deleting any
+of these models bumps SITE_CONTENT_VERSION_KEY (see home.signals); each process
+compares its snapshot against that shared counter and reloads on the next access,
+so admin edits show up everywhere at once.
+
+Snapshot hits and misses are counted per process and added to shared counters in
+the cache every STATS_FLUSH_EVERY lookups, so site_content_stats() covers all
+processes; site_content_metrics exposes them for scraping.
+'''
+
+SITE_CONTENT_VERSION_KEY = 'site_content:version'
+SITE_CONTENT_STATS_KEYS = {
+    'hits': 'site_content:stats:hits',
+    'misses': 'site_content:stats:misses',
+}
+STATS_FLUSH_EVERY = 100
+
+SiteContent = namedtuple('SiteContent', [
+    'version',
+    'services',        # every Service, for the footer
+    'main_office',     # the main office ContactInformation, or None
+    'contact_info',    # the main office, else the first office, or None
+    'about',           # the AboutUs instance, or None
+    'statistics',      # every Statistics row
+])
+
+
+def get_site_content_version():
+    return get_generation(SITE_CONTENT_VERSION_KEY)
+
+
+def bump_site_content_version():
+    return bump_generation(SITE_CONTENT_VERSION_KEY)
+
+
+def load_site_content(version):
+    offices = list(ContactInformation.objects.order_by('id'))
+    main_office = next((office for office in offices if office.is_main_office), None)
+    return SiteContent(
+        version=version,
+        services=tuple(Service.objects.all()),
+        main_office=main_office,
+        contact_info=main_office or (offices[0] if offices else None),
+        about=AboutUs.objects.first(),
+        statistics=tuple(Statistics.objects.all()),
+    )
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_pending_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def flush_site_content_stats():
+    """Add this process's pending hit/miss counts to the shared counters."""
+    with _stats_lock:
+        pending = dict(_pending_stats)
+        for name in _pending_stats:
+            _pending_stats[name] = 0
+    for name, count in pending.items():
+        if count:
+            key = SITE_CONTENT_STATS_KEYS[name]
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, None):
+                    cache.incr(key, count)
+
+
+def record_lookup(outcome):
+    with _stats_lock:
+        _pending_stats[outcome] += 1
+        flush = outcome == 'misses' or sum(_pending_stats.values()) >= STATS_FLUSH_EVERY
+    if flush:
+        flush_site_content_stats()
+
+
+def site_content_stats():
+    """Snapshot hits and misses of every process, as of their last flush."""
+    flush_site_content_stats()
+    counts = cache.get_many(list(SITE_CONTENT_STATS_KEYS.values()))
+    return {name: counts.get(key, 0) for name, key in SITE_CONTENT_STATS_KEYS.items()}
+
+
+def get_site_content():
+    """The SiteContent of this process, reloaded when another process reports an edit."""
+    global _snapshot
+    version = get_site_content_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        record_lookup('hits')
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = load_site_content(version)
+        snapshot = _snapshot
+    record_lookup('misses')
+    return snapshot
@@ -15,6 +15,7 @@ urlpatterns = [
      path('service/<slug:slug>/', views.service_detail, name='service_detail'),  
      path('terms-of-services/', views.terms_of_services, name='terms-of-services'),
      path('terms-of-interior-services/', views.terms_of_interior_services, name='terms-of-interior-services'),
+     path('metrics/site-content/', views.site_content_metrics, name='site_content_metrics'),
 
     # Other URL patterns
     path('password-reset/', auth_views.PasswordResetView.as_view(
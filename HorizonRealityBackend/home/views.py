@@ -1,8 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse, QueryDict
+from django.http import HttpResponse, JsonResponse, QueryDict
 from .models import Statistics, TeamMember, Testimonial, AboutUs, Service
+from .content import get_home_page_data
+from .site_content import get_site_content, site_content_stats
 from services.models import BuyProperties
+from services.listings import (
+    SEARCH_SORT_ORDERS, find_listings, hydrate_listings, parse_listing_filters
+)
 from .forms import UserRegistrationForm, LoginForm, SellResidentialPropertyForm, SellCommercialPropertyForm,BuyPropertySearchForm, BuyCommercialPropertySearchForm
 from django.contrib.auth import login, authenticate, logout
 from django.db.models import Q
@@ -16,8 +21,6 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
 import logging
-from itertools import chain
-from operator import attrgetter
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
@@ -73,31 +76,16 @@ Views:
 Each view handles GET and POST requests where necessary and interacts with the corresponding model or form to retrieve and store data.
 '''
 
+SEARCH_RESULTS_PER_PAGE = 12
+
 def index_view(request):
     '''
     Home page view.
-    - On GET: Fetches statistics, testimonials, services, and properties to display.
+    - On GET: Renders statistics, testimonials, services, and properties from the
+      cached home page data (see home.content).
     - On POST: Handles contact form submission, saves data to the database,
       and returns a success or error message.
     '''
-    testimonials = Testimonial.objects.filter(is_testimonial_active=True)
-    project_statistics = Statistics.objects.all()
-    services = Service.objects.filter(is_service_active=True)
-    leasing_properties = BuyProperties.objects.filter(
-        category__iexact='leasing'
-    ).order_by('-id')
-    investment_properties = BuyProperties.objects.filter(
-        category='investment'
-    ).order_by('-id')
-    resale_properties = BuyProperties.objects.filter(
-        category='resale_residential'
-    ).order_by('-id')
-    all_property_ids = list(leasing_properties.values_list('id', flat=True)) + \
-                      list(investment_properties.values_list('id', flat=True)) + \
-                      list(resale_properties.values_list('id', flat=True))
-    all_property_ids = list(set(all_property_ids))
-    all_properties = BuyProperties.objects.filter(id__in=all_property_ids).order_by('-id')
-    available_categories = list(BuyProperties.objects.values_list('category', flat=True).distinct())
     if request.method == 'POST':
         name = request.POST.get('name')
         email = request.POST.get('email')
@@ -113,16 +101,7 @@ def index_view(request):
         except Exception as e:
             messages.error(request, "There was an error sending your message. Please try again.")
             return redirect('home')
-    context = {
-        'statistics': project_statistics,
-        'testimonials': testimonials,
-        'services': services,
-        'all_properties': all_properties,
-        'leasing_properties': leasing_properties,
-        'investment_properties': investment_properties,
-        'resale_properties': resale_properties
-    }
-    return render(request, 'home/index.html', context)
+    return render(request, 'home/index.html', get_home_page_data())
 
 def about_us_view(request):
     '''
@@ -130,7 +109,7 @@ def about_us_view(request):
     - Retrieves the AboutUs model instance if it exists.
     - Converts YouTube links to embed format if present.
     '''
-    about = AboutUs.objects.first()
+    about = get_site_content().about
     embed_url = None
     if about and about.introduction_video:
         url = about.introduction_video.strip()
@@ -230,7 +209,7 @@ def interior_design_form_view(request):
 def sell_properties_view(request):
     """View to handle property selling form"""
     if request.method == 'POST':
-        form = SellResidentialPropertyForm(request.POST, request.FILES)
+        form = SellResidentialPropertyForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             property_instance = form.save(commit=False)
             statuses = []
@@ -244,6 +223,7 @@ def sell_properties_view(request):
                 statuses.append('lease')
             property_instance.status = statuses[0] if statuses else 'new'
             property_instance.save()
+            form.finish_chunked_upload()
             contact_info = {
                 'name': form.cleaned_data.get('contact_name'),
                 'phone': form.cleaned_data.get('contact_phone'),
@@ -267,7 +247,7 @@ def sell_properties_view(request):
 def sell_commercial_properties_view(request):
     """View to handle property selling form"""
     if request.method == 'POST':
-        form = SellCommercialPropertyForm(request.POST, request.FILES)
+        form = SellCommercialPropertyForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             property_instance = form.save(commit=False)
             statuses = []
@@ -281,6 +261,7 @@ def sell_commercial_properties_view(request):
                 statuses.append('lease')
             property_instance.status = statuses[0] if statuses else 'new'
             property_instance.save()
+            form.finish_chunked_upload()
             contact_info = {
                 'name': form.cleaned_data.get('contact_name'),
                 'phone': form.cleaned_data.get('contact_phone'),
@@ -330,81 +311,34 @@ def buy_residential_property(request):
     return render(request, 'home/buy_residential_property.html', context)
 
 def property_search_results(request):
-    """View to handle property search results with debugging - includes approved sell properties"""    
+    """View to handle property search results - includes approved sell properties"""
     form = BuyPropertySearchForm(request.GET or None)
-    properties = []
-    total_properties = 0
-    buy_properties_queryset = BuyProperties.objects.filter(property_type='residential')
-    sell_properties_queryset = SellResidentialProperties.objects.filter(is_approved=True)
-    initial_buy_count = buy_properties_queryset.count()
-    initial_sell_count = sell_properties_queryset.count()
-    status_values = request.GET.getlist('status')
-    if status_values:
-        buy_properties_queryset = buy_properties_queryset.filter(status__in=status_values)
-        sell_properties_queryset = sell_properties_queryset.filter(status__in=status_values)
-        existing_buy_statuses = BuyProperties.objects.values_list('status', flat=True).distinct()
-        existing_sell_statuses = SellResidentialProperties.objects.values_list('status', flat=True).distinct()
-    config_values = request.GET.getlist('configuration')
-    if config_values:
-        buy_properties_queryset = buy_properties_queryset.filter(configuration__in=config_values)
-        sell_properties_queryset = sell_properties_queryset.filter(configuration__in=config_values)
-        existing_buy_configs = BuyProperties.objects.values_list('configuration', flat=True).distinct()
-        existing_sell_configs = SellResidentialProperties.objects.values_list('configuration', flat=True).distinct()
-    location_values = request.GET.getlist('locations')
-    if location_values:
-        try:
-            location_ids = [int(loc_id) for loc_id in location_values if loc_id.isdigit()]
-            buy_properties_queryset = buy_properties_queryset.filter(locations__id__in=location_ids)
-            sell_properties_queryset = sell_properties_queryset.filter(locations__id__in=location_ids)
-        except ValueError as e:
-            print(f"Error converting location IDs: {e}")
-    area_value = request.GET.get('area_range')
-    if area_value:
-        try:
-            area_value = int(area_value)
-            buy_properties_queryset = buy_properties_queryset.filter(area__lte=area_value)
-            sell_properties_queryset = sell_properties_queryset.filter(area__lte=area_value)
-        except ValueError:
-            print("Invalid area value")
-    budget_value = request.GET.get('budget_range')
-    if budget_value:
-        try:
-            budget_value = int(budget_value)
-            buy_properties_queryset = buy_properties_queryset.filter(min_budget__lte=budget_value)
-            sell_properties_queryset = sell_properties_queryset.filter(budget__lte=budget_value)
-        except ValueError:
-            print("Invalid budget value")
-    buy_properties = buy_properties_queryset.distinct()
-    sell_properties = sell_properties_queryset.distinct()
-    for prop in buy_properties:
-        prop.property_source = 'buy'
-        prop.is_sell_property = False
-    for prop in sell_properties:
-        prop.property_source = 'sell'
-        prop.is_sell_property = True
-        prop.min_budget = prop.budget
-        prop.max_budget = prop.budget
-        prop.min_budget_unit = 'rupees'
-        prop.max_budget_unit = 'rupees'
-        prop.salient_features = prop.additional_details or ''
-    properties = list(chain(buy_properties, sell_properties))
-    total_properties = len(properties)
-    if properties:
-        for prop in properties[:3]:
-            source = "Buy" if not prop.is_sell_property else "Sell"
+    filters = parse_listing_filters(request.GET, scope='residential')
+    sort = request.GET.get('sort', 'default')
+    page_obj, counts = find_listings(
+        request.GET,
+        'residential',
+        filters,
+        SEARCH_SORT_ORDERS.get(sort, SEARCH_SORT_ORDERS['default']),
+        SEARCH_RESULTS_PER_PAGE
+    )
+    page_obj.object_list = hydrate_listings(page_obj.object_list)
     context = {
         'form': form,
-        'properties': properties,
-        'total_properties': total_properties,
+        'properties': page_obj.object_list,
+        'page_obj': page_obj,
+        'cursor_mode': 'cursor' in request.GET,
+        'total_properties': counts['total'],
         'search_performed': True,
+        'current_sort': sort,
         'debug_info': {
-            'status_values': status_values,
-            'config_values': config_values,
-            'location_values': location_values,
-            'area_value': area_value,
-            'budget_value': budget_value,
-            'buy_count': buy_properties.count(),
-            'sell_count': sell_properties.count(),
+            'status_values': filters.get('status', []),
+            'config_values': filters.get('configuration', []),
+            'location_values': filters.get('locations', []),
+            'area_value': filters.get('area_max'),
+            'budget_value': filters.get('budget_max'),
+            'buy_count': counts['buy'],
+            'sell_count': counts['sell'],
         }
     }
     return render(request, 'home/property_search_results.html', context)
@@ -423,93 +357,55 @@ def buy_commercial_property(request):
     return render(request, 'home/buy_commercial_property.html', context)
 
 def commercial_property_search_results(request):
-    """View to handle property search results with debugging - includes approved sell properties"""
+    """View to handle commercial property search results - includes approved sell properties"""
     form = BuyCommercialPropertySearchForm(request.GET or None)
-    properties = []
-    total_properties = 0
-    buy_properties_queryset = BuyProperties.objects.filter(property_type='commercial')
-    sell_properties_queryset = SellCommercialProperties.objects.filter(
-        is_approved=True)
-    initial_buy_count = buy_properties_queryset.count()
-    initial_sell_count = sell_properties_queryset.count()
-    status_values = request.GET.getlist('status')
-    if status_values:
-        buy_properties_queryset = buy_properties_queryset.filter(status__in=status_values)
-        sell_properties_queryset = sell_properties_queryset.filter(status__in=status_values)
-        existing_buy_statuses = BuyProperties.objects.filter(property_type='commercial').values_list('status', flat=True).distinct()
-        existing_sell_statuses = SellCommercialProperties.objects.values_list('status', flat=True).distinct()
-    commercial_type_values = request.GET.getlist('commercial_type')
-    if commercial_type_values:
-        buy_properties_queryset = buy_properties_queryset.filter(commercial_type__in=commercial_type_values)
-        sell_properties_queryset = sell_properties_queryset.filter(commercial_type__in=commercial_type_values)
-        existing_buy_commercial_type = BuyProperties.objects.filter(property_type='commercial').values_list('commercial_type', flat=True).distinct()
-        existing_sell_commercial_type = SellCommercialProperties.objects.filter(property_type='commercial').values_list('commercial_type', flat=True).distinct()
-    furnishing_values = request.GET.getlist('furnishing')
-    if furnishing_values:
-        buy_properties_queryset = buy_properties_queryset.filter(furnishing__in=furnishing_values)
-        sell_properties_queryset = sell_properties_queryset.filter(furnishing__in=furnishing_values)
-        existing_buy_furnishing_values = BuyProperties.objects.filter(property_type='commercial').values_list('furnishing', flat=True).distinct()
-        existing_sell_furnishing_values = SellCommercialProperties.objects.values_list('furnishing', flat=True).distinct()
-    location_values = request.GET.getlist('locations')
-    if location_values:
-        try:
-            location_ids = [int(loc_id) for loc_id in location_values if loc_id.isdigit()]
-            buy_properties_queryset = buy_properties_queryset.filter(locations__id__in=location_ids)
-            sell_properties_queryset = sell_properties_queryset.filter(locations__id__in=location_ids)
-        except ValueError as e:
-            print(f"Error converting location IDs: {e}")
-    area_value = request.GET.get('area_range')
-    if area_value:
-        try:
-            area_value = int(area_value)
-            buy_properties_queryset = buy_properties_queryset.filter(area__lte=area_value)
-            sell_properties_queryset = sell_properties_queryset.filter(area__lte=area_value)
-        except ValueError:
-            print("Invalid area value")
-    budget_value = request.GET.get('budget_range')
-    if budget_value:
-        try:
-            budget_value = int(budget_value)
-            buy_properties_queryset = buy_properties_queryset.filter(min_budget__lte=budget_value)
-            sell_properties_queryset = sell_properties_queryset.filter(budget__lte=budget_value)
-        except ValueError:
-            print("Invalid budget value")
-    buy_properties = buy_properties_queryset.distinct()
-    sell_properties = sell_properties_queryset.distinct()
-    for prop in buy_properties:
-        prop.property_source = 'buy'
-        prop.is_sell_property = False
-    for prop in sell_properties:
-        prop.property_source = 'sell'
-        prop.is_sell_property = True
-        prop.min_budget = prop.budget
-        prop.max_budget = prop.budget
-        prop.min_budget_unit = 'rupees' 
-        prop.max_budget_unit = 'rupees'
-        prop.salient_features = prop.additional_details or ''
-    properties = list(chain(buy_properties, sell_properties))
-    total_properties = len(properties)
-    if properties:
-        for prop in properties[:3]:
-            source = "Buy" if not prop.is_sell_property else "Sell"
+    filters = parse_listing_filters(request.GET, scope='commercial')
+    sort = request.GET.get('sort', 'default')
+    page_obj, counts = find_listings(
+        request.GET,
+        'commercial',
+        filters,
+        SEARCH_SORT_ORDERS.get(sort, SEARCH_SORT_ORDERS['default']),
+        SEARCH_RESULTS_PER_PAGE
+    )
+    page_obj.object_list = hydrate_listings(page_obj.object_list)
     context = {
         'form': form,
-        'properties': properties,
-        'total_properties': total_properties,
+        'properties': page_obj.object_list,
+        'page_obj': page_obj,
+        'cursor_mode': 'cursor' in request.GET,
+        'total_properties': counts['total'],
         'search_performed': True,
+        'current_sort': sort,
         'debug_info': {
-            'furnishing_values': furnishing_values,
-            'status_values': status_values,
-            'commercial_type_values': commercial_type_values,
-            'location_values': location_values,
-            'area_value': area_value,
-            'budget_value': budget_value,
-            'buy_count': buy_properties.count(),
-            'sell_count': sell_properties.count(),
+            'furnishing_values': filters.get('furnishing', []),
+            'status_values': filters.get('status', []),
+            'commercial_type_values': filters.get('commercial_type', []),
+            'location_values': filters.get('locations', []),
+            'area_value': filters.get('area_max'),
+            'budget_value': filters.get('budget_max'),
+            'buy_count': counts['buy'],
+            'sell_count': counts['sell'],
         }
     }
     return render(request, 'home/commercial_property_search_results.html', context)
 
 
+def site_content_metrics(request):
+    '''
+    SiteContent snapshot hits and misses in the Prometheus text format.
+    - Open to staff users and to requests bearing settings.METRICS_TOKEN.
+    '''
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not request.user.is_staff and not (token and request.headers.get('Authorization') == f"Bearer {token}"):
+        return HttpResponse(status=403)
+    stats = site_content_stats()
+    lines = []
+    for name, value in stats.items():
+        metric = f"site_content_snapshot_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
+
+
 def test(request):
     return render(request,'test.html')
\ No newline at end of file
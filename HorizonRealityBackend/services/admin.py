@@ -4,8 +4,9 @@ from django.utils.html import format_html
 
 @admin.register(PropertyLocation)
 class PropertyLocationAdmin(admin.ModelAdmin):
-    list_display = ('name',)
+    list_display = ('name', 'latitude', 'longitude', 'geohash')
     search_fields = ('name',)
+    readonly_fields = ('geohash',)
 
 class PropertyImageInline(admin.TabularInline):
     model = PropertyImage
@@ -206,4 +207,26 @@ class PropertyCalculatorInquiryAdmin(admin.ModelAdmin):
     )
     list_filter = ('title', 'property_type', 'location', 'created_at')
     search_fields = ('title', 'property_type', 'location', 'owner_name', 'phone_number', 'flat_society_name')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'scope', 'is_active', 'created_at')
+    list_filter = ('scope', 'is_active', 'created_at')
+    search_fields = ('name', 'user__email', 'query')
+    readonly_fields = ('filters', 'created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+
+@admin.register(ImageDerivative)
+class ImageDerivativeAdmin(admin.ModelAdmin):
+    list_display = ('source', 'format', 'width', 'height', 'size', 'created_at')
+    list_filter = ('format', 'width')
+    search_fields = ('source',)
+    readonly_fields = ('source', 'format', 'width', 'height', 'file', 'size', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
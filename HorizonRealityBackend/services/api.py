@@ -0,0 +1,119 @@
+import hashlib
+from decimal import Decimal
+import orjson
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from .listings import LISTING_SOURCE_MODELS, get_listings_version
+
+'''
+Serialization for the read-only listings JSON API (/api/v1/listings/).
+
+Each API field is read either from ListingIndex or from the buy/sell table behind a
+row. Only the columns behind the requested `fields` are selected: index columns in
+the page query itself, source columns in one extra query per source present on the
+page, and none at all when every requested field lives on ListingIndex.
+'''
+
+LISTINGS_API_VERSION = 1
+
+# API field -> ListingIndex column
+INDEX_FIELDS = {
+    'property_type': 'property_type',
+    'status': 'status',
+    'category': 'category',
+    'configuration': 'configuration',
+    'commercial_type': 'commercial_type',
+    'furnishing': 'furnishing',
+    'location': 'location_id',
+    'location_name': 'location__name',
+    'area': 'area',
+    'min_price': 'min_price',
+    'max_price': 'max_price',
+}
+
+# API field -> column of the source listing (buy listings only for slug and url)
+SOURCE_FIELDS = {
+    'project_name': 'project_name',
+    'image': 'image',
+    'slug': 'slug',
+    'url': 'slug',
+}
+
+LISTING_API_FIELDS = ('id', 'source') + tuple(INDEX_FIELDS) + tuple(SOURCE_FIELDS)
+DEFAULT_API_FIELDS = (
+    'id', 'source', 'property_type', 'status', 'configuration', 'commercial_type',
+    'location_name', 'area', 'min_price', 'max_price', 'project_name', 'url',
+)
+
+
+def parse_api_fields(value):
+    """Requested fields from a comma-separated `fields` parameter, and the unknown ones."""
+    if not value:
+        return list(DEFAULT_API_FIELDS), []
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    unknown = [field for field in fields if field not in LISTING_API_FIELDS]
+    return fields, unknown
+
+
+def index_columns(fields):
+    return [INDEX_FIELDS[field] for field in fields if field in INDEX_FIELDS]
+
+
+def serialize_listings(rows, fields):
+    """
+    API dicts for ListingIndex value rows (which carry source, source_id and the
+    index columns of `fields`), loading source columns only when asked for.
+    """
+    source_values = {}
+    wanted = [field for field in fields if field in SOURCE_FIELDS]
+    if wanted:
+        ids_by_source = {}
+        for row in rows:
+            ids_by_source.setdefault(row['source'], []).append(row['source_id'])
+        for source, ids in ids_by_source.items():
+            model = LISTING_SOURCE_MODELS[source]
+            model_fields = {field.name for field in model._meta.concrete_fields}
+            columns = {SOURCE_FIELDS[field] for field in wanted} & model_fields
+            values = model.objects.filter(id__in=ids).values('id', *columns)
+            source_values[source] = {value['id']: value for value in values}
+    results = []
+    for row in rows:
+        listing = source_values.get(row['source'], {}).get(row['source_id'], {})
+        result = {}
+        for field in fields:
+            if field == 'id':
+                result[field] = row['source_id']
+            elif field == 'source':
+                result[field] = row['source']
+            elif field in INDEX_FIELDS:
+                result[field] = row[INDEX_FIELDS[field]]
+            elif field == 'image':
+                result[field] = default_storage.url(listing['image']) if listing.get('image') else None
+            elif field == 'url':
+                slug = listing.get('slug')
+                result[field] = reverse('property:property_detail', kwargs={'slug': slug}) if slug else None
+            else:
+                result[field] = listing.get(SOURCE_FIELDS[field])
+        results.append(result)
+    return results
+
+
+def encode_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def dumps(payload):
+    return orjson.dumps(payload, default=encode_default)
+
+
+def listings_api_etag(request, *args, **kwargs):
+    """Changes whenever any listing changes or the query differs; needs no database access."""
+    query = sorted(request.GET.lists())
+    key = f"{LISTINGS_API_VERSION}:{get_listings_version()}:{query}"
+    return hashlib.md5(key.encode()).hexdigest()
@@ -0,0 +1,209 @@
+import threading
+from datetime import timedelta
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+from .listings import LISTING_CHOICE_FILTERS, SEARCH_SORT_ORDERS, get_listings_version
+from .geo import geo_location_ids
+from .models import ListingIndex
+
+'''
+In-process bitmap index over ListingIndex.
+
+The whole listing inventory is small enough to hold in every worker, so filtering
+it does not need a database round trip:
+
+- every value of a facet column (source, property type, category, status,
+  configuration, commercial type, furnishing, location, active) maps to a packed
+  bitset of row positions, so choice filters are bitwise ORs and ANDs;
+- area, minimum price and maximum price are kept as arrays sorted by value (ties by
+  id), so range filters and sorting are binary searches over them.
+
+Rows are held in the default (source, source_id) order. The index refreshes itself
+when the global listings version changes, re-reading only rows updated since the
+last refresh plus the id list to drop deleted ones. Queries with a text search or
+an ordering it does not know return None and are served from SQL instead.
+'''
+
+# Facet columns of ListingIndex held as bitsets.
+BITMAP_COLUMNS = (
+    'source', 'property_type', 'category', 'status', 'configuration',
+    'commercial_type', 'furnishing', 'location_id', 'is_active',
+)
+RANGE_COLUMNS = ('area', 'min_price', 'max_price')
+ROW_FIELDS = ('id', 'source_id') + BITMAP_COLUMNS + RANGE_COLUMNS
+
+# Scope conditions (see LISTING_SCOPES) as allowed values per column.
+BITMAP_SCOPES = {
+    'all': {'is_active': [True]},
+    'list': {'source': [ListingIndex.SOURCE_BUY], 'is_active': [True]},
+    'residential': {'property_type': ['residential']},
+    'commercial': {'property_type': ['commercial']},
+}
+
+# ListingIndex ordering -> (range column, descending); None keeps row order.
+BITMAP_ORDERINGS = {
+    SEARCH_SORT_ORDERS['default']: None,
+    SEARCH_SORT_ORDERS['price-low']: ('min_price', False),
+    SEARCH_SORT_ORDERS['price-high']: ('min_price', True),
+    SEARCH_SORT_ORDERS['area-low']: ('area', False),
+    SEARCH_SORT_ORDERS['area-high']: ('area', True),
+}
+
+# Rows updated this long before the previous refresh started are read again, to
+# cover clock differences between workers.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class BitmapMatches:
+    """
+    Row positions matching a query, in result order. Sliceable like a queryset; a
+    slice yields unsaved ListingIndex objects carrying the id, source and source_id
+    that hydrate_listings needs.
+    """
+
+    def __init__(self, snapshot, positions):
+        self.snapshot = snapshot
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, item):
+        positions = self.positions[item]
+        if not isinstance(item, slice):
+            return self.snapshot.entry(positions)
+        return [self.snapshot.entry(position) for position in positions]
+
+    def counts(self):
+        buy = self.snapshot.bitmap('source', ListingIndex.SOURCE_BUY)
+        buy_count = int(np.count_nonzero(np.unpackbits(buy, count=self.snapshot.size).astype(bool)[self.positions]))
+        return {'total': len(self), 'buy': buy_count, 'sell': len(self) - buy_count}
+
+
+class BitmapSnapshot:
+    """Immutable arrays and bitsets built from one set of rows; replaced on refresh."""
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (row[2], row[1]))
+        self.size = len(rows)
+        columns = dict(zip(ROW_FIELDS, zip(*rows))) if rows else {field: () for field in ROW_FIELDS}
+        self.ids = np.array(columns['id'], dtype=np.int64)
+        self.source_ids = np.array(columns['source_id'], dtype=np.int64)
+        self.sources = list(columns['source'])
+        self.bitmaps = {column: self._bitmaps_for(columns[column]) for column in BITMAP_COLUMNS}
+        self.empty = np.packbits(np.zeros(self.size, dtype=bool))
+        self.sorted = {column: self._sorted_for(columns[column]) for column in RANGE_COLUMNS}
+
+    def _bitmaps_for(self, values):
+        positions = {}
+        for position, value in enumerate(values):
+            positions.setdefault(value, []).append(position)
+        bitmaps = {}
+        for value, value_positions in positions.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[value_positions] = True
+            bitmaps[value] = np.packbits(mask)
+        return bitmaps
+
+    def _sorted_for(self, values):
+        """Positions sorted by value then id, the sorted values, and how many are not NULL."""
+        values = np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+        order = np.lexsort((self.ids, values))
+        non_null = int(np.count_nonzero(~np.isnan(values)))
+        return order, values[order], non_null
+
+    def bitmap(self, column, value):
+        return self.bitmaps[column].get(value, self.empty)
+
+    def entry(self, position):
+        return ListingIndex(
+            id=int(self.ids[position]),
+            source=self.sources[position],
+            source_id=int(self.source_ids[position])
+        )
+
+    def range_mask(self, column, low=None, high=None):
+        """Boolean mask of rows whose value lies in [low, high]; NULLs never match a bound."""
+        order, values, non_null = self.sorted[column]
+        start = int(np.searchsorted(values[:non_null], low, side='left')) if low is not None else 0
+        stop = int(np.searchsorted(values[:non_null], high, side='right')) if high is not None else non_null
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def ordered_positions(self, mask, ordering):
+        if ordering is None:
+            return np.flatnonzero(mask)
+        column, descending = ordering
+        order, _, non_null = self.sorted[column]
+        if not connection.features.nulls_order_largest:
+            # Match the database: NULLs sort first ascending and last descending.
+            order = np.concatenate((order[non_null:], order[:non_null]))
+        positions = order[mask[order]]
+        return positions[::-1] if descending else positions
+
+
+class ListingBitmapIndex:
+    """Per-process bitmap index over ListingIndex, refreshed by listings version."""
+
+    def __init__(self):
+        self.version = None
+        self.refreshed_at = None
+        self.snapshot = BitmapSnapshot([])
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        version = get_listings_version()
+        if version == self.version:
+            return self.snapshot
+        with self._lock:
+            if version != self.version:
+                started = timezone.now()
+                if self.refreshed_at is None:
+                    changed = ListingIndex.objects.all()
+                else:
+                    changed = ListingIndex.objects.filter(updated_at__gte=self.refreshed_at - REFRESH_OVERLAP)
+                    live_ids = set(ListingIndex.objects.values_list('id', flat=True))
+                    for entry_id in self._rows.keys() - live_ids:
+                        del self._rows[entry_id]
+                for row in changed.values_list(*ROW_FIELDS):
+                    self._rows[row[0]] = row
+                self.snapshot = BitmapSnapshot(self._rows.values())
+                self.version, self.refreshed_at = version, started
+        return self.snapshot
+
+    def query(self, scope, filters, ordering):
+        """
+        BitmapMatches for a parse_listing_filters spec within a scope, or None when the
+        query needs SQL (text search or an unknown ordering).
+        """
+        ordering = tuple(ordering)
+        if 'search' in filters or ordering not in BITMAP_ORDERINGS:
+            return None
+        snapshot = self.refresh()
+        conditions = dict(BITMAP_SCOPES[scope])
+        for param, column in LISTING_CHOICE_FILTERS.items():
+            if param in filters:
+                conditions[column] = filters[param]
+        location_ids = geo_location_ids(filters)
+        if location_ids is not None:
+            conditions['location_id'] = set(conditions.get('location_id', location_ids)) & set(location_ids)
+        packed = np.packbits(np.ones(snapshot.size, dtype=bool))
+        for column, allowed in conditions.items():
+            union = snapshot.empty
+            for value in allowed:
+                union = np.bitwise_or(union, snapshot.bitmap(column, value))
+            packed = np.bitwise_and(packed, union)
+        mask = np.unpackbits(packed, count=snapshot.size).astype(bool)
+        if 'budget_max' in filters:
+            mask &= snapshot.range_mask('min_price', 0, filters['budget_max'])
+        if 'budget_min' in filters:
+            mask &= snapshot.range_mask('max_price', filters['budget_min'])
+        if 'area_max' in filters:
+            mask &= snapshot.range_mask('area', high=filters['area_max'])
+        return BitmapMatches(snapshot, snapshot.ordered_positions(mask, BITMAP_ORDERINGS[ordering]))
+
+
+listing_bitmap_index = ListingBitmapIndex()
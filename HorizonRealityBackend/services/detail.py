@@ -0,0 +1,91 @@
+import hashlib
+from django.core.cache import cache
+from django.db.models import Prefetch
+from .listings import get_listings_version
+from .models import BuyProperties, SimilarProperty
+from .similarity import SIMILAR_PROPERTIES_K
+
+'''
+Everything the property detail page shows, loaded in a fixed number of queries.
+
+PropertyDetailBundle.load() reads the listing with its location joined, then
+prefetches its images, videos, nearby places, feature amenities and stored similar
+properties (with their locations joined): six queries however many of each there
+are, plus one for the fallback related list while similar properties are not
+computed yet. Every relation is materialized into a list, so rendering the page
+runs no further queries.
+
+get_property_detail_bundle() caches the bundle under the slug and the listings
+version, which is bumped when any listing, or a listing's media or amenities,
+changes (see services.signals).
+'''
+
+PROPERTY_DETAIL_TIMEOUT = 60 * 30
+
+
+class PropertyDetailBundle:
+    """A buy listing and the related rows its detail page renders."""
+
+    def __init__(self, property, images, videos, nearby_places, feature_amenities, related_properties):
+        self.property = property
+        self.images = images
+        self.videos = videos
+        self.nearby_places = nearby_places
+        self.feature_amenities = feature_amenities
+        self.related_properties = related_properties
+
+    @classmethod
+    def load(cls, slug):
+        """The bundle of the listing with `slug`; raises BuyProperties.DoesNotExist."""
+        property = (
+            BuyProperties.objects.select_related('locations')
+            .prefetch_related(
+                'images',
+                'videos',
+                'nearby_amenities',
+                'feature_amenities',
+                Prefetch(
+                    'similar_entries',
+                    queryset=SimilarProperty.objects.select_related('similar__locations').order_by('rank'),
+                ),
+            )
+            .get(slug=slug)
+        )
+        related_properties = [entry.similar for entry in property.similar_entries.all()]
+        if not related_properties:
+            # Not computed yet (new listing, or before the first rebuild).
+            related_properties = list(
+                BuyProperties.objects.filter(
+                    property_type=property.property_type,
+                    locations=property.locations_id,
+                    is_property_active=True
+                ).exclude(pk=property.pk).select_related('locations')[:SIMILAR_PROPERTIES_K]
+            )
+        return cls(
+            property=property,
+            images=list(property.images.all()),
+            videos=list(property.videos.all()),
+            nearby_places=list(property.nearby_amenities.all()),
+            feature_amenities=list(property.feature_amenities.all()),
+            related_properties=related_properties,
+        )
+
+    def context(self):
+        return {
+            'property': self.property,
+            'related_properties': self.related_properties,
+            'property_images': self.images,
+            'property_videos': self.videos,
+            'nearby_places': self.nearby_places,
+            'feature_amenities': self.feature_amenities,
+        }
+
+
+def get_property_detail_bundle(slug):
+    """The cached PropertyDetailBundle for `slug`; raises BuyProperties.DoesNotExist."""
+    key = f"property:detail:{get_listings_version()}:{hashlib.md5(slug.encode()).hexdigest()}"
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = PropertyDetailBundle.load(slug)
+        cache.set(key, bundle, PROPERTY_DETAIL_TIMEOUT)
+    return bundle
@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db.models import Case, Count, Value, When, CharField
+from .listings import LISTING_SCOPES, filter_listings, filters_digest, get_listings_version
+from .models import ListingIndex
+
+'''
+Faceted counts for the listing filter sidebars.
+
+For every facet dimension the counts are computed with one grouped query over
+ListingIndex, applying every active filter except the dimension's own, so each
+choice shows how many results selecting it would give. Results are cached under a
+key built from the normalized filter spec and the global listings version, which
+the listing signals bump on every change.
+'''
+
+FACETS_CACHE_TIMEOUT = 60 * 10
+
+# facet name -> (ListingIndex column, filter spec key it ignores)
+FACET_DIMENSIONS = {
+    'status': ('status', 'status'),
+    'configuration': ('configuration', 'configuration'),
+    'commercial_type': ('commercial_type', 'commercial_type'),
+    'furnishing': ('furnishing', 'furnishing'),
+    'location': ('location_id', 'locations'),
+}
+
+# (key, label, lower bound, upper bound) in rupees, bucketed on the minimum price.
+BUDGET_BUCKETS = [
+    ('under_25l', 'Under 25 Lakhs', None, 2500000),
+    ('25l_50l', '25 - 50 Lakhs', 2500000, 5000000),
+    ('50l_1cr', '50 Lakhs - 1 Crore', 5000000, 10000000),
+    ('1cr_2cr', '1 - 2 Crores', 10000000, 20000000),
+    ('2cr_5cr', '2 - 5 Crores', 20000000, 50000000),
+    ('above_5cr', 'Above 5 Crores', 50000000, None),
+]
+
+
+def budget_bucket_expression():
+    whens = [
+        When(min_price__lt=upper, then=Value(key))
+        for key, _, _, upper in BUDGET_BUCKETS if upper is not None
+    ]
+    return Case(*whens, default=Value(BUDGET_BUCKETS[-1][0]), output_field=CharField())
+
+
+def facets_cache_key(scope, filters):
+    return f"listings:facets:{get_listings_version()}:{scope}:{filters_digest(filters)}"
+
+
+def compute_facets(scope, filters):
+    """Count listings per facet value for the given scope and filter spec."""
+    base = ListingIndex.objects.filter(LISTING_SCOPES[scope])
+    facets = {}
+    for name, (column, filter_key) in FACET_DIMENSIONS.items():
+        rows = (
+            filter_listings(base, filters, exclude=(filter_key,))
+            .exclude(**{f'{column}__isnull': True})
+            .order_by()
+            .values(column)
+            .annotate(count=Count('id'))
+        )
+        facets[name] = {str(row[column]): row['count'] for row in rows}
+    rows = (
+        filter_listings(base, filters, exclude=('budget',))
+        .exclude(min_price__isnull=True)
+        .annotate(bucket=budget_bucket_expression())
+        .order_by()
+        .values('bucket')
+        .annotate(count=Count('id'))
+    )
+    facets['budget'] = {row['bucket']: row['count'] for row in rows}
+    return {
+        'scope': scope,
+        'total': filter_listings(base, filters).count(),
+        'facets': facets,
+        'budget_buckets': [
+            {'key': key, 'label': label, 'min': lower, 'max': upper}
+            for key, label, lower, upper in BUDGET_BUCKETS
+        ],
+    }
+
+
+def get_facets(scope, filters):
+    key = facets_cache_key(scope, filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(scope, filters)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
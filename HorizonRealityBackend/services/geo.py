@@ -0,0 +1,131 @@
+import math
+from django.db.models import Q
+
+'''
+Geohash helpers for radius and bounding-box search over PropertyLocation.
+
+Every location with coordinates stores its geohash. A geohash prefix is a grid cell,
+so the locations inside a bounding box are found by covering the box with a few
+cells of a suitable size and reading each cell as a prefix of the indexed geohash
+column (gh LIKE 'cell%', a range scan of the index). Only the candidates from those
+scans are checked exactly, instead of computing a haversine distance for every row.
+A prefix match does not depend on how the column's collation sorts punctuation, as
+a `gh < cell + '{'` bound would.
+'''
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+# Never cover a box with more cells than this; coarser cells are used instead.
+MAX_COVER_CELLS = 16
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        target, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """(latitude, longitude) span in degrees of a geohash cell of this length."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def radius_bounds(latitude, longitude, radius_km):
+    """(south, west, north, east) of the box enclosing a circle."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0),
+    )
+
+
+def cover_cells(south, west, north, east):
+    """Geohash prefixes of the cells covering a bounding box, as few as MAX_COVER_CELLS allows."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        rows = math.floor(north / lat_step) - math.floor(south / lat_step) + 1
+        columns = math.floor(east / lng_step) - math.floor(west / lng_step) + 1
+        if rows * columns <= MAX_COVER_CELLS:
+            break
+    cells = set()
+    lat = south
+    while True:
+        lng = west
+        while True:
+            cells.add(encode_geohash(min(lat, north), min(lng, east), precision))
+            if lng >= east:
+                break
+            lng = min(lng + lng_step, east)
+        if lat >= north:
+            break
+        lat = min(lat + lat_step, north)
+    return sorted(cells)
+
+
+def cells_q(cells, field='geohash'):
+    """Q object matching rows whose geohash falls in any of the cells, as index prefix scans."""
+    query = Q(pk__in=[])
+    for cell in cells:
+        query |= Q(**{f'{field}__startswith': cell})
+    return query
+
+
+def locations_in_bounds(south, west, north, east):
+    """PropertyLocation queryset of the locations inside a bounding box."""
+    from .models import PropertyLocation
+    return PropertyLocation.objects.filter(
+        cells_q(cover_cells(south, west, north, east)),
+        latitude__range=(south, north),
+        longitude__range=(west, east),
+    )
+
+
+def locations_near(latitude, longitude, radius_km):
+    """(location, distance in km) pairs within radius_km, nearest first."""
+    candidates = locations_in_bounds(*radius_bounds(latitude, longitude, radius_km))
+    nearby = []
+    for location in candidates:
+        distance = haversine_km(latitude, longitude, location.latitude, location.longitude)
+        if distance <= radius_km:
+            nearby.append((location, distance))
+    return sorted(nearby, key=lambda pair: pair[1])
+
+
+def geo_location_ids(filters):
+    """
+    Ids of the locations matched by the `near` (lat, lng, radius km) and `bbox`
+    (south, west, north, east) entries of a filter spec, or None if it has neither.
+    """
+    location_ids = None
+    if 'near' in filters:
+        location_ids = {location.id for location, _ in locations_near(*filters['near'])}
+    if 'bbox' in filters:
+        in_bounds = set(locations_in_bounds(*filters['bbox']).values_list('id', flat=True))
+        location_ids = in_bounds if location_ids is None else location_ids & in_bounds
+    return None if location_ids is None else sorted(location_ids)
@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .models import ImageDerivative
+
+'''
+Responsive derivatives of uploaded images.
+
+Listing cards, blog cards, testimonials and team photos used to link the original
+upload, often several megabytes. generate_image_derivatives() decodes an original
+once and writes it at each of IMAGE_DERIVATIVE_WIDTHS narrower than itself (plus its
+own width when it is narrower than the widest), as WebP and as progressive JPEG,
+under derivatives/<original name without extension>/<width>w.<format> (the storage
+may store it under a content name instead). Each copy is recorded as an
+ImageDerivative row.
+
+The fields in IMAGE_FIELDS are watched by services.signals: a newly uploaded file is
+handed to generate_image_derivatives_task once the save commits. Files that predate
+the pipeline are processed by `manage.py generate_image_derivatives`.
+
+The responsive_image template tag (services.templatetags.responsive_images) turns
+the derivatives of an image into srcset/sizes markup. image_derivatives() caches
+them per original, so rendering a card costs a cache lookup; images without
+derivatives yet are rendered as before.
+'''
+
+logger = logging.getLogger(__name__)
+
+# (app label, model, field) of every image shown in a resizable slot.
+IMAGE_FIELDS = (
+    ('services', 'BuyProperties', 'image'),
+    ('services', 'PropertyImage', 'image'),
+    ('home', 'ServiceImage', 'image'),
+    ('home', 'Testimonial', 'photo'),
+    ('home', 'TeamMember', 'profile_picture'),
+    ('blogs', 'Blog', 'image'),
+)
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVES_CACHE_TIMEOUT = 60 * 60 * 24
+# A missing entry is re-checked sooner, as the task may still be running.
+NO_DERIVATIVES_CACHE_TIMEOUT = 60 * 5
+ORIENTATION_TAG = 0x0112
+ENCODERS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivative_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def image_fields():
+    """model -> names of its fields listed in IMAGE_FIELDS."""
+    fields = {}
+    for app_label, model_name, field_name in IMAGE_FIELDS:
+        fields.setdefault(apps.get_model(app_label, model_name), []).append(field_name)
+    return fields
+
+
+def image_sources():
+    """Storage names of every image stored in the IMAGE_FIELDS, without duplicates."""
+    names = {}
+    for model, field_names in image_fields().items():
+        for field_name in field_names:
+            queryset = model._base_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            names.update(dict.fromkeys(queryset.values_list(field_name, flat=True).order_by('pk').iterator()))
+    return list(names)
+
+
+def target_widths(width):
+    widths = derivative_widths()
+    targets = [target for target in widths if target < width]
+    if widths and width <= widths[-1]:
+        targets.append(width)
+    return targets
+
+
+def derivative_name(source, width, format):
+    return posixpath.join(DERIVATIVES_DIR, posixpath.splitext(source)[0], f"{width}w.{format}")
+
+
+def encode(image, format):
+    if format == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, **ENCODERS[format])
+    return buffer.getvalue()
+
+
+def generate_image_derivatives(source):
+    """
+    Write the derivatives of the image stored as `source` and replace its
+    ImageDerivative rows. Returns how many files were written; 0 when the original
+    is missing or not an image Pillow can read.
+    """
+    try:
+        with default_storage.open(source) as handle:
+            image = Image.open(handle)
+            # Let the JPEG decoder scale down by a power of two when the widest target
+            # allows; orientations 5 to 8 swap the stored width and height.
+            rotated = image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+            width, height = (image.height, image.width) if rotated else image.size
+            widest = target_widths(width)[-1]
+            draft_size = (widest, widest * height // width)
+            image.draft('RGB', draft_size[::-1] if rotated else draft_size)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        logger.warning("Could not read image %s for derivatives", source, exc_info=True)
+        return 0
+    image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') and image.has_transparency_data else 'RGB')
+    widths = target_widths(image.width)
+
+    encoded = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for format in ENCODERS:
+            encoded.append((width, height, format, encode(resized, format)))
+
+    derivatives = []
+    with transaction.atomic():
+        stale = ImageDerivative.objects.filter(source=source)
+        # Released before the new copies are saved, as they may get the same names.
+        for name in stale.values_list('file', flat=True):
+            default_storage.delete(name)
+        stale.delete()
+        for width, height, format, data in encoded:
+            name = default_storage.save(derivative_name(source, width, format), ContentFile(data))
+            derivatives.append(ImageDerivative(
+                source=source, format=format, width=width, height=height, file=name, size=len(data)
+            ))
+        ImageDerivative.objects.bulk_create(derivatives)
+    cache.set(derivatives_cache_key(source), derivative_srcsets(derivatives), DERIVATIVES_CACHE_TIMEOUT)
+    return len(derivatives)
+
+
+def rename_derivative_source(old, new):
+    """Point the derivatives of `old` at `new` after the original was renamed; `new` keeps its own if it has any."""
+    if ImageDerivative.objects.filter(source=new).exists():
+        for name in ImageDerivative.objects.filter(source=old).values_list('file', flat=True):
+            default_storage.delete(name)
+        ImageDerivative.objects.filter(source=old).delete()
+    else:
+        ImageDerivative.objects.filter(source=old).update(source=new)
+    cache.delete_many([derivatives_cache_key(old), derivatives_cache_key(new)])
+
+
+def enqueue_image_derivatives(sources):
+    from .tasks import generate_image_derivatives_task
+    try:
+        generate_image_derivatives_task.delay(sources)
+    except Exception:
+        # `manage.py generate_image_derivatives` picks them up if the broker is unavailable.
+        logger.exception("Could not enqueue image derivatives for %s", sources)
+
+
+def derivatives_cache_key(source):
+    return f"image_derivatives:{hashlib.md5(source.encode()).hexdigest()}"
+
+
+def derivative_srcsets(derivatives):
+    """format -> [(file name, width), ...] by increasing width."""
+    srcsets = {}
+    for derivative in sorted(derivatives, key=lambda derivative: derivative.width):
+        srcsets.setdefault(derivative.format, []).append((str(derivative.file), derivative.width))
+    return srcsets
+
+
+def image_derivatives(source):
+    """The cached derivative_srcsets() of the image stored as `source`; empty when there are none yet."""
+    key = derivatives_cache_key(source)
+    srcsets = cache.get(key)
+    if srcsets is None:
+        srcsets = derivative_srcsets(ImageDerivative.objects.filter(source=source))
+        cache.set(key, srcsets, DERIVATIVES_CACHE_TIMEOUT if srcsets else NO_DERIVATIVES_CACHE_TIMEOUT)
+    return srcsets
@@ -0,0 +1,527 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
+import time
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+from .models import BuyProperties, SellResidentialProperties, SellCommercialProperties, ListingIndex, to_rupees
+from .search import get_search_backend
+from .geo import geo_location_ids
+
+'''
+Helpers shared by every page that searches listings.
+
+- parse_listing_filters / filter_listings: turn request parameters into a normalized
+  filter spec and apply it to ListingIndex.
+- hydrate_listings: load the source objects behind a page of ListingIndex rows. The
+  search pages filter, sort and paginate on ListingIndex; only the rows of the current
+  page are then loaded from their source tables, so the cost of a page does not depend
+  on the size of the inventory.
+- get_listings_version / bump_listings_version: a global generation counter bumped
+  whenever a listing changes. Cached listing data embeds it in its key, so a bump
+  invalidates everything at once without per-key purging.
+- keyset_page / count_listings: cursor pagination on the (sort key, id) of the last
+  row shown, with the total served from a versioned cache, so a deep page costs the
+  same as the first one.
+- listing_results / cached_results: the ordered ids and counts of a search, cached
+  under its canonical filter spec and the listings version. The same filters from
+  any page share one entry, and a listing change retires them all without purging.
+'''
+
+LISTINGS_VERSION_KEY = 'listings:version'
+LISTINGS_RESULTS_TIMEOUT = 60 * 10
+# Cached search results keep this many ids; pages past them are read from the database.
+LISTINGS_RESULTS_MAX_IDS = 1000
+DEFAULT_NEAR_RADIUS_KM = 5
+
+LISTING_SOURCE_MODELS = {
+    ListingIndex.SOURCE_BUY: BuyProperties,
+    ListingIndex.SOURCE_SELL_RESIDENTIAL: SellResidentialProperties,
+    ListingIndex.SOURCE_SELL_COMMERCIAL: SellCommercialProperties,
+}
+
+# Ordering for results of a text search; only valid on querysets filtered by `search`.
+RELEVANCE_ORDER = ('-search_rank', 'id')
+
+SEARCH_SORT_ORDERS = {
+    'default': ('source', 'source_id'),
+    'price-low': ('min_price', 'id'),
+    'price-high': ('-min_price', '-id'),
+    'area-low': ('area', 'id'),
+    'area-high': ('-area', '-id'),
+}
+
+
+# Multi-valued request parameters and the ListingIndex column each one filters.
+LISTING_CHOICE_FILTERS = {
+    'property_type': 'property_type',
+    'category': 'category',
+    'status': 'status',
+    'configuration': 'configuration',
+    'commercial_type': 'commercial_type',
+    'furnishing': 'furnishing',
+    'locations': 'location_id',
+}
+
+LISTING_SCOPES = {
+    'all': Q(is_active=True),
+    # `is_active__in` compiles to `is_active IN (1)`, an equality the (source, is_active, ...)
+    # indexes can seek on; `is_active=True` becomes a bare `is_active` test they cannot.
+    'list': Q(source=ListingIndex.SOURCE_BUY, is_active__in=[True]),
+    'residential': Q(property_type='residential'),
+    'commercial': Q(property_type='commercial'),
+}
+# The JSON API never serves withdrawn listings, whatever the scope.
+API_LISTING_SCOPES = {
+    **LISTING_SCOPES,
+    'residential': LISTING_SCOPES['residential'] & Q(is_active=True),
+    'commercial': LISTING_SCOPES['commercial'] & Q(is_active=True),
+}
+
+
+def get_generation(key):
+    """Current value of a generation counter kept in the cache."""
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so an evicted counter never repeats an old value.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_generation(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_generation(key)
+
+
+def get_listings_version():
+    return get_generation(LISTINGS_VERSION_KEY)
+
+
+def bump_listings_version():
+    return bump_generation(LISTINGS_VERSION_KEY)
+
+
+def parse_lakhs(value):
+    """Convert a budget typed in lakhs (as the property list filters expect) to rupees."""
+    if not value:
+        return None
+    try:
+        return to_rupees(Decimal(value), 'lakhs')
+    except InvalidOperation:
+        return None
+
+
+def parse_int(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_floats(value, count):
+    """A comma-separated list of exactly `count` numbers, or None."""
+    if not value:
+        return None
+    values = [parse_float(part) for part in value.split(',')]
+    if len(values) != count or None in values:
+        return None
+    return values
+
+
+def parse_listing_filters(params, scope=None):
+    """
+    Normalize search request parameters into a filter spec with sorted values and
+    rupee-denominated budgets, so equal searches always produce equal specs.
+
+    Understands both the property list parameters (location, min_budget/max_budget in
+    lakhs, search) and the buy search form parameters (locations, budget_range in
+    rupees, area_range), plus `near=lat,lng` with `radius` in km and
+    `bbox=south,west,north,east` for geographic searches. The commercial search form
+    submits its type checkboxes as `configuration`; in the commercial scope they
+    filter `commercial_type`.
+    """
+    filters = {}
+    for param in LISTING_CHOICE_FILTERS:
+        values = [value for value in params.getlist(param) if value and value != 'all']
+        if param == 'locations':
+            values += [value for value in params.getlist('location') if value]
+            values = [int(value) for value in values if str(value).isdigit()]
+        if param == 'commercial_type' and scope == 'commercial':
+            values += [value for value in params.getlist('configuration') if value]
+        if param == 'configuration' and scope == 'commercial':
+            continue
+        if values:
+            filters[param] = sorted(set(values))
+    budget_min = parse_lakhs(params.get('min_budget'))
+    budget_max = parse_lakhs(params.get('max_budget'))
+    if params.get('budget_range'):
+        budget_max = parse_int(params.get('budget_range'))
+    if budget_min is not None:
+        filters['budget_min'] = budget_min
+    if budget_max is not None:
+        filters['budget_max'] = budget_max
+    area_max = parse_int(params.get('area_range'))
+    if area_max is not None:
+        filters['area_max'] = area_max
+    search = params.get('search', '').strip()
+    if search:
+        filters['search'] = search
+    near = parse_floats(params.get('near'), 2)
+    if near is not None:
+        filters['near'] = near + [parse_float(params.get('radius')) or DEFAULT_NEAR_RADIUS_KM]
+    bbox = parse_floats(params.get('bbox'), 4)
+    if bbox is not None:
+        filters['bbox'] = bbox
+    return filters
+
+
+def filters_digest(filters):
+    """Stable short digest of a filter spec, for use in cache keys."""
+    return hashlib.md5(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+
+
+def filter_listings(queryset, filters, exclude=()):
+    """Apply a parse_listing_filters spec to a ListingIndex queryset, skipping the keys in exclude."""
+    for param, column in LISTING_CHOICE_FILTERS.items():
+        if param in filters and param not in exclude:
+            queryset = queryset.filter(**{f'{column}__in': filters[param]})
+    if 'budget' not in exclude:
+        queryset = queryset.filter(price_overlap_q(
+            low=filters.get('budget_min'),
+            high=filters.get('budget_max'),
+            min_field='min_price',
+            max_field='max_price'
+        ))
+    if 'area_max' in filters:
+        queryset = queryset.filter(area__lte=filters['area_max'])
+    location_ids = geo_location_ids(filters)
+    if location_ids is not None:
+        queryset = queryset.filter(location_id__in=location_ids)
+    if 'search' in filters:
+        queryset = get_search_backend().search(queryset, filters['search'])
+    return queryset
+
+
+def price_overlap_q(low=None, high=None, min_field='min_budget_inr', max_field='max_budget_inr'):
+    """
+    Q object matching listings whose [min, max] rupee price range overlaps [low, high].
+    Either bound may be omitted for an open-ended range.
+
+    Prices are never negative, so the upper bound is written as a closed range on the
+    minimum price; planners estimate a bounded range far better than a one-sided one.
+    """
+    query = Q()
+    if high is not None:
+        query &= Q(**{f'{min_field}__range': (0, high)})
+    if low is not None:
+        query &= Q(**{f'{max_field}__gte': low})
+    return query
+
+
+# Columns read by the listing cards (services/property_card.html and the buy search
+# result pages); any other field would be loaded with one query per card.
+LISTING_CARD_FIELDS = {
+    ListingIndex.SOURCE_BUY: (
+        'slug', 'project_name', 'property_type', 'status', 'configuration', 'commercial_type',
+        'furnishing', 'area', 'min_budget', 'min_budget_unit', 'max_budget', 'max_budget_unit',
+        'image', 'salient_features', 'locations__name',
+    ),
+    ListingIndex.SOURCE_SELL_RESIDENTIAL: (
+        'project_name', 'status', 'configuration', 'area', 'budget', 'image',
+        'additional_details', 'contact_name', 'locations__name',
+    ),
+    ListingIndex.SOURCE_SELL_COMMERCIAL: (
+        'project_name', 'status', 'commercial_type', 'furnishing', 'area', 'budget', 'image',
+        'additional_details', 'contact_name', 'locations__name',
+    ),
+}
+
+
+def prepare_listing(listing, source):
+    """Annotate a buy/sell object with the attributes the search result cards expect."""
+    listing.property_source = 'buy' if source == ListingIndex.SOURCE_BUY else 'sell'
+    listing.is_sell_property = source != ListingIndex.SOURCE_BUY
+    if listing.is_sell_property:
+        listing.min_budget = listing.budget
+        listing.max_budget = listing.budget
+        listing.min_budget_unit = 'rupees'
+        listing.max_budget_unit = 'rupees'
+        listing.salient_features = listing.additional_details or ''
+    return listing
+
+
+def hydrate_listings(entries, fields=LISTING_CARD_FIELDS):
+    """
+    Load the source objects behind a page of ListingIndex rows, keeping the page order.
+    Issues one query per source present on the page, reading only `fields` per source
+    (pass None for whole objects).
+    """
+    entries = list(entries)
+    ids_by_source = {}
+    for entry in entries:
+        ids_by_source.setdefault(entry.source, []).append(entry.source_id)
+    loaded = {}
+    for source, ids in ids_by_source.items():
+        queryset = LISTING_SOURCE_MODELS[source].objects.select_related('locations')
+        if fields is not None:
+            queryset = queryset.only(*fields[source])
+        loaded[source] = queryset.in_bulk(ids)
+    listings = []
+    for entry in entries:
+        listing = loaded[entry.source].get(entry.source_id)
+        if listing is not None:
+            listings.append(prepare_listing(listing, entry.source))
+    return listings
+
+
+def cached_results(namespace, spec, compute):
+    """
+    compute() cached under a canonical spec (a parse_listing_filters spec, or any
+    JSON-serializable dict of normalized criteria) until the next listing change.
+    The key embeds the listings version, so a bump retires every entry at once.
+    """
+    key = f"listings:{namespace}:{get_listings_version()}:{filters_digest(spec)}"
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, LISTINGS_RESULTS_TIMEOUT)
+    return result
+
+
+def count_listings(queryset, scope, filters):
+    """
+    Total, buy and sell counts for a filtered ListingIndex queryset, cached until the
+    next listing change so paging through results does not repeat the COUNT.
+    """
+    def compute():
+        counts = queryset.order_by().aggregate(
+            total=Count('id'),
+            buy=Count('id', filter=Q(source=ListingIndex.SOURCE_BUY)),
+        )
+        counts['sell'] = counts['total'] - counts['buy']
+        return counts
+    return cached_results('count', {'scope': scope, 'filters': filters}, compute)
+
+
+def cached_ids(namespace, spec, queryset):
+    """
+    The ordered ids of a flat values_list('id') queryset (the first
+    LISTINGS_RESULTS_MAX_IDS of them) and its total, cached like cached_results.
+    """
+    def compute():
+        ids = list(queryset[:LISTINGS_RESULTS_MAX_IDS + 1])
+        total = len(ids) if len(ids) <= LISTINGS_RESULTS_MAX_IDS else queryset.count()
+        return {'ids': ids[:LISTINGS_RESULTS_MAX_IDS], 'total': total}
+    return cached_results(namespace, spec, compute)
+
+
+def listing_results(queryset, scope, filters, ordering):
+    """
+    The ordered ListingIndex ids of a search (the first LISTINGS_RESULTS_MAX_IDS) with
+    its total, buy and sell counts, cached until the next listing change. When every
+    row fits, the counts come from the same query as the ids.
+    """
+    def compute():
+        rows = list(queryset.order_by(*ordering).values_list('id', 'source')[:LISTINGS_RESULTS_MAX_IDS + 1])
+        if len(rows) <= LISTINGS_RESULTS_MAX_IDS:
+            buy = sum(1 for _, source in rows if source == ListingIndex.SOURCE_BUY)
+            counts = {'total': len(rows), 'buy': buy, 'sell': len(rows) - buy}
+        else:
+            counts = count_listings(queryset, scope, filters)
+        return {'ids': [row[0] for row in rows[:LISTINGS_RESULTS_MAX_IDS]], **counts}
+    return cached_results('results', {'scope': scope, 'filters': filters, 'ordering': list(ordering)}, compute)
+
+
+class CachedResults:
+    """
+    A search's results as a sequence a Paginator can slice. Slices within the cached
+    ids load their ListingIndex rows by primary key; slices past them run `queryset`
+    (already filtered and ordered) with an offset.
+    """
+
+    def __init__(self, queryset, ids, total):
+        self.queryset = queryset
+        self.ids = ids
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if len(self.ids) < self.total and (item.stop is None or item.stop > len(self.ids)):
+            return list(self.queryset[item])
+        ids = self.ids[item]
+        rows = ListingIndex.objects.only('source', 'source_id').in_bulk(ids)
+        return [rows[entry_id] for entry_id in ids if entry_id in rows]
+
+
+class CountedPaginator(Paginator):
+    """Paginator that takes its total from the caller instead of running COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
+
+
+def encode_cursor(ordering, values):
+    payload = json.dumps([list(ordering), values], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, ordering):
+    """
+    Decode a cursor token into its sort key values. Returns None when the token is
+    malformed or was issued for a different ordering, which restarts at the first page.
+    """
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        cursor_ordering, values = payload
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if cursor_ordering != list(ordering) or not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    return values
+
+
+def _after_value_q(field, value, descending):
+    """
+    Q objects for rows sorting strictly after `value` on `field`, and for rows tied with
+    it, following the database's own NULL placement so the ORDER BY can use its index.
+    """
+    nulls_largest = connection.features.nulls_order_largest
+    if value is None:
+        tied = Q(**{f'{field}__isnull': True})
+        after = Q(**{f'{field}__isnull': False}) if nulls_largest == descending else Q(pk__in=[])
+        return after, tied
+    after = Q(**{f'{field}__lt' if descending else f'{field}__gt': value})
+    if nulls_largest != descending:
+        after |= Q(**{f'{field}__isnull': True})
+    return after, Q(**{field: value})
+
+
+def keyset_after_q(ordering, values):
+    """Q object matching the rows that follow the row with sort key `values` in `ordering`."""
+    query = Q(pk__in=[])
+    tied_so_far = Q()
+    for order, value in zip(ordering, values):
+        field = order.lstrip('-')
+        after, tied = _after_value_q(field, value, order.startswith('-'))
+        query |= tied_so_far & after
+        tied_so_far &= tied
+    return query
+
+
+class KeysetPage:
+    """One page of keyset pagination: the rows, and the cursor of the page after it."""
+
+    def __init__(self, object_list, next_cursor, total):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def keyset_page(queryset, ordering, cursor, per_page, total=None):
+    """
+    Fetch the page of `queryset` that follows `cursor` in `ordering`, which must be
+    unique per row (end it with the primary key). Works on model and values()
+    querysets. One extra row is read to tell whether another page exists.
+    """
+    values = decode_cursor(cursor, ordering)
+    if values is not None:
+        try:
+            queryset = queryset.filter(keyset_after_q(ordering, values))
+        except (ValueError, TypeError, ValidationError):
+            pass
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        fields = [order.lstrip('-') for order in ordering]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(ordering, [last[field] for field in fields])
+        else:
+            next_cursor = encode_cursor(ordering, [getattr(last, field) for field in fields])
+    return KeysetPage(rows, next_cursor, total)
+
+
+def paginate_listings(params, queryset, ordering, per_page, total):
+    """
+    Paginate ListingIndex rows by page number, or by cursor when the request has a
+    `cursor` parameter (an empty one starts at the first page). Either way the page's
+    object_list holds ListingIndex rows, ready for hydrate_listings.
+    """
+    if 'cursor' in params:
+        return keyset_page(queryset, ordering, params.get('cursor'), per_page, total)
+    paginator = CountedPaginator(queryset.order_by(*ordering), per_page, count=total)
+    return paginator.get_page(params.get('page'))
+
+
+def find_listings(params, scope, filters, ordering, per_page):
+    """
+    The requested page of ListingIndex rows matching a filter spec, and the counts.
+
+    Page-number requests are answered from the in-process ListingBitmapIndex when
+    LISTING_BITMAP_INDEX is on and the query allows it. Otherwise the ordered ids and
+    counts of the search come from the versioned result cache, and a page costs one
+    primary-key lookup once they are cached; cursor requests page in SQL.
+    """
+    if settings.LISTING_BITMAP_INDEX and 'cursor' not in params:
+        from .bitmaps import listing_bitmap_index
+        matches = listing_bitmap_index.query(scope, filters, ordering)
+        if matches is not None:
+            counts = matches.counts()
+            paginator = CountedPaginator(matches, per_page, count=counts['total'])
+            return paginator.get_page(params.get('page')), counts
+    listings = filter_listings(ListingIndex.objects.filter(LISTING_SCOPES[scope]), filters)
+    results = listing_results(listings, scope, filters, ordering)
+    counts = {key: results[key] for key in ('total', 'buy', 'sell')}
+    if 'cursor' in params:
+        page = keyset_page(page_columns(listings, ordering), ordering, params.get('cursor'), per_page, counts['total'])
+    else:
+        matches = CachedResults(page_columns(listings, ordering).order_by(*ordering), results['ids'], counts['total'])
+        page = CountedPaginator(matches, per_page, count=counts['total']).get_page(params.get('page'))
+    return page, counts
+
+
+def page_columns(queryset, ordering):
+    """Restrict a ListingIndex queryset to the columns hydration and the cursor need."""
+    columns = {'source', 'source_id'} | {order.lstrip('-') for order in ordering}
+    return queryset.only(*(columns - set(queryset.query.annotations)))
@@ -0,0 +1,179 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+from services.listings import filter_listings
+from services.models import BuyProperties, ListingIndex, PropertyLocation, SavedSearch
+from services.saved_searches import SavedSearchMatcher, queue_alerts, saved_search_filters
+from services.search import get_search_backend
+from users.models import CustomUser
+
+'''
+Measures saved-search matching throughput.
+
+Inside a transaction that is rolled back, inserts --searches synthetic saved searches
+spread over --users users and a batch of --listings new listings, then times:
+
+- compiling the matcher from the saved_search table;
+- matching the batch against every search in one pass, including text filters;
+- queueing the deduplicated alerts.
+
+For comparison, --sample searches are also run the naive way, one listing query per
+search, and their results are checked against the matcher's. The naive time is
+extrapolated to all searches.
+
+Usage:
+    python manage.py benchmark_saved_searches
+    python manage.py benchmark_saved_searches --searches 100000 --listings 1000 --sample 500
+'''
+
+STATUSES = [choice for choice, _ in BuyProperties.STATUS_CHOICES]
+CONFIGURATIONS = [choice for choice, _ in BuyProperties.RESIDENTIAL_CONFIG_CHOICES]
+COMMERCIAL_TYPES = [choice for choice, _ in BuyProperties.COMMERCIAL_TYPE_CHOICES]
+FURNISHINGS = [choice for choice, _ in BuyProperties.FURNISHING_CHOICES]
+SEARCH_WORDS = ['garden', 'metro', 'corner', 'lake', 'premium', 'highway', 'school', 'club']
+
+
+class Command(BaseCommand):
+    help = "Benchmark matching new listings against saved searches (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--searches', type=int, default=100000, help="Saved searches to insert")
+        parser.add_argument('--users', type=int, default=20000, help="Users owning the searches")
+        parser.add_argument('--listings', type=int, default=1000, help="New listings to match")
+        parser.add_argument('--locations', type=int, default=200, help="Locations to spread listings over")
+        parser.add_argument('--sample', type=int, default=200, help="Searches to also run one query each")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            location_ids = self.seed_locations(options['locations'], rng)
+            self.seed_searches(options['searches'], options['users'], location_ids, rng)
+            entries = self.seed_listings(options['listings'], location_ids, rng)
+
+            started = time.perf_counter()
+            matcher = SavedSearchMatcher.from_database()
+            compiled = time.perf_counter()
+            results = matcher.match(entries)
+            matched = time.perf_counter()
+            queued = queue_alerts(matcher, results)
+            finished = time.perf_counter()
+
+            naive_time, mismatches, sample = self.compare_naive(matcher, results, entries, options['sample'], rng)
+            transaction.set_rollback(True)
+
+        match_time = matched - compiled
+        pairs = matcher.size * len(entries)
+        self.stdout.write(f"Saved searches:     {matcher.size}")
+        self.stdout.write(f"Listings matched:   {len(entries)}")
+        self.stdout.write(f"Compile matcher:    {compiled - started:.3f}s")
+        self.stdout.write(
+            f"Match:              {match_time:.3f}s "
+            f"({len(entries) / match_time:.0f} listings/s, {pairs / match_time:,.0f} search checks/s)"
+        )
+        matches = sum(len(positions) for _, positions in results)
+        self.stdout.write(
+            f"Queue alerts:       {finished - matched:.3f}s "
+            f"({matches} matches, {queued} alerts after per-user dedupe, {queued / (finished - matched):.0f} alerts/s)"
+        )
+        if sample:
+            estimate = naive_time / sample * matcher.size
+            self.stdout.write(
+                f"One query/search:   {naive_time:.3f}s for {sample} searches, "
+                f"~{estimate:.1f}s for all ({estimate / match_time:.0f}x slower)"
+            )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} sampled searches matched differently from SQL"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sampled searches match SQL exactly."))
+
+    def seed_locations(self, count, rng):
+        locations = PropertyLocation.objects.bulk_create([
+            PropertyLocation(name=f"Benchmark Location {i}") for i in range(count)
+        ])
+        return [location.pk for location in locations]
+
+    def seed_searches(self, count, user_count, location_ids, rng):
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f"saved-search-benchmark-{i}@example.com") for i in range(user_count)
+        ], batch_size=1000)
+        searches = []
+        for i in range(count):
+            scope = 'residential' if rng.random() < 0.8 else 'commercial'
+            params = QueryDict(mutable=True)
+            if rng.random() < 0.5:
+                params.setlist('status', rng.sample(STATUSES, rng.randint(1, 2)))
+            if rng.random() < 0.7:
+                params.setlist('configuration', rng.sample(
+                    CONFIGURATIONS if scope == 'residential' else COMMERCIAL_TYPES, rng.randint(1, 2)
+                ))
+            if scope == 'commercial' and rng.random() < 0.3:
+                params.setlist('furnishing', [rng.choice(FURNISHINGS)])
+            if rng.random() < 0.8:
+                params.setlist('locations', [str(value) for value in rng.sample(location_ids, rng.randint(1, 3))])
+            if rng.random() < 0.6:
+                params['budget_range'] = str(rng.choice([25, 50, 75, 100, 150, 300]) * 100000)
+            if rng.random() < 0.2:
+                params['area_range'] = str(rng.choice([800, 1200, 2000, 5000]))
+            if rng.random() < 0.03:
+                params['search'] = rng.choice(SEARCH_WORDS)
+            query = params.urlencode()
+            searches.append(SavedSearch(
+                user=users[i % len(users)],
+                scope=scope,
+                query=query,
+                filters=saved_search_filters(scope, query)
+            ))
+        SavedSearch.objects.bulk_create(searches, batch_size=1000)
+
+    def seed_listings(self, count, location_ids, rng):
+        entries = []
+        for i in range(count):
+            residential = rng.random() < 0.8
+            min_price = rng.randint(10, 400) * 100000
+            entries.append(ListingIndex(
+                source=ListingIndex.SOURCE_BUY,
+                source_id=10 ** 9 + i,
+                property_type='residential' if residential else 'commercial',
+                status=rng.choice(STATUSES),
+                configuration=rng.choice(CONFIGURATIONS) if residential else None,
+                commercial_type=None if residential else rng.choice(COMMERCIAL_TYPES),
+                furnishing=None if residential else rng.choice(FURNISHINGS),
+                location_id=rng.choice(location_ids),
+                area=rng.randint(400, 6000),
+                min_price=min_price,
+                max_price=min_price * rng.choice([1, 1, 2]),
+                is_active=True,
+                search_text=' '.join(rng.sample(SEARCH_WORDS, 2)),
+            ))
+        entries = ListingIndex.objects.bulk_create(entries, batch_size=1000)
+        backend = get_search_backend()
+        for entry in entries:
+            backend.index(entry)
+        return entries
+
+    def compare_naive(self, matcher, results, entries, sample_size, rng):
+        """Time one listing query per sampled search and count those whose matches differ."""
+        sample = rng.sample(range(matcher.size), min(sample_size, matcher.size))
+        if not sample:
+            return 0.0, 0, 0
+        matched_by_search = {}
+        for entry, positions in results:
+            for position in positions.tolist():
+                matched_by_search.setdefault(position, set()).add(entry.id)
+        searches = SavedSearch.objects.in_bulk([int(matcher.search_ids[position]) for position in sample])
+        entry_ids = [entry.id for entry in entries]
+        mismatches = 0
+        started = time.perf_counter()
+        for position in sample:
+            search = searches[int(matcher.search_ids[position])]
+            queryset = ListingIndex.objects.filter(id__in=entry_ids, is_active=True)
+            if search.scope == 'commercial':
+                queryset = queryset.filter(property_type='commercial')
+            else:
+                queryset = queryset.filter(property_type='residential')
+            expected = set(filter_listings(queryset, search.filters).values_list('id', flat=True))
+            mismatches += expected != matched_by_search.get(position, set())
+        return time.perf_counter() - started, mismatches, len(sample)
@@ -0,0 +1,237 @@
+import json
+import re
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from home.content import home_page_listings
+from services.listings import (
+    LISTING_SCOPES, SEARCH_SORT_ORDERS, filter_listings, keyset_after_q, price_overlap_q
+)
+from services.models import (
+    BuyProperties, SellResidentialProperties, SellCommercialProperties,
+    ListingIndex, PropertyLocation, UserFavorite, to_rupees
+)
+
+'''
+Runs EXPLAIN on the listing queries the site serves and fails when any of them
+falls back to a full table scan, or narrows ListingIndex by `source` alone when it
+filters on more columns.
+
+The query shapes mirror property_list_view, the buy search result views, index_view,
+send_weekly_property_newsletter, the chatbot and the favorites views. With --seed the
+tables are filled with synthetic listings inside a transaction that is rolled back,
+so the planner sees a realistic row count without leaving data behind.
+
+Usage:
+    python manage.py explain_listing_queries
+    python manage.py explain_listing_queries --seed 5000 --verbose
+'''
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)(?! USING)(?:\s|$)')
+# A seek on `source` alone still reads every buy listing, most of the table.
+SQLITE_SOURCE_ONLY_SEEK = re.compile(r'\bSEARCH (\w+) USING (?:COVERING )?INDEX \w+ \(source=\?\)')
+POSTGRES_SOURCE_ONLY_SEEK = re.compile(r"on (\w+)[^\n]*\n\s*Index Cond: \(\(source\)::text = '[^']*'::text\)\n")
+
+
+def listing_queries():
+    """The (name, queryset) pairs checked by the command, sliced the way the views slice them."""
+    location_id = PropertyLocation.objects.values_list('id', flat=True).first() or 0
+    week_ago = timezone.now() - timedelta(days=7)
+    active = BuyProperties.objects.filter(is_property_active=True)
+    listed = ListingIndex.objects.filter(LISTING_SCOPES['list'])
+    list_order = SEARCH_SORT_ORDERS['default']
+    return [
+        ('property_list: type + status', filter_listings(
+            listed, {'property_type': ['residential'], 'status': ['new']}
+        ).order_by(*list_order)[:6]),
+        ('property_list: category', filter_listings(listed, {'category': ['investment']}).order_by(*list_order)[:6]),
+        ('property_list: configuration', filter_listings(listed, {'configuration': ['2bhk']}).order_by(*list_order)[:6]),
+        ('property_list: location', filter_listings(listed, {'locations': [location_id]}).order_by(*list_order)[:6]),
+        ('property_list: budget', filter_listings(listed, {
+            'budget_min': to_rupees(Decimal(40), 'lakhs'), 'budget_max': to_rupees(Decimal(45), 'lakhs')
+        }).order_by(*list_order)[:6]),
+        ('property_list: cursor page', listed.filter(
+            keyset_after_q(list_order, [ListingIndex.SOURCE_BUY, 1000])
+        ).order_by(*list_order)[:7]),
+        ('index_view: home page listings', home_page_listings()),
+        ('newsletter: recent active', active.filter(created_at__gte=week_ago).order_by('-created_at')),
+        ('chatbot: configuration + status', active.filter(configuration='3bhk', status='resale').order_by('-id')),
+        ('chatbot: commercial type', active.filter(commercial_type='office').order_by('-id')),
+        ('chatbot: location', active.filter(locations__in=[location_id]).order_by('-id')),
+        ('chatbot: approved residential sell', ListingIndex.objects.filter(
+            source=ListingIndex.SOURCE_SELL_RESIDENTIAL
+        ).order_by('source_id')[:3]),
+        ('search: residential status', ListingIndex.objects.filter(
+            property_type='residential', status__in=['new', 'resale']
+        ).order_by('source', 'source_id')[:12]),
+        ('search: commercial budget', ListingIndex.objects.filter(
+            price_overlap_q(high=5000000, min_field='min_price', max_field='max_price'),
+            property_type='commercial'
+        ).order_by('min_price', 'id')[:12]),
+        ('search: location', ListingIndex.objects.filter(
+            location_id__in=[location_id], property_type='residential'
+        ).order_by('source', 'source_id')[:12]),
+        ('search: cursor page by price', ListingIndex.objects.filter(
+            keyset_after_q(('min_price', 'id'), [5000000, 1000]), property_type='residential'
+        ).order_by('min_price', 'id')[:13]),
+        ('favorites: user + property', UserFavorite.objects.filter(user_id=1, property_id=1)),
+        ('favorites: user', UserFavorite.objects.filter(user_id=1)),
+    ]
+
+
+def full_scans(queryset):
+    """Return the tables the database plans to read with a full scan for this queryset."""
+    if connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        return [match.group(1) for match in SQLITE_FULL_SCAN.finditer(plan)]
+    if connection.vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL':
+                    tables.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(plan)
+        return tables
+    if connection.vendor == 'postgresql':
+        plan = queryset.explain()
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    raise CommandError(f"EXPLAIN checks are not implemented for the '{connection.vendor}' backend")
+
+
+def filtered_columns(node):
+    """Columns compared in a WHERE tree."""
+    if hasattr(node, 'children'):
+        return {column for child in node.children for column in filtered_columns(child)}
+    target = getattr(getattr(node, 'lhs', None), 'target', None)
+    return {target.column} if target is not None else set()
+
+
+def source_only_seeks(queryset):
+    """
+    The tables read through an index seek on `source` alone although the query
+    filters on more columns an index could have narrowed the seek to.
+    """
+    if filtered_columns(queryset.query.where) <= {'source'}:
+        return []
+    if connection.vendor == 'sqlite':
+        return SQLITE_SOURCE_ONLY_SEEK.findall(queryset.explain())
+    if connection.vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('used_key_parts') == ['source']:
+                    tables.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(plan)
+        return tables
+    return POSTGRES_SOURCE_ONLY_SEEK.findall(queryset.explain())
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN every listing query the site serves and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Insert this many synthetic listings (rolled back afterwards)")
+        parser.add_argument('--verbose', action='store_true', help="Print each query plan")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            failures = self.check_queries(options['verbose'])
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"{len(failures)} listing queries are not served by a selective index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All listing queries use an index."))
+
+    def check_queries(self, verbose):
+        failures = []
+        for name, queryset in listing_queries():
+            tables = full_scans(queryset)
+            seeks = source_only_seeks(queryset)
+            if verbose:
+                self.stdout.write(f"-- {name}\n{queryset.explain()}\n")
+            if tables:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name} ({', '.join(sorted(set(tables)))})"))
+            elif seeks:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"SOURCE=?   {name} ({', '.join(sorted(set(seeks)))})"))
+            else:
+                self.stdout.write(f"ok         {name}")
+        return failures
+
+    def seed(self, count):
+        """
+        Insert a synthetic inventory skewed the way a live catalogue is: most listings are
+        residential, keep the default 'all' category and are new launches, and prices and
+        locations are spread widely.
+        """
+        configurations = [choice for choice, _ in BuyProperties.RESIDENTIAL_CONFIG_CHOICES]
+        commercial_types = [choice for choice, _ in BuyProperties.COMMERCIAL_TYPE_CHOICES]
+        statuses = ['new'] * 14 + ['resale'] * 3 + ['rent'] * 2 + ['lease']
+        categories = ['all'] * 17 + ['leasing', 'investment', 'resale_residential']
+        locations = PropertyLocation.objects.bulk_create(
+            [PropertyLocation(name=f"Seed Location {i}") for i in range(50)]
+        )
+        buy_properties = []
+        for i in range(count):
+            residential = i % 5 != 0
+            min_budget_inr = 1000000 + (i * 7919) % 200000000
+            buy_properties.append(BuyProperties(
+                project_name=f"explain-seed-{i}",
+                slug=f"explain-seed-{i}",
+                property_type='residential' if residential else 'commercial',
+                status=statuses[(i * 7) % len(statuses)],
+                category=categories[(i * 11) % len(categories)],
+                configuration=configurations[i % len(configurations)] if residential else None,
+                commercial_type=None if residential else commercial_types[i % len(commercial_types)],
+                area=500 + i % 5000,
+                min_budget=Decimal(min_budget_inr) / 100000,
+                max_budget=Decimal(min_budget_inr) / 50000,
+                min_budget_inr=min_budget_inr,
+                max_budget_inr=min_budget_inr * 2,
+                locations=locations[(i * 13) % len(locations)],
+                is_property_active=i % 10 != 0,
+            ))
+        buy_properties = BuyProperties.objects.bulk_create(buy_properties, batch_size=500)
+        sell_common = dict(contact_email='seed@example.com', area=900)
+        residential_sells = SellResidentialProperties.objects.bulk_create([
+            SellResidentialProperties(
+                project_name=f"explain-seed-{i}", status='resale', budget=3000000 + i,
+                configuration=configurations[i % len(configurations)],
+                locations=locations[i % len(locations)], is_approved=i % 2 == 0, **sell_common
+            ) for i in range(count // 4)
+        ], batch_size=500)
+        commercial_sells = SellCommercialProperties.objects.bulk_create([
+            SellCommercialProperties(
+                project_name=f"explain-seed-{i}", status='rent', budget=3000000 + i,
+                commercial_type=commercial_types[i % len(commercial_types)],
+                locations=locations[i % len(locations)], is_approved=i % 2 == 0, **sell_common
+            ) for i in range(count // 4)
+        ], batch_size=500)
+        entries = [
+            ListingIndex(source=ListingIndex.source_for(listing), source_id=listing.pk, **ListingIndex.values_for(listing))
+            for listing in [*buy_properties, *residential_sells, *commercial_sells]
+            if ListingIndex.source_for(listing) == ListingIndex.SOURCE_BUY or listing.is_approved
+        ]
+        ListingIndex.objects.bulk_create(entries, batch_size=500)
+        self.stdout.write(f"Seeded {count} buy listings and {2 * (count // 4)} sell listings.")
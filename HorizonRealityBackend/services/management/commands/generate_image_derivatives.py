@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connections
+from services.images import generate_image_derivatives, image_sources
+from services.models import ImageDerivative
+
+'''
+Writes the responsive derivatives (see services.images) of images uploaded before
+the pipeline existed, or whose upload task never ran.
+
+Decoding and encoding are CPU bound, so the images are spread over a pool of
+--workers processes. The pool forks after the database and cache connections are
+closed, and every worker opens its own. Images that already have derivatives are
+skipped unless --force is given.
+
+Usage:
+    python manage.py generate_image_derivatives
+    python manage.py generate_image_derivatives --workers 8 --force
+    python manage.py generate_image_derivatives --source property_images/tower.jpg
+'''
+
+
+class Command(BaseCommand):
+    help = "Generate responsive image derivatives for existing media"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument('--force', action='store_true', help="Regenerate images that already have derivatives")
+        parser.add_argument('--source', action='append', dest='sources', help="Process only this file (repeatable)")
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or image_sources()
+        if not options['force']:
+            done = set(ImageDerivative.objects.values_list('source', flat=True).distinct())
+            sources = [source for source in sources if source not in done]
+        if not sources:
+            self.stdout.write("Every image already has derivatives.")
+            return
+
+        started = time.perf_counter()
+        written = failed = 0
+        connections.close_all()
+        caches.close_all()
+        with ProcessPoolExecutor(
+            max_workers=max(1, options['workers']), mp_context=multiprocessing.get_context('fork')
+        ) as pool:
+            futures = {pool.submit(generate_image_derivatives, source): source for source in sources}
+            for future in as_completed(futures):
+                count = future.result()
+                written += count
+                if not count:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"Skipped {futures[future]}"))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} derivatives for {len(sources) - failed} images in {elapsed:.2f}s"
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} images could not be read"))
@@ -0,0 +1,104 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from services.geo import encode_geohash
+from services.listings import bump_listings_version
+from services.models import PropertyLocation
+
+'''
+Sets PropertyLocation coordinates from a local CSV gazetteer.
+
+The file needs a header row with a name column and latitude/longitude columns
+(lat/lng/lon are accepted too). Names are matched case-insensitively against
+existing locations; with --create, names that match nothing become new locations.
+Rows are written with bulk_update/bulk_create in batches, computing geohashes here
+since bulk writes skip PropertyLocation.save().
+
+Usage:
+    python manage.py import_gazetteer locations.csv
+    python manage.py import_gazetteer locations.csv --create --dry-run
+'''
+
+COLUMN_ALIASES = {
+    'name': ('name', 'location', 'place'),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'lng', 'lon', 'long'),
+}
+BATCH_SIZE = 500
+
+
+def resolve_columns(header):
+    normalized = {column.strip().lower(): column for column in header}
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        match = next((normalized[alias] for alias in aliases if alias in normalized), None)
+        if match is None:
+            raise CommandError(f"The CSV header has no {key} column (expected one of: {', '.join(aliases)})")
+        columns[key] = match
+    return columns
+
+
+def parse_coordinate(value, limit):
+    try:
+        coordinate = Decimal(value.strip()).quantize(Decimal('0.000001'))
+    except (InvalidOperation, AttributeError):
+        return None
+    return coordinate if abs(coordinate) <= limit else None
+
+
+class Command(BaseCommand):
+    help = "Import latitude/longitude for property locations from a CSV gazetteer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with name, latitude and longitude columns")
+        parser.add_argument('--create', action='store_true', help="Create locations for unmatched names")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without saving")
+
+    def handle(self, *args, **options):
+        locations = {}
+        for location in PropertyLocation.objects.all():
+            locations.setdefault(location.name.strip().lower(), []).append(location)
+        to_update, to_create, skipped = {}, {}, 0
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as handle:
+                reader = csv.DictReader(handle)
+                columns = resolve_columns(reader.fieldnames or [])
+                for row in reader:
+                    name = (row.get(columns['name']) or '').strip()
+                    latitude = parse_coordinate(row.get(columns['latitude']), 90)
+                    longitude = parse_coordinate(row.get(columns['longitude']), 180)
+                    if not name or latitude is None or longitude is None:
+                        skipped += 1
+                        continue
+                    key = name.lower()
+                    if key in locations:
+                        for location in locations[key]:
+                            location.latitude, location.longitude = latitude, longitude
+                            location.geohash = encode_geohash(latitude, longitude)
+                            to_update[location.pk] = location
+                    elif options['create']:
+                        to_create[key] = PropertyLocation(
+                            name=name,
+                            latitude=latitude,
+                            longitude=longitude,
+                            geohash=encode_geohash(latitude, longitude)
+                        )
+                    else:
+                        skipped += 1
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                PropertyLocation.objects.bulk_update(
+                    to_update.values(), ['latitude', 'longitude', 'geohash'], batch_size=BATCH_SIZE
+                )
+                PropertyLocation.objects.bulk_create(to_create.values(), batch_size=BATCH_SIZE)
+            bump_listings_version()
+
+        if options['dry_run']:
+            summary = f"Would update {len(to_update)} locations and create {len(to_create)}"
+        else:
+            summary = f"Updated {len(to_update)} locations and created {len(to_create)}"
+        self.stdout.write(self.style.SUCCESS(f"{summary}, skipped {skipped} rows."))
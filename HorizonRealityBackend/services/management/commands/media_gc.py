@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from services.media_gc import BATCH_SIZE, DEFAULT_GRACE_PERIOD, delete_orphan, find_orphans
+
+'''
+Reports, and with --delete removes, media files no database row refers to (see
+services.media_gc). Without --delete nothing is changed: the command prints the
+reclaimable bytes per top-level directory, and every orphan with --verbosity 2.
+
+Usage:
+    python manage.py media_gc
+    python manage.py media_gc --grace-hours 72 --verbosity 2
+    python manage.py media_gc --delete
+'''
+
+
+class Command(BaseCommand):
+    help = "Report or delete media files that no database row refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help="Delete the orphans instead of only reporting them")
+        parser.add_argument(
+            '--grace-hours', type=float, default=DEFAULT_GRACE_PERIOD.total_seconds() / 3600,
+            help="Leave files modified more recently than this alone",
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError("--grace-hours cannot be negative.")
+        grace_period = timedelta(hours=options['grace_hours'])
+        started = time.perf_counter()
+        found = deleted = reclaimed = 0
+        by_directory = {}
+        for name, size in find_orphans(grace_period, options['batch_size']):
+            found += 1
+            if options['delete']:
+                if not delete_orphan(name, grace_period):
+                    continue
+                deleted += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{name} ({filesizeformat(size)})")
+            reclaimed += size
+            directory = name.split('/', 1)[0] if '/' in name else '.'
+            count, total = by_directory.get(directory, (0, 0))
+            by_directory[directory] = (count + 1, total + size)
+        elapsed = time.perf_counter() - started
+
+        for directory, (count, total) in sorted(by_directory.items(), key=lambda item: -item[1][1]):
+            self.stdout.write(f"{directory}/: {count} files, {filesizeformat(total)}")
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {deleted} of {found} orphaned files, {reclaimed} bytes ({filesizeformat(reclaimed)}), "
+                f"in {elapsed:.2f}s"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{found} orphaned files, {reclaimed} bytes ({filesizeformat(reclaimed)}) reclaimable, "
+                f"found in {elapsed:.2f}s. Run with --delete to remove them."
+            ))
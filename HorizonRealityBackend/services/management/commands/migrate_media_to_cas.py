@@ -0,0 +1,105 @@
+import time
+from django.core.files.storage import default_storage, storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from home.content import bump_home_content_version
+from home.page_cache import bump_blog_pages_version
+from home.site_content import bump_site_content_version
+from services.images import image_fields, rename_derivative_source
+from services.listings import bump_listings_version
+from services.media_gc import file_fields
+from services.storage import CAS_PREFIX, ContentAddressedStorage
+
+'''
+Moves files uploaded before ContentAddressedStorage (services.storage) into it and
+rewrites the file fields pointing at them, while the site keeps running.
+
+Every FileField / ImageField on the default storage is walked in primary key
+batches of --batch-size. For each row still naming a file outside cas/, the file is
+stored by content (identical files end up as one) and the row is updated only if
+it still holds the old name, so an edit made meanwhile wins and its reference is
+released again. Derivatives of renamed images (services.images) follow their
+original.
+
+The original files are left in place: pages and caches rendered before the run
+keep working until they expire. The page generations are bumped at the end so new
+renders link the content-addressed names.
+
+Usage:
+    python manage.py migrate_media_to_cas --dry-run
+    python manage.py migrate_media_to_cas --batch-size 200
+'''
+
+
+class Command(BaseCommand):
+    help = "Move existing uploads into the content-addressed media storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows read and updated per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the files left to move")
+
+    def handle(self, *args, **options):
+        if not isinstance(storages['default'], ContentAddressedStorage):
+            raise CommandError("The default storage is not services.storage.ContentAddressedStorage; check STORAGES.")
+        started = time.perf_counter()
+        images = {(model, name) for model, names in image_fields().items() for name in names}
+        totals = {'moved': 0, 'missing': 0, 'changed': 0}
+        for model, field in file_fields():
+            label = f"{model._meta.label}.{field.name}"
+            pending = self.pending(model, field)
+            if options['dry_run']:
+                self.stdout.write(f"{label}: {pending.count()} files to move")
+                continue
+            counts = self.migrate_field(model, field, pending, options['batch_size'], (model, field.name) in images)
+            for key, value in counts.items():
+                totals[key] += value
+            if any(counts.values()):
+                self.stdout.write(
+                    f"{label}: moved {counts['moved']}, missing {counts['missing']}, changed meanwhile {counts['changed']}"
+                )
+        if options['dry_run']:
+            return
+
+        bump_listings_version()
+        bump_home_content_version()
+        bump_site_content_version()
+        bump_blog_pages_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {totals['moved']} files in {elapsed:.2f}s "
+            f"({totals['missing']} missing on disk, {totals['changed']} edited during the run)"
+        ))
+
+    def pending(self, model, field):
+        return (
+            model._base_manager.exclude(**{field.attname: ''})
+            .exclude(**{f'{field.attname}__isnull': True})
+            .exclude(**{f'{field.attname}__startswith': CAS_PREFIX + '/'})
+        )
+
+    def migrate_field(self, model, field, pending, batch_size, is_image):
+        counts = {'moved': 0, 'missing': 0, 'changed': 0}
+        last_pk = None
+        while True:
+            batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+            rows = list(batch.order_by('pk').values_list('pk', field.attname)[:batch_size])
+            if not rows:
+                return counts
+            last_pk = rows[-1][0]
+            with transaction.atomic():
+                for pk, old_name in rows:
+                    if not default_storage.exists(old_name):
+                        counts['missing'] += 1
+                        continue
+                    with default_storage.open(old_name) as content:
+                        new_name = default_storage.save(old_name, content)
+                    updated = model._base_manager.filter(pk=pk, **{field.attname: old_name}).update(
+                        **{field.attname: new_name}
+                    )
+                    if not updated:
+                        default_storage.delete(new_name)
+                        counts['changed'] += 1
+                        continue
+                    if is_image:
+                        rename_derivative_source(old_name, new_name)
+                    counts['moved'] += 1
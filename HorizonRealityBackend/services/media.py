@@ -0,0 +1,175 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.clickjacking import xframe_options_sameorigin
+from django.views.decorators.http import require_safe
+
+'''
+Serves uploaded media with HTTP Range support.
+
+Property videos and brochures used to be served by django.conf.urls.static, only
+with DEBUG on and without byte ranges, so seeking in a video or opening a page of a
+large PDF downloaded the whole file again. serve_media():
+
+- answers `Range: bytes=...` with 206 and the requested bytes, honouring If-Range,
+  and 416 for ranges past the end of the file (several ranges get the whole file);
+- sends a strong ETag built from the file's size and modification time, and
+  Last-Modified, and answers If-None-Match / If-Modified-Since with 304;
+- streams through FileResponse, so WSGI servers with a file wrapper (gunicorn) send
+  the file with sendfile() instead of copying it through Python;
+- marks content-addressed paths (a 32 to 64 character hex digest as a path segment
+  or file stem) immutable for a year, and everything else cacheable for
+  MEDIA_CACHE_MAX_AGE.
+
+With MEDIA_X_ACCEL_REDIRECT set (e.g. "/protected-media/", an nginx `internal`
+location aliased to MEDIA_ROOT), the view only checks the path and hands the
+transfer to nginx with X-Accel-Redirect.
+'''
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{32,64}(/|\.[^/]*$|$)')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_MAX_AGE = 60 * 60 * 24
+BLOCK_SIZE = 256 * 1024
+
+mimetypes.add_type('video/x-matroska', '.mkv')
+mimetypes.add_type('video/x-flv', '.flv')
+mimetypes.add_type('video/webm', '.webm')
+
+
+class FileRange:
+    """
+    `length` bytes of an open file from its current position. Exposes fileno() and
+    tell() so sendfile-capable file wrappers still send it without copying; they
+    stop at the response's Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def media_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(path):
+    if CONTENT_ADDRESSED_RE.search(path):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE)}"
+
+
+def requested_range(request, size, etag, last_modified):
+    """
+    (start, end) of the single byte range requested, end exclusive; None to send the
+    whole file; raises ValueError when the range cannot be satisfied.
+    """
+    header = request.headers.get('Range')
+    if not header or request.method != 'GET':
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        # A Range applies only while the client's copy is this exact version.
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise ValueError(header)
+    return start, end
+
+
+@require_safe
+@xframe_options_sameorigin
+def serve_media(request, path):
+    """A file under MEDIA_ROOT, with Range and conditional request support."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError, ValueError):
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    headers = {'Cache-Control': cache_control(path)}
+    accel_prefix = getattr(settings, 'MEDIA_X_ACCEL_REDIRECT', '')
+    if accel_prefix:
+        # nginx serves the file, ranges and validators included.
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        return response
+
+    etag = media_etag(stat)
+    last_modified = int(stat.st_mtime)
+    headers.update({'ETag': etag, 'Last-Modified': http_date(last_modified), 'Accept-Ranges': 'bytes'})
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    size = stat.st_size
+    try:
+        byte_range = requested_range(request, size, etag, last_modified)
+    except ValueError:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, headers=headers)
+    else:
+        file = open(full_path, 'rb')
+        file.seek(start)
+        response = FileResponse(
+            FileRange(file, end - start) if byte_range else file,
+            content_type=content_type,
+            filename=os.path.basename(full_path),
+            headers=headers,
+        )
+        response.block_size = BLOCK_SIZE
+    response['Content-Length'] = end - start
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
+    return response
@@ -0,0 +1,148 @@
+import hashlib
+import math
+import os
+import time
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from .models import StoredFile
+from .storage import is_content_addressed
+
+'''
+Garbage collection of media files no database row refers to.
+
+Django leaves a file on disk when the row holding it is deleted or its field is
+replaced, so MEDIA_ROOT only grows. find_orphans():
+
+1. streams the names held by every FileField / ImageField on the default storage,
+   a batch of rows at a time, into a Bloom filter sized for their count (about 1.2
+   MB per million names at the default 1% false positive rate);
+2. walks MEDIA_ROOT with os.scandir, a directory at a time, and yields the files the
+   filter has certainly not seen whose modification time is older than the grace
+   period.
+
+Memory stays bounded by the filter and the depth of the walk, whatever the number
+of files. A false positive only keeps an orphan until a later run. The grace period
+covers uploads whose row is not committed yet; ContentAddressedStorage touches a
+file whenever a new save reuses it, so shared content is covered too.
+CHUNKED_UPLOAD_DIR and BAKED_PAGES_DIR are skipped when they sit inside
+MEDIA_ROOT. Temporary `.upload-` files left by an interrupted save are orphans like
+any other.
+
+delete_orphan() checks the modification time again before deleting, under the
+StoredFile row lock for content-addressed names, and removes the row with the file.
+'''
+
+DEFAULT_GRACE_PERIOD = timedelta(days=1)
+FALSE_POSITIVE_RATE = 0.01
+BATCH_SIZE = 2000
+
+
+class BloomFilter:
+    """Set membership in a fixed bit array: no false negatives, `error_rate` false positives."""
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key):
+        # Double hashing: two 64-bit halves of one digest give every position.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+def file_fields():
+    """(model, field) of every concrete FileField / ImageField on the default storage."""
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and field.storage is default_storage:
+                yield model, field
+
+
+def referenced_names():
+    """The querysets of non-empty names held by file_fields()."""
+    for model, field in file_fields():
+        yield model._base_manager.exclude(**{field.attname: ''}).exclude(
+            **{f'{field.attname}__isnull': True}
+        ).values_list(field.attname, flat=True)
+
+
+def reference_filter(batch_size=BATCH_SIZE, error_rate=FALSE_POSITIVE_RATE):
+    querysets = list(referenced_names())
+    references = BloomFilter(sum(queryset.count() for queryset in querysets), error_rate)
+    for queryset in querysets:
+        for name in queryset.order_by().iterator(chunk_size=batch_size):
+            references.add(name)
+    return references
+
+
+def excluded_dirs(root):
+    excluded = set()
+    for setting in ('CHUNKED_UPLOAD_DIR', 'BAKED_PAGES_DIR'):
+        path = getattr(settings, setting, '')
+        if path:
+            path = os.path.realpath(path)
+            if path != root and path.startswith(root + os.sep):
+                excluded.add(path)
+    return excluded
+
+
+def scan_media(root, excluded=()):
+    """(storage name, stat) of every regular file under `root`, skipping the `excluded` directories."""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in excluded:
+                            pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                        yield name, entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+
+
+def find_orphans(grace_period=DEFAULT_GRACE_PERIOD, batch_size=BATCH_SIZE):
+    """(storage name, size in bytes) of every unreferenced media file older than `grace_period`."""
+    cutoff = time.time() - grace_period.total_seconds()
+    references = reference_filter(batch_size)
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    for name, stat in scan_media(root, excluded_dirs(root)):
+        if stat.st_mtime < cutoff and name not in references:
+            yield name, stat.st_size
+
+
+def delete_orphan(name, grace_period=DEFAULT_GRACE_PERIOD):
+    """Delete an orphan found by find_orphans() unless it was touched since; returns whether it was."""
+    path = default_storage.path(name)
+    cutoff = time.time() - grace_period.total_seconds()
+    with transaction.atomic():
+        if is_content_addressed(name):
+            # Holds store() off while the file is checked and removed.
+            list(StoredFile.objects.select_for_update().filter(name=name))
+        try:
+            if os.stat(path).st_mtime >= cutoff:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        StoredFile.objects.filter(name=name).delete()
+    return True
+
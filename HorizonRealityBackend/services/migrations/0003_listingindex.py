@@ -0,0 +1,82 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+UNIT_MULTIPLIERS = {'lakhs': 100000, 'crores': 10000000}
+
+
+def to_rupees(amount, unit):
+    if amount is None:
+        return None
+    return int(amount * UNIT_MULTIPLIERS.get(unit, 1))
+
+
+def backfill_listing_index(apps, schema_editor):
+    BuyProperties = apps.get_model('services', 'BuyProperties')
+    SellResidentialProperties = apps.get_model('services', 'SellResidentialProperties')
+    SellCommercialProperties = apps.get_model('services', 'SellCommercialProperties')
+    ListingIndex = apps.get_model('services', 'ListingIndex')
+    entries = []
+    for prop in BuyProperties.objects.iterator():
+        entries.append(ListingIndex(
+            source='buy', source_id=prop.pk, property_type=prop.property_type,
+            status=prop.status, category=prop.category, configuration=prop.configuration,
+            commercial_type=prop.commercial_type, furnishing=prop.furnishing,
+            location_id=prop.locations_id, area=prop.area,
+            min_price=to_rupees(prop.min_budget, prop.min_budget_unit),
+            max_price=to_rupees(prop.max_budget, prop.max_budget_unit),
+            is_active=prop.is_property_active,
+        ))
+    for prop in SellResidentialProperties.objects.filter(is_approved=True).iterator():
+        entries.append(ListingIndex(
+            source='sell_residential', source_id=prop.pk, property_type='residential',
+            status=prop.status, category=prop.category, configuration=prop.configuration,
+            location_id=prop.locations_id, area=prop.area,
+            min_price=prop.budget, max_price=prop.budget, is_active=True,
+        ))
+    for prop in SellCommercialProperties.objects.filter(is_approved=True).iterator():
+        entries.append(ListingIndex(
+            source='sell_commercial', source_id=prop.pk, property_type='commercial',
+            status=prop.status, commercial_type=prop.commercial_type, furnishing=prop.furnishing,
+            location_id=prop.locations_id, area=prop.area,
+            min_price=prop.budget, max_price=prop.budget, is_active=True,
+        ))
+    ListingIndex.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('buy', 'Buy Property'), ('sell_residential', 'Sell Residential Property'), ('sell_commercial', 'Sell Commercial Property')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('property_type', models.CharField(choices=[('residential', 'Residential'), ('commercial', 'Commercial')], max_length=20)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('category', models.CharField(default='all', max_length=20)),
+                ('configuration', models.CharField(blank=True, max_length=20, null=True)),
+                ('commercial_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('furnishing', models.CharField(blank=True, max_length=20, null=True)),
+                ('area', models.DecimalField(decimal_places=2, help_text='Area in sqft', max_digits=10)),
+                ('min_price', models.PositiveBigIntegerField(blank=True, help_text='Minimum price in rupees', null=True)),
+                ('max_price', models.PositiveBigIntegerField(blank=True, help_text='Maximum price in rupees', null=True)),
+                ('is_active', models.BooleanField(default=False, help_text='Active buy listing or approved sell listing')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='services.propertylocation')),
+            ],
+            options={
+                'verbose_name': 'Listing Index Entry',
+                'verbose_name_plural': 'Listing Index',
+                'indexes': [models.Index(fields=['property_type', 'source', 'source_id'], name='services_li_propert_321f68_idx'), models.Index(fields=['property_type', 'min_price'], name='services_li_propert_1a77b5_idx'), models.Index(fields=['property_type', 'area'], name='services_li_propert_f2b926_idx'), models.Index(fields=['property_type', 'status'], name='services_li_propert_048d26_idx'), models.Index(fields=['location', 'property_type'], name='services_li_locatio_d54e72_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'source_id'), name='unique_listing_index_source')],
+            },
+        ),
+        migrations.RunPython(backfill_listing_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:29
+
+from django.db import migrations, models
+
+UNIT_MULTIPLIERS = {'lakhs': 100000, 'crores': 10000000}
+
+
+def to_rupees(amount, unit):
+    if amount is None:
+        return None
+    return int(amount * UNIT_MULTIPLIERS.get(unit, 1))
+
+
+def backfill_budget_inr(apps, schema_editor):
+    BuyProperties = apps.get_model('services', 'BuyProperties')
+    ListingIndex = apps.get_model('services', 'ListingIndex')
+    batch = []
+    for prop in BuyProperties.objects.only(
+        'min_budget', 'min_budget_unit', 'max_budget', 'max_budget_unit'
+    ).iterator():
+        prop.min_budget_inr = to_rupees(prop.min_budget, prop.min_budget_unit)
+        prop.max_budget_inr = to_rupees(prop.max_budget, prop.max_budget_unit)
+        if prop.max_budget_inr is None:
+            prop.max_budget_inr = prop.min_budget_inr
+        batch.append(prop)
+        if len(batch) >= 500:
+            BuyProperties.objects.bulk_update(batch, ['min_budget_inr', 'max_budget_inr'])
+            batch = []
+    if batch:
+        BuyProperties.objects.bulk_update(batch, ['min_budget_inr', 'max_budget_inr'])
+    ListingIndex.objects.filter(max_price__isnull=True).update(max_price=models.F('min_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_listingindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyproperties',
+            name='max_budget_inr',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, help_text='Maximum budget normalized to rupees, derived on save', null=True),
+        ),
+        migrations.AddField(
+            model_name='buyproperties',
+            name='min_budget_inr',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, help_text='Minimum budget normalized to rupees, derived on save', null=True),
+        ),
+        migrations.AlterField(
+            model_name='sellcommercialproperties',
+            name='budget',
+            field=models.PositiveIntegerField(db_index=True, help_text='Budget in INR'),
+        ),
+        migrations.AlterField(
+            model_name='sellresidentialproperties',
+            name='budget',
+            field=models.PositiveIntegerField(db_index=True, help_text='Budget in INR'),
+        ),
+        migrations.RunPython(backfill_budget_inr, migrations.RunPython.noop),
+    ]
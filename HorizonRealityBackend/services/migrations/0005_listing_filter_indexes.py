@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_budget_inr'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['property_type', 'status', 'is_property_active'], name='services_bu_propert_577ddb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['configuration', 'status', 'is_property_active'], name='services_bu_configu_f084b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['commercial_type', 'status', 'is_property_active'], name='services_bu_commerc_83b801_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['category', 'is_property_active'], name='services_bu_categor_73d1bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['created_at', 'is_property_active'], name='services_bu_created_bb6300_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellcommercialproperties',
+            index=models.Index(fields=['status', 'is_approved'], name='services_se_status_e44a27_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellresidentialproperties',
+            index=models.Index(fields=['status', 'is_approved'], name='services_se_status_91e6d1_idx'),
+        ),
+    ]
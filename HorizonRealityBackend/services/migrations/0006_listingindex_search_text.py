@@ -0,0 +1,69 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:39
+
+from django.db import migrations, models
+
+SOURCE_MODELS = {
+    'buy': 'BuyProperties',
+    'sell_residential': 'SellResidentialProperties',
+    'sell_commercial': 'SellCommercialProperties',
+}
+
+
+def search_text_for(instance):
+    parts = [instance.project_name, instance.locations.name if instance.locations_id else None]
+    for field in ('configuration', 'commercial_type'):
+        value = getattr(instance, field, None)
+        if value:
+            parts += [value, getattr(instance, f'get_{field}_display')()]
+    parts.append(getattr(instance, 'salient_features', None) or getattr(instance, 'additional_details', None))
+    return ' '.join(str(part) for part in parts if part)
+
+
+def backfill_search_text(apps, schema_editor):
+    ListingIndex = apps.get_model('services', 'ListingIndex')
+    for source, model_name in SOURCE_MODELS.items():
+        listings = apps.get_model('services', model_name).objects.select_related('locations').in_bulk()
+        entries = list(ListingIndex.objects.filter(source=source))
+        for entry in entries:
+            listing = listings.get(entry.source_id)
+            entry.search_text = search_text_for(listing) if listing else ''
+        ListingIndex.objects.bulk_update(entries, ['search_text'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX services_listingindex_search_ft ON services_listingindex (search_text)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute('CREATE VIRTUAL TABLE services_listingindex_fts USING fts5(search_text)')
+        schema_editor.execute(
+            'INSERT INTO services_listingindex_fts (rowid, search_text) '
+            'SELECT id, search_text FROM services_listingindex'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('DROP INDEX services_listingindex_search_ft ON services_listingindex')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS services_listingindex_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_listing_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingindex',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Text indexed for full-text search'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
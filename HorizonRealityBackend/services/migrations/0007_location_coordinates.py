@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_listingindex_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertylocation',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Geohash of the coordinates, used for nearby searches', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='propertylocation',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertylocation',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+    ]
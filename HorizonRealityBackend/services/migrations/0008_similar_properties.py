@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0007_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarProperty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('distance', models.FloatField(help_text='Weighted feature distance; lower is more similar')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='services.buyproperties')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='services.buyproperties')),
+            ],
+            options={
+                'verbose_name': 'Similar Property',
+                'verbose_name_plural': 'Similar Properties',
+                'constraints': [models.UniqueConstraint(fields=('property', 'rank'), name='unique_similar_property_rank')],
+            },
+        ),
+    ]
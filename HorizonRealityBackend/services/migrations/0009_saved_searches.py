@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-17 23:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_existing_listings_matched(apps, schema_editor):
+    """Listings indexed before saved searches existed are not new to anyone."""
+    ListingIndex = apps.get_model('services', 'ListingIndex')
+    ListingIndex.objects.filter(matched_at__isnull=True).update(matched_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0008_similar_properties'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('scope', models.CharField(choices=[('residential', 'Residential'), ('commercial', 'Commercial')], default='residential', max_length=20)),
+                ('query', models.TextField(blank=True, help_text='Query string of the search results page')),
+                ('filters', models.JSONField(default=dict, editable=False, help_text='Filter spec parsed from the query')),
+                ('is_active', models.BooleanField(default=True, help_text='Email new matching listings')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Saved Search',
+                'verbose_name_plural': 'Saved Searches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('buy', 'Buy Property'), ('sell_residential', 'Sell Residential Property'), ('sell_commercial', 'Sell Commercial Property')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Saved Search Alert',
+                'verbose_name_plural': 'Saved Search Alerts',
+            },
+        ),
+        migrations.AddField(
+            model_name='listingindex',
+            name='matched_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the listing was matched against saved searches', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['matched_at', 'is_active'], name='services_li_matched_d6f379_idx'),
+        ),
+        migrations.AddField(
+            model_name='savedsearch',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='savedsearchalert',
+            name='saved_search',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='services.savedsearch'),
+        ),
+        migrations.AddField(
+            model_name='savedsearchalert',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_search_alerts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchalert',
+            index=models.Index(fields=['sent_at', 'user'], name='services_sa_sent_at_a0c831_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchalert',
+            constraint=models.UniqueConstraint(fields=('user', 'source', 'source_id'), name='unique_saved_search_alert'),
+        ),
+        migrations.RunPython(mark_existing_listings_matched, migrations.RunPython.noop),
+    ]
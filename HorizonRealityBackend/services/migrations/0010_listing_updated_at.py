@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyproperties',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='propertyvideo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='buyproperties',
+            index=models.Index(fields=['updated_at'], name='services_bu_updated_19b789_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_stored_files'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['source', 'is_active', 'source_id'], name='services_li_source_1e0d97_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['source', 'is_active', 'category', 'source_id'], name='services_li_source_86fe79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['source', 'is_active', 'configuration', 'source_id'], name='services_li_source_f98d66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['source', 'is_active', 'min_price', 'id'], name='services_li_source_25d252_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingindex',
+            index=models.Index(fields=['location', 'source', 'is_active'], name='services_li_locatio_48de66_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_listing_list_scope_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedsearch',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
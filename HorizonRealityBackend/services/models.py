@@ -6,10 +6,14 @@ from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 import os
+import uuid
 from users.models import Newsletter
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.urls import reverse
+from .tracking import TrackedFieldsMixin
+from .search import get_search_backend
+from .geo import encode_geohash
 
 '''
 This module defines models for managing property listings and locations.
@@ -39,7 +43,8 @@ Fields:
    - 'furnishing': Indicates if the property is furnished or unfurnished.
    - 'area': The area of the property in square feet.
    - 'area_in_sqyards': The area of the property in square yards (optional).
-   - 'budget': The budget for the property in INR.
+   - 'min_budget' / 'max_budget': The budget range, expressed in the unit chosen in 'min_budget_unit' / 'max_budget_unit'.
+   - 'min_budget_inr' / 'max_budget_inr': The same range normalized to rupees on save; budget filters run on these indexed columns.
    - 'locations': A foreign key relation to the PropertyLocation model to associate each property with a location.
 
 This module provides a structured way to store and manage property listings and their associated locations.
@@ -49,10 +54,32 @@ This module provides a structured way to store and manage property listings and
 
 class PropertyLocation(models.Model):
     name = models.CharField(max_length=100)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text="Geohash of the coordinates, used for nearby searches"
+    )
 
     def __str__(self):
         return self.name
 
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return encode_geohash(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Property Location"
         verbose_name_plural = "Property Locations"
@@ -87,7 +114,22 @@ class FeatureAmenity(models.Model):
         verbose_name_plural = "Feature Amenities"
 
 
-class BuyProperties(models.Model):
+BUDGET_UNIT_MULTIPLIERS = {
+    'rupees': 1,
+    'lakhs': 100000,
+    'crores': 10000000,
+}
+
+
+def to_rupees(amount, unit='rupees'):
+    """Convert an amount expressed in lakhs/crores/rupees to whole rupees."""
+    if amount is None:
+        return None
+    return int(amount * BUDGET_UNIT_MULTIPLIERS.get(unit or 'rupees', 1))
+
+
+class BuyProperties(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('project_name', 'slug')
     PROPERTY_TYPE_CHOICES = [
         ('residential', 'Residential'),
         ('commercial', 'Commercial'),
@@ -164,6 +206,20 @@ class BuyProperties(models.Model):
         default='lakhs',
         help_text="Unit for maximum budget"
     )
+    min_budget_inr = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Minimum budget normalized to rupees, derived on save"
+    )
+    max_budget_inr = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Maximum budget normalized to rupees, derived on save"
+    )
     locations = models.ForeignKey(
         PropertyLocation,
         on_delete=models.CASCADE,
@@ -216,6 +272,9 @@ class BuyProperties(models.Model):
     )
     is_property_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    # Also touched when the listing's images, videos or amenities change (services.signals),
+    # so it is the last-modified time of everything its detail page shows about it.
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         if self.project_name:
@@ -228,29 +287,59 @@ class BuyProperties(models.Model):
         return reverse('property:property_detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.pk or BuyProperties.objects.filter(pk=self.pk).exists() and BuyProperties.objects.get(pk=self.pk).project_name != self.project_name:
+        if self.field_changed('project_name'):
             self.slug = slugify(self.project_name)
+        self.min_budget_inr = to_rupees(self.min_budget, self.min_budget_unit)
+        self.max_budget_inr = to_rupees(self.max_budget, self.max_budget_unit)
+        if self.max_budget_inr is None:
+            self.max_budget_inr = self.min_budget_inr
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'min_budget', 'min_budget_unit', 'max_budget', 'max_budget_unit'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'min_budget_inr', 'max_budget_inr'}
         super().save(*args, **kwargs)
     class Meta:
         verbose_name = "Buy Property"
         verbose_name_plural = "Buy Properties"
+        # Boolean flags go last: Django renders `is_property_active=True` as a bare column
+        # test, which an index can only apply as a residual filter, not as a seek prefix.
+        indexes = [
+            # property_list_view / chatbot: active listings narrowed by type, configuration and status
+            models.Index(fields=['property_type', 'status', 'is_property_active']),
+            models.Index(fields=['configuration', 'status', 'is_property_active']),
+            models.Index(fields=['commercial_type', 'status', 'is_property_active']),
+            # property_list_view category filter and the index_view carousels
+            models.Index(fields=['category', 'is_property_active']),
+            # send_weekly_property_newsletter: active listings created in the last week
+            models.Index(fields=['created_at', 'is_property_active']),
+            # property_list_view Last-Modified: the latest change to any listing
+            models.Index(fields=['updated_at']),
+        ]
+
+VIDEO_MAX_SIZE = 50 * 1024 * 1024
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.wmv', '.mkv', '.flv', '.webm']
+
+
+def validate_video_size(size):
+    if size > VIDEO_MAX_SIZE:
+        raise ValidationError(f'Video file size cannot exceed 50 MB. Current size: {size / (1024 * 1024):.1f} MB')
+
+
+def validate_video_extension(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in VIDEO_EXTENSIONS:
+        raise ValidationError(f'Invalid video format. Allowed formats: {", ".join(VIDEO_EXTENSIONS)}')
+
 
 def validate_video_file(video):
     """
     Custom validator for video files
     """
-    max_size = 50 * 1024 * 1024
-    if video.size > max_size:
-        raise ValidationError(f'Video file size cannot exceed 50 MB. Current size: {video.size / (1024 * 1024):.1f} MB')
-    
-    allowed_extensions = ['.mp4', '.avi', '.mov', '.wmv', '.mkv', '.flv', '.webm']
-    ext = os.path.splitext(video.name)[1].lower()
-    if ext not in allowed_extensions:
-        raise ValidationError(f'Invalid video format. Allowed formats: {", ".join(allowed_extensions)}')
-    
+    validate_video_size(video.size)
+    validate_video_extension(video.name)
     return video
 
-class SellResidentialProperties(models.Model):
+class SellResidentialProperties(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('is_approved',)
     RESIDENTIAL_CONFIG_CHOICES = [
         ('1bhk', '1BHK'),
         ('2bhk', '2BHK'),
@@ -287,7 +376,7 @@ class SellResidentialProperties(models.Model):
         blank=True,
         null=True
     )
-    budget = models.PositiveIntegerField(help_text="Budget in INR")
+    budget = models.PositiveIntegerField(help_text="Budget in INR", db_index=True)
     floor_num = models.PositiveIntegerField(
         blank=True,
         null=True,
@@ -336,8 +425,12 @@ class SellResidentialProperties(models.Model):
     class Meta:
         verbose_name = "Sell Residential Property"
         verbose_name_plural = "Sell Residential Properties"
+        indexes = [
+            models.Index(fields=['status', 'is_approved']),
+        ]
 
-class SellCommercialProperties(models.Model):
+class SellCommercialProperties(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('is_approved',)
     COMMERCIAL_TYPE_CHOICES = [
         ('showroom', 'Showroom'),
         ('office', 'Office'),
@@ -368,7 +461,7 @@ class SellCommercialProperties(models.Model):
         blank=True,
         null=True
     )
-    budget = models.PositiveIntegerField(help_text="Budget in INR")
+    budget = models.PositiveIntegerField(help_text="Budget in INR", db_index=True)
     locations = models.ForeignKey(
         PropertyLocation,
         on_delete=models.CASCADE,
@@ -417,6 +510,218 @@ class SellCommercialProperties(models.Model):
     class Meta:
         verbose_name = "Sell Commercial Property"
         verbose_name_plural = "Sell Commercial Properties"
+        indexes = [
+            models.Index(fields=['status', 'is_approved']),
+        ]
+
+class ListingIndex(models.Model):
+    """
+    Denormalized search row for every buy listing and every approved sell listing.
+
+    Rows are kept in sync by the signals in services.signals, so the search pages
+    can filter, sort and paginate one indexed table instead of chaining querysets.
+    """
+    SOURCE_BUY = 'buy'
+    SOURCE_SELL_RESIDENTIAL = 'sell_residential'
+    SOURCE_SELL_COMMERCIAL = 'sell_commercial'
+    SOURCE_CHOICES = [
+        (SOURCE_BUY, 'Buy Property'),
+        (SOURCE_SELL_RESIDENTIAL, 'Sell Residential Property'),
+        (SOURCE_SELL_COMMERCIAL, 'Sell Commercial Property'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    property_type = models.CharField(max_length=20, choices=BuyProperties.PROPERTY_TYPE_CHOICES)
+    status = models.CharField(max_length=20, null=True, blank=True)
+    category = models.CharField(max_length=20, default='all')
+    configuration = models.CharField(max_length=20, null=True, blank=True)
+    commercial_type = models.CharField(max_length=20, null=True, blank=True)
+    furnishing = models.CharField(max_length=20, null=True, blank=True)
+    location = models.ForeignKey(
+        PropertyLocation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    area = models.DecimalField(max_digits=10, decimal_places=2, help_text="Area in sqft")
+    min_price = models.PositiveBigIntegerField(null=True, blank=True, help_text="Minimum price in rupees")
+    max_price = models.PositiveBigIntegerField(null=True, blank=True, help_text="Maximum price in rupees")
+    is_active = models.BooleanField(default=False, help_text="Active buy listing or approved sell listing")
+    search_text = models.TextField(blank=True, default='', editable=False, help_text="Text indexed for full-text search")
+    matched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the listing was matched against saved searches"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_source_display()} #{self.source_id}"
+
+    @property
+    def is_sell_property(self):
+        return self.source != self.SOURCE_BUY
+
+    @classmethod
+    def source_for(cls, instance):
+        if isinstance(instance, BuyProperties):
+            return cls.SOURCE_BUY
+        if isinstance(instance, SellResidentialProperties):
+            return cls.SOURCE_SELL_RESIDENTIAL
+        if isinstance(instance, SellCommercialProperties):
+            return cls.SOURCE_SELL_COMMERCIAL
+        return None
+
+    @classmethod
+    def search_text_for(cls, instance):
+        """Project name, location, configuration and description of a listing, for full-text search."""
+        parts = [instance.project_name, instance.locations.name if instance.locations_id else None]
+        for field in ('configuration', 'commercial_type'):
+            value = getattr(instance, field, None)
+            if value:
+                parts += [value, getattr(instance, f'get_{field}_display')()]
+        parts.append(getattr(instance, 'salient_features', None) or getattr(instance, 'additional_details', None))
+        return ' '.join(str(part) for part in parts if part)
+
+    @classmethod
+    def values_for(cls, instance):
+        """Column values for the index row of a buy or sell listing."""
+        source = cls.source_for(instance)
+        values = {
+            'status': instance.status,
+            'location_id': instance.locations_id,
+            'area': instance.area,
+            'search_text': cls.search_text_for(instance),
+        }
+        if source == cls.SOURCE_BUY:
+            values.update({
+                'property_type': instance.property_type,
+                'category': instance.category,
+                'configuration': instance.configuration,
+                'commercial_type': instance.commercial_type,
+                'furnishing': instance.furnishing,
+                'min_price': instance.min_budget_inr,
+                'max_price': instance.max_budget_inr,
+                'is_active': instance.is_property_active,
+            })
+        elif source == cls.SOURCE_SELL_RESIDENTIAL:
+            values.update({
+                'property_type': 'residential',
+                'category': instance.category,
+                'configuration': instance.configuration,
+                'min_price': instance.budget,
+                'max_price': instance.budget,
+                'is_active': instance.is_approved,
+            })
+        else:
+            values.update({
+                'property_type': 'commercial',
+                'commercial_type': instance.commercial_type,
+                'furnishing': instance.furnishing,
+                'min_price': instance.budget,
+                'max_price': instance.budget,
+                'is_active': instance.is_approved,
+            })
+        return values
+
+    @classmethod
+    def sync(cls, instance):
+        """Create, update or drop the index row for a listing after it is saved."""
+        source = cls.source_for(instance)
+        if source != cls.SOURCE_BUY and not instance.is_approved:
+            cls.remove(instance)
+            return None
+        entry, _ = cls.objects.update_or_create(
+            source=source,
+            source_id=instance.pk,
+            defaults=cls.values_for(instance)
+        )
+        get_search_backend().index(entry)
+        return entry
+
+    @classmethod
+    def remove(cls, instance):
+        entries = cls.objects.filter(source=cls.source_for(instance), source_id=instance.pk)
+        entry_ids = list(entries.values_list('id', flat=True))
+        if entry_ids:
+            entries.delete()
+            get_search_backend().remove(entry_ids)
+
+    class Meta:
+        verbose_name = "Listing Index Entry"
+        verbose_name_plural = "Listing Index"
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'source_id'], name='unique_listing_index_source'),
+        ]
+        indexes = [
+            models.Index(fields=['property_type', 'source', 'source_id']),
+            models.Index(fields=['property_type', 'min_price']),
+            models.Index(fields=['property_type', 'area']),
+            models.Index(fields=['property_type', 'status']),
+            models.Index(fields=['location', 'property_type']),
+            models.Index(fields=['matched_at', 'is_active']),
+            # The property list scope (LISTING_SCOPES['list']): buy listings that are active.
+            models.Index(fields=['source', 'is_active', 'source_id']),
+            models.Index(fields=['source', 'is_active', 'category', 'source_id']),
+            models.Index(fields=['source', 'is_active', 'configuration', 'source_id']),
+            models.Index(fields=['source', 'is_active', 'min_price', 'id']),
+            models.Index(fields=['location', 'source', 'is_active']),
+        ]
+
+
+class SimilarProperty(models.Model):
+    """
+    Precomputed nearest neighbours of a buy listing, ranked from 1 (most similar).
+    Written by services.similarity; read by the property detail page.
+    """
+    property = models.ForeignKey(BuyProperties, on_delete=models.CASCADE, related_name='similar_entries')
+    similar = models.ForeignKey(BuyProperties, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField(help_text="Weighted feature distance; lower is more similar")
+
+    def __str__(self):
+        return f"{self.property_id} -> {self.similar_id} (#{self.rank})"
+
+    class Meta:
+        verbose_name = "Similar Property"
+        verbose_name_plural = "Similar Properties"
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'rank'], name='unique_similar_property_rank'),
+        ]
+
+
+class ImageDerivative(models.Model):
+    """
+    A resized, re-encoded copy of an uploaded image, identified by the storage name of
+    the original. Written by services.images; read by the responsive_image template tag.
+    """
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    source = models.CharField(max_length=255, help_text="Storage name of the original image")
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(max_length=255)
+    size = models.PositiveIntegerField(help_text="File size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.format}, {self.width}w)"
+
+    class Meta:
+        verbose_name = "Image Derivative"
+        verbose_name_plural = "Image Derivatives"
+        ordering = ['source', 'format', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'format', 'width'], name='unique_image_derivative'),
+        ]
+
 
 class InteriorDesignRequest(models.Model):
     """Model to store interior design service requests"""
@@ -533,6 +838,7 @@ class PropertyImage(models.Model):
     image = models.ImageField(upload_to='property_images/')
     caption = models.CharField(max_length=100, blank=True)
     is_primary = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"Image for {self.property}"
@@ -545,6 +851,7 @@ class PropertyVideo(models.Model):
     video = models.FileField(upload_to='property_videos/')
     thumbnail = models.ImageField(upload_to='video_thumbnails/', blank=True, null=True)
     title = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"Video for {self.property}"
@@ -641,4 +948,105 @@ class UserFavorite(models.Model):
         unique_together = ['user', 'property']
         
     def __str__(self):
-        return f"{self.user.email}'s favorite: {self.property}"
\ No newline at end of file
+        return f"{self.user.email}'s favorite: {self.property}"
+
+class SavedSearch(models.Model):
+    """A buy search a user saved; new listings matching it are emailed to them."""
+    SCOPE_CHOICES = [
+        ('residential', 'Residential'),
+        ('commercial', 'Commercial'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, default='residential')
+    query = models.TextField(blank=True, help_text="Query string of the search results page")
+    filters = models.JSONField(default=dict, editable=False, help_text="Filter spec parsed from the query")
+    is_active = models.BooleanField(default=True, help_text="Email new matching listings")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name or f"{self.get_scope_display()} search #{self.pk}"
+
+    def get_absolute_url(self):
+        name = 'commercial_property_search_results' if self.scope == 'commercial' else 'property_search_results'
+        return f"{reverse(name)}?{self.query}"
+
+    class Meta:
+        verbose_name = "Saved Search"
+        verbose_name_plural = "Saved Searches"
+        ordering = ['-created_at']
+
+
+class SavedSearchAlert(models.Model):
+    """
+    A listing matched by a user's saved searches, queued for the next alert email.
+    Unique per user and listing, so a listing is announced once however many of the
+    user's searches match it and however often it is re-saved.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='saved_search_alerts')
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    source = models.CharField(max_length=20, choices=ListingIndex.SOURCE_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.email}: {self.get_source_display()} #{self.source_id}"
+
+    class Meta:
+        verbose_name = "Saved Search Alert"
+        verbose_name_plural = "Saved Search Alerts"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'source', 'source_id'], name='unique_saved_search_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['sent_at', 'user']),
+        ]
+
+
+class ChunkedUpload(models.Model):
+    """
+    A file sent in pieces through services.uploads and assembled on local disk until
+    a form claims it. `offset` counts the bytes received so far.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Declared file size in bytes")
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+    class Meta:
+        verbose_name = "Chunked Upload"
+        verbose_name_plural = "Chunked Uploads"
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+
+class StoredFile(models.Model):
+    """
+    A file kept once by services.storage.ContentAddressedStorage, under the SHA-256
+    of its content. `refcount` counts the saves that returned it minus the deletes.
+    """
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name: cas/<2 hex>/<2 hex>/<sha256><ext>")
+    size = models.PositiveBigIntegerField(help_text="File size in bytes")
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+    class Meta:
+        verbose_name = "Stored File"
+        verbose_name_plural = "Stored Files"
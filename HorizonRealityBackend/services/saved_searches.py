@@ -0,0 +1,291 @@
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models import Count, Max, Q
+from django.http import QueryDict
+from django.template.defaultfilters import pluralize
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from .listings import (
+    LISTING_CHOICE_FILTERS, get_listings_version, hydrate_listings, parse_listing_filters
+)
+from .geo import geo_location_ids
+from .models import ListingIndex, SavedSearch, SavedSearchAlert
+from .search import get_search_backend
+
+'''
+Saved searches and the engine that matches new listings against them.
+
+Checking a new listing with one query per saved search does not scale past a few
+thousand searches. Instead, every active saved search is compiled once into a
+SavedSearchMatcher, which groups the searches by facet:
+
+- for each facet column (property type, category, status, configuration, commercial
+  type, furnishing, location) a packed bitset per value of the searches accepting it,
+  plus one of the searches that leave the column open;
+- budget and area limits as arrays indexed by search;
+- geographic and text filters grouped by distinct value, so each distinct filter is
+  resolved once per batch instead of once per search.
+
+A listing is tested against every search at once by ANDing one bitset per column,
+then comparing the few remaining candidates with the range arrays. Alerts are
+deduplicated per user and listing by SavedSearchAlert's unique constraint and
+emailed as one digest per user.
+'''
+
+logger = logging.getLogger(__name__)
+
+# Search page parameters that only affect presentation, dropped when saving a search.
+PRESENTATION_PARAMS = ('sort', 'page', 'cursor', 'csrfmiddlewaretoken')
+SAVED_SEARCH_SCOPES = {
+    'residential': {'property_type': ['residential']},
+    'commercial': {'property_type': ['commercial']},
+}
+MATCH_BATCH_SIZE = 500
+ALERT_LISTINGS_PER_EMAIL = 20
+
+
+def get_saved_searches_version():
+    """
+    A value that changes whenever a saved search is created, edited or deleted. It is
+    read from the database rather than a cache generation, so Celery workers see web
+    edits even when each process has its own cache.
+    """
+    return tuple(SavedSearch.objects.aggregate(
+        count=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        last_id=Max('id'),
+        updated=Max('updated_at'),
+    ).values())
+
+
+def saved_search_query(params):
+    """Query string to store for a search page's parameters, without presentation ones."""
+    params = params.copy()
+    for param in PRESENTATION_PARAMS:
+        params.pop(param, None)
+    return params.urlencode()
+
+
+def saved_search_filters(scope, query):
+    return parse_listing_filters(QueryDict(query), scope=scope)
+
+
+def search_conditions(scope, filters):
+    """Allowed values per ListingIndex column for a saved search: its scope and choice filters combined."""
+    conditions = {column: set(values) for column, values in SAVED_SEARCH_SCOPES.get(scope, {}).items()}
+    for param, column in LISTING_CHOICE_FILTERS.items():
+        if param in filters:
+            values = set(filters[param])
+            conditions[column] = conditions[column] & values if column in conditions else values
+    return conditions
+
+
+def packed(size, positions):
+    mask = np.zeros(size, dtype=bool)
+    mask[positions] = True
+    return np.packbits(mask)
+
+
+class SavedSearchMatcher:
+    """Every active saved search compiled for matching listings in bulk."""
+
+    def __init__(self, searches):
+        """`searches` is a sequence of (id, user_id, scope, filters) tuples."""
+        self.size = len(searches)
+        self.search_ids = np.array([search[0] for search in searches], dtype=np.int64)
+        self.user_ids = np.array([search[1] for search in searches], dtype=np.int64)
+        self.everything = np.packbits(np.ones(self.size, dtype=bool))
+        self.nothing = np.packbits(np.zeros(self.size, dtype=bool))
+
+        accepting, open_positions = {}, {}
+        self.budget_min = np.full(self.size, np.nan)
+        self.budget_max = np.full(self.size, np.nan)
+        self.area_max = np.full(self.size, np.nan)
+        self.geo_groups = np.full(self.size, -1, dtype=np.int64)
+        self.text_groups = np.full(self.size, -1, dtype=np.int64)
+        geo_specs, terms = {}, {}
+        for position, (_, _, scope, filters) in enumerate(searches):
+            conditions = search_conditions(scope, filters)
+            for column in LISTING_CHOICE_FILTERS.values():
+                if column in conditions:
+                    for value in conditions[column]:
+                        accepting.setdefault(column, {}).setdefault(value, []).append(position)
+                else:
+                    open_positions.setdefault(column, []).append(position)
+            for key, limits in (('budget_min', self.budget_min), ('budget_max', self.budget_max), ('area_max', self.area_max)):
+                if filters.get(key) is not None:
+                    limits[position] = filters[key]
+            geo = tuple((key, tuple(filters[key])) for key in ('near', 'bbox') if key in filters)
+            if geo:
+                self.geo_groups[position] = geo_specs.setdefault(geo, len(geo_specs))
+            if filters.get('search'):
+                self.text_groups[position] = terms.setdefault(filters['search'], len(terms))
+
+        # Columns no search constrains are left out of matching altogether.
+        self.columns = {}
+        for column in LISTING_CHOICE_FILTERS.values():
+            if column in accepting:
+                self.columns[column] = (
+                    packed(self.size, open_positions.get(column, [])),
+                    {value: packed(self.size, positions) for value, positions in accepting[column].items()},
+                )
+        self.geo_specs = list(geo_specs)
+        self.terms = list(terms)
+        self._geo_locations = None
+
+    @classmethod
+    def from_database(cls):
+        searches = SavedSearch.objects.filter(is_active=True).order_by('id').values_list('id', 'user_id', 'scope', 'filters')
+        return cls(list(searches))
+
+    def geo_locations(self):
+        """location id -> array of the geo groups containing it, resolved again when listings change."""
+        version = get_listings_version()
+        if self._geo_locations is None or self._geo_locations[0] != version:
+            groups = {}
+            for group, spec in enumerate(self.geo_specs):
+                for location_id in geo_location_ids({key: list(value) for key, value in spec}):
+                    groups.setdefault(location_id, []).append(group)
+            self._geo_locations = (version, {location_id: np.array(value) for location_id, value in groups.items()})
+        return self._geo_locations[1]
+
+    def candidates(self, entry):
+        """Positions of the searches a listing satisfies, ignoring their text filters."""
+        mask = self.everything
+        for column, (open_bitmap, value_bitmaps) in self.columns.items():
+            mask = np.bitwise_and(mask, np.bitwise_or(open_bitmap, value_bitmaps.get(getattr(entry, column), self.nothing)))
+        positions = np.flatnonzero(np.unpackbits(mask, count=self.size))
+        if not len(positions):
+            return positions
+        keep = np.ones(len(positions), dtype=bool)
+        # Same semantics as price_overlap_q: a NULL price never satisfies a budget.
+        for limits, value, satisfies in (
+            (self.budget_max, entry.min_price, np.greater_equal),
+            (self.budget_min, entry.max_price, np.less_equal),
+            (self.area_max, entry.area, np.greater_equal),
+        ):
+            limit = limits[positions]
+            if value is None:
+                keep &= np.isnan(limit)
+            else:
+                keep &= np.isnan(limit) | satisfies(limit, float(value))
+        positions = positions[keep]
+        if self.geo_specs and len(positions):
+            groups = self.geo_groups[positions]
+            inside = self.geo_locations().get(entry.location_id, np.empty(0, dtype=np.int64))
+            positions = positions[(groups < 0) | np.isin(groups, inside)]
+        return positions
+
+    def match(self, entries):
+        """(entry, positions of the matching searches) for each active ListingIndex entry."""
+        results = [(entry, self.candidates(entry)) for entry in entries if entry.is_active]
+        if not self.terms:
+            return results
+        # Text filters go to the search backend once per distinct term, over only the
+        # listings that passed every other filter of a search using that term.
+        entries_by_term = {}
+        for entry, positions in results:
+            for group in set(self.text_groups[positions].tolist()) - {-1}:
+                entries_by_term.setdefault(group, []).append(entry.id)
+        matched_terms = {}
+        backend = get_search_backend()
+        for group, entry_ids in entries_by_term.items():
+            queryset = backend.search(ListingIndex.objects.filter(id__in=entry_ids), self.terms[group])
+            for entry_id in queryset.values_list('id', flat=True):
+                matched_terms.setdefault(entry_id, []).append(group)
+        return [
+            (entry, positions[np.isin(self.text_groups[positions], [-1] + matched_terms.get(entry.id, []))])
+            for entry, positions in results
+        ]
+
+
+_matcher = None
+_matcher_version = None
+_matcher_lock = threading.Lock()
+
+
+def get_saved_search_matcher():
+    """The compiled matcher of this process, rebuilt when a saved search changes."""
+    global _matcher, _matcher_version
+    version = get_saved_searches_version()
+    if version != _matcher_version:
+        with _matcher_lock:
+            if version != _matcher_version:
+                _matcher, _matcher_version = SavedSearchMatcher.from_database(), version
+    return _matcher
+
+
+def queue_alerts(matcher, results):
+    """Create the SavedSearchAlert rows for match results; existing user/listing pairs are skipped."""
+    alerts = []
+    for entry, positions in results:
+        # One alert per user, crediting their first matching search.
+        user_ids, first = np.unique(matcher.user_ids[positions], return_index=True)
+        search_ids = matcher.search_ids[positions[first]]
+        alerts += [
+            SavedSearchAlert(user_id=user_id, saved_search_id=search_id, source=entry.source, source_id=entry.source_id)
+            for user_id, search_id in zip(user_ids.tolist(), search_ids.tolist())
+        ]
+    SavedSearchAlert.objects.bulk_create(alerts, batch_size=1000, ignore_conflicts=True)
+    return len(alerts)
+
+
+def match_new_listings(batch_size=MATCH_BATCH_SIZE):
+    """
+    Match every active listing not matched yet against all saved searches, in batches;
+    returns the number of alerts queued (before deduplication against earlier ones).
+    """
+    matcher = get_saved_search_matcher()
+    queued = 0
+    while True:
+        entries = list(
+            ListingIndex.objects.filter(matched_at__isnull=True, is_active=True)
+            .order_by('id')
+            .only('id', 'source', 'source_id', 'is_active', 'area', 'min_price', 'max_price', *LISTING_CHOICE_FILTERS.values())
+            [:batch_size]
+        )
+        if not entries:
+            return queued
+        if matcher.size:
+            queued += queue_alerts(matcher, matcher.match(entries))
+        ListingIndex.objects.filter(id__in=[entry.id for entry in entries]).update(matched_at=timezone.now())
+
+
+def send_saved_search_alerts():
+    """Email every user with pending alerts one digest of their new listings; returns emails sent."""
+    pending = {}
+    for alert in SavedSearchAlert.objects.filter(sent_at__isnull=True).select_related('user', 'saved_search').order_by('id'):
+        pending.setdefault(alert.user, []).append(alert)
+    sent = 0
+    for user, alerts in pending.items():
+        entries = [ListingIndex(source=alert.source, source_id=alert.source_id) for alert in alerts[:ALERT_LISTINGS_PER_EMAIL]]
+        listings = hydrate_listings(entries)
+        searches = list({alert.saved_search_id: alert.saved_search for alert in alerts}.values())
+        try:
+            if listings:
+                html_message = render_to_string('emails/saved_search_alert.html', {
+                    'user': user,
+                    'properties': listings,
+                    'property_count': len(alerts),
+                    'saved_searches': searches,
+                    'base_url': getattr(settings, 'BASE_URL', ''),
+                })
+                send_mail(
+                    subject=f"{len(alerts)} new propert{pluralize(len(alerts), 'y,ies')} "
+                            f"match{pluralize(len(alerts), 'es,')} your saved searches",
+                    message=strip_tags(html_message),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[user.email],
+                    html_message=html_message,
+                    fail_silently=False,
+                )
+                sent += 1
+        except Exception:
+            logger.exception("Could not send saved search alerts to user %s", user.pk)
+            continue
+        SavedSearchAlert.objects.filter(id__in=[alert.id for alert in alerts]).update(sent_at=timezone.now())
+    return sent
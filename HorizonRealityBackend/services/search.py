@@ -0,0 +1,119 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+'''
+Full-text search over ListingIndex.search_text, the searchable text of a listing
+(project name, location, configuration and its salient features or additional details).
+
+The backend is picked from the database vendor: a FULLTEXT index on MySQL and an FTS5
+table on SQLite. Set LISTING_SEARCH_BACKEND to a dotted path to use another one.
+Every backend annotates matches with `search_rank` (higher is more relevant) and
+treats each word of the query as a required prefix, so "sky 3bh" finds
+"Skyline Towers - 3 BHK". ListingIndex.sync and ListingIndex.remove keep the
+index current as listings are saved and deleted.
+'''
+
+SEARCH_TERM = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 8
+
+
+def search_terms(query):
+    return SEARCH_TERM.findall(query.lower())[:MAX_SEARCH_TERMS]
+
+
+class BasicSearchBackend:
+    """Unindexed fallback: every term must appear somewhere in the search text."""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query):
+            condition &= Q(search_text__icontains=term)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def index(self, entry):
+        pass
+
+    def remove(self, entry_ids):
+        pass
+
+
+class MySQLFullTextBackend(BasicSearchBackend):
+    """
+    MATCH ... AGAINST in boolean mode on the FULLTEXT index created by migration
+    0006. InnoDB maintains the index itself, so saves need no extra work.
+    """
+    # Words shorter than innodb_ft_min_token_size are not indexed.
+    min_term_length = 3
+
+    def search(self, queryset, query):
+        terms = [term for term in search_terms(query) if len(term) >= self.min_term_length]
+        if not terms:
+            return super().search(queryset, query)
+        expression = ' '.join(f'+{term}*' for term in terms)
+        table = queryset.model._meta.db_table
+        return queryset.annotate(search_rank=RawSQL(
+            f'MATCH ({table}.search_text) AGAINST (%s IN BOOLEAN MODE)',
+            [expression],
+            output_field=FloatField()
+        )).filter(search_rank__gt=0)
+
+
+class SQLiteFTS5Backend(BasicSearchBackend):
+    """
+    FTS5 table keyed by ListingIndex id, created by migration 0006 and updated
+    row by row from ListingIndex.sync and ListingIndex.remove.
+    """
+    fts_table = 'services_listingindex_fts'
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        table = queryset.model._meta.db_table
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s',
+            [expression]
+        )).annotate(search_rank=RawSQL(
+            # bm25() is lower for better matches; negate it so higher ranks first.
+            f'SELECT -bm25({self.fts_table}) FROM {self.fts_table} '
+            f'WHERE {self.fts_table} MATCH %s AND rowid = {table}.id',
+            [expression],
+            output_field=FloatField()
+        ))
+
+    def index(self, entry):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.fts_table} WHERE rowid = %s', [entry.pk])
+            cursor.execute(
+                f'INSERT INTO {self.fts_table} (rowid, search_text) VALUES (%s, %s)',
+                [entry.pk, entry.search_text]
+            )
+
+    def remove(self, entry_ids):
+        if not entry_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(entry_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})', list(entry_ids))
+
+
+SEARCH_BACKENDS = {
+    'mysql': MySQLFullTextBackend,
+    'sqlite': SQLiteFTS5Backend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'LISTING_SEARCH_BACKEND', None)
+        backend_class = import_string(path) if path else SEARCH_BACKENDS.get(connection.vendor, BasicSearchBackend)
+        _backend = backend_class()
+    return _backend
@@ -0,0 +1,205 @@
+import logging
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from .models import (
+    BuyProperties, SellResidentialProperties, SellCommercialProperties, ListingIndex, PropertyLocation, SavedSearch,
+    PropertyImage, PropertyVideo, NearbyPlaces, FeatureAmenity
+)
+from .images import enqueue_image_derivatives, image_fields
+from .listings import bump_listings_version
+from .saved_searches import saved_search_filters
+from .tasks import match_saved_searches_task, refresh_similar_properties_task
+from django.conf import settings
+from home.baking import is_baked, schedule_bake, schedule_unbake
+from home.page_cache import purge_page
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=BuyProperties)
+@receiver(post_save, sender=SellResidentialProperties)
+@receiver(post_save, sender=SellCommercialProperties)
+def sync_listing_index(sender, instance, **kwargs):
+    """Keep the ListingIndex row of a listing in step with the listing itself"""
+    if kwargs.get('raw'):
+        return
+    entry = ListingIndex.sync(instance)
+    bump_listings_version()
+    if entry is not None and entry.is_active and entry.matched_at is None:
+        transaction.on_commit(enqueue_saved_search_matching)
+
+
+@receiver(post_delete, sender=BuyProperties)
+@receiver(post_delete, sender=SellResidentialProperties)
+@receiver(post_delete, sender=SellCommercialProperties)
+def remove_listing_index(sender, instance, **kwargs):
+    ListingIndex.remove(instance)
+    bump_listings_version()
+
+
+@receiver(post_save, sender=PropertyLocation)
+def reindex_location_listings(sender, instance, created, **kwargs):
+    """Location names are part of the search text, so renaming one reindexes its listings"""
+    if created or kwargs.get('raw'):
+        return
+    for model in (BuyProperties, SellResidentialProperties, SellCommercialProperties):
+        for listing in model.objects.filter(locations=instance).select_related('locations'):
+            ListingIndex.sync(listing)
+    bump_listings_version()
+
+
+def enqueue_saved_search_matching():
+    try:
+        match_saved_searches_task.delay()
+    except Exception:
+        # The periodic matching run picks the listing up if the broker is unavailable.
+        logger.exception("Could not enqueue saved search matching")
+
+
+def enqueue_similar_properties_refresh(property_id):
+    try:
+        refresh_similar_properties_task.delay(property_id)
+    except Exception:
+        # The nightly rebuild catches up if the broker is unavailable.
+        logger.exception("Could not enqueue the similar properties refresh for property %s", property_id)
+
+
+@receiver(post_save, sender=BuyProperties)
+@receiver(post_delete, sender=BuyProperties)
+def refresh_similar_properties(sender, instance, **kwargs):
+    """Recompute the neighbour lists a saved or deleted buy listing can change, after commit"""
+    if kwargs.get('raw'):
+        return
+    property_id = instance.pk
+    transaction.on_commit(lambda: enqueue_similar_properties_refresh(property_id))
+
+
+@receiver(post_save, sender=BuyProperties)
+@receiver(post_delete, sender=BuyProperties)
+def purge_property_page(sender, instance, **kwargs):
+    """Drop the cached detail page, at its previous URL too; the list pages follow the listings version"""
+    if instance.slug:
+        purge_page(instance.get_absolute_url())
+    previous_path = previous_property_path(instance)
+    if previous_path:
+        purge_page(previous_path)
+
+
+def previous_property_path(instance):
+    """Detail page path of a buy listing before a save that changed its slug, else None"""
+    previous_slug = instance.loaded_value('slug')
+    if previous_slug and previous_slug != instance.slug:
+        return reverse('property:property_detail', kwargs={'slug': previous_slug})
+    return None
+
+
+def purge_property_pages(queryset):
+    paths = [
+        reverse('property:property_detail', kwargs={'slug': slug})
+        for slug in queryset.exclude(slug='').values_list('slug', flat=True)
+    ]
+    for path in paths:
+        purge_page(path)
+    rebake_property_paths(paths)
+
+
+def rebake_property_paths(paths):
+    """Re-bake the detail pages among `paths` that are baked (all of them with BAKE_PROPERTY_PAGES)"""
+    paths = [path for path in paths if settings.BAKE_PROPERTY_PAGES or is_baked(path)]
+    if paths:
+        schedule_bake(paths)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyVideo)
+@receiver(post_delete, sender=PropertyVideo)
+def property_media_changed(sender, instance, **kwargs):
+    """Detail page bundles are cached under the listings version (see services.detail)"""
+    if kwargs.get('raw'):
+        return
+    touch_listings(BuyProperties.objects.filter(pk=instance.property_id))
+    bump_listings_version()
+    try:
+        path = instance.property.get_absolute_url()
+    except BuyProperties.DoesNotExist:
+        return
+    purge_page(path)
+    rebake_property_paths([path])
+
+
+@receiver(m2m_changed, sender=BuyProperties.nearby_amenities.through)
+@receiver(m2m_changed, sender=BuyProperties.feature_amenities.through)
+def property_amenities_changed(sender, instance, action, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if isinstance(instance, BuyProperties):
+            touch_listings(BuyProperties.objects.filter(pk=instance.pk))
+            purge_page(instance.get_absolute_url())
+        elif pk_set:
+            touch_listings(BuyProperties.objects.filter(pk__in=pk_set))
+            purge_property_pages(BuyProperties.objects.filter(pk__in=pk_set))
+        bump_listings_version()
+
+
+@receiver(post_save, sender=NearbyPlaces)
+@receiver(pre_delete, sender=NearbyPlaces)
+@receiver(post_save, sender=FeatureAmenity)
+@receiver(pre_delete, sender=FeatureAmenity)
+def amenity_changed(sender, instance, **kwargs):
+    """Renamed or deleted amenities change the pages of the listings having them"""
+    if kwargs.get('raw'):
+        return
+    touch_listings(instance.properties.all())
+    purge_property_pages(instance.properties.all())
+    bump_listings_version()
+
+
+def touch_listings(queryset):
+    """Move the updated_at of listings whose media or amenities changed (see BuyProperties.updated_at)"""
+    queryset.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=BuyProperties)
+def rebake_property_page(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    rebake_property_paths([instance.get_absolute_url()])
+    previous_path = previous_property_path(instance)
+    if previous_path:
+        # The page moved: stop serving the file baked at the old URL.
+        schedule_unbake([previous_path])
+
+
+@receiver(post_delete, sender=BuyProperties)
+def unbake_property_page(sender, instance, **kwargs):
+    schedule_unbake([instance.get_absolute_url()])
+
+
+@receiver(pre_save, sender=SavedSearch)
+def parse_saved_search_filters(sender, instance, **kwargs):
+    instance.filters = saved_search_filters(instance.scope, instance.query)
+
+
+def note_new_images(sender, instance, **kwargs):
+    """Remember which image fields hold a file uploaded with this save"""
+    instance._new_images = [
+        field_name for field_name in IMAGE_FIELD_NAMES[sender]
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+
+
+def generate_new_image_derivatives(sender, instance, **kwargs):
+    sources = [getattr(instance, field_name).name for field_name in instance.__dict__.pop('_new_images', ())]
+    if sources and not kwargs.get('raw'):
+        transaction.on_commit(lambda: enqueue_image_derivatives(sources))
+
+
+IMAGE_FIELD_NAMES = image_fields()
+for model in IMAGE_FIELD_NAMES:
+    pre_save.connect(note_new_images, sender=model, dispatch_uid=f'note_new_images:{model._meta.label}')
+    post_save.connect(
+        generate_new_image_derivatives, sender=model, dispatch_uid=f'generate_new_image_derivatives:{model._meta.label}'
+    )
@@ -0,0 +1,209 @@
+import math
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+from .models import BuyProperties, SimilarProperty
+
+'''
+"Similar properties" engine for the property detail page.
+
+Every buy listing becomes a weighted feature vector:
+
+- one-hot property type, configuration, commercial type, status and location;
+- log area and log mid price, standardized over the inventory;
+- the location's coordinates in units of 10 km, when known;
+- multi-hot feature amenities, scaled so a listing's amenities weigh one in total.
+
+Neighbours are the active listings nearest in Euclidean distance. Distances are
+computed with matrix products over blocks of rows, so the whole inventory is ranked
+in a few NumPy calls. The top SIMILAR_PROPERTIES_K per listing are stored in
+SimilarProperty.
+
+rebuild_similar_properties() recomputes every listing. refresh_similar_properties()
+runs after one listing changes and rewrites only the lists that can be affected:
+the changed listing's own list, lists that contained it, lists it now beats the last
+entry of, and lists shorter than K.
+'''
+
+SIMILAR_PROPERTIES_K = 8
+BLOCK_SIZE = 512
+
+# Relative weight of each feature block in the distance.
+FEATURE_WEIGHTS = {
+    'property_type': 3.0,
+    'configuration': 1.5,
+    'commercial_type': 1.5,
+    'status': 0.5,
+    'location': 1.0,
+    'coordinates': 1.0,
+    'area': 1.0,
+    'price': 1.5,
+    'amenities': 0.5,
+}
+FEATURE_COLUMNS = (
+    'id', 'property_type', 'configuration', 'commercial_type', 'status', 'locations_id',
+    'area', 'min_budget_inr', 'max_budget_inr', 'is_property_active',
+    'locations__latitude', 'locations__longitude',
+)
+
+
+def one_hot(values, weight):
+    categories = {value: index for index, value in enumerate(sorted({v for v in values if v is not None}, key=str))}
+    block = np.zeros((len(values), max(len(categories), 1)), dtype=np.float32)
+    for row, value in enumerate(values):
+        if value is not None:
+            block[row, categories[value]] = weight
+    return block
+
+
+def standardized(values, weight):
+    """Column of log values scaled to unit variance; missing values sit at the mean."""
+    logs = np.array([math.log1p(float(value)) if value else np.nan for value in values], dtype=np.float64)
+    known = logs[~np.isnan(logs)]
+    if known.size:
+        mean, std = known.mean(), known.std() or 1.0
+        logs = np.where(np.isnan(logs), mean, logs)
+        logs = (logs - mean) / std
+    else:
+        logs = np.zeros(len(values))
+    return (logs * weight).astype(np.float32).reshape(-1, 1)
+
+
+def coordinates_block(rows, weight):
+    latitudes = np.array([np.nan if row[10] is None else float(row[10]) for row in rows], dtype=np.float64)
+    longitudes = np.array([np.nan if row[11] is None else float(row[11]) for row in rows], dtype=np.float64)
+    known = ~np.isnan(latitudes)
+    block = np.zeros((len(rows), 2), dtype=np.float32)
+    if known.any():
+        # Roughly 111 km per degree; one unit is 10 km.
+        mean_lat, mean_lng = latitudes[known].mean(), longitudes[known].mean()
+        block[:, 0] = np.where(known, latitudes - mean_lat, 0) * 11.1 * weight
+        block[:, 1] = np.where(known, longitudes - mean_lng, 0) * 11.1 * math.cos(math.radians(mean_lat)) * weight
+    return block
+
+
+def amenities_block(ids, weight):
+    through = BuyProperties.feature_amenities.through
+    positions = {listing_id: row for row, listing_id in enumerate(ids)}
+    pairs = list(through.objects.values_list('buyproperties_id', 'featureamenity_id'))
+    amenity_columns = {amenity_id: column for column, amenity_id in enumerate(sorted({pair[1] for pair in pairs}))}
+    block = np.zeros((len(ids), max(len(amenity_columns), 1)), dtype=np.float32)
+    for listing_id, amenity_id in pairs:
+        if listing_id in positions:
+            block[positions[listing_id], amenity_columns[amenity_id]] = 1.0
+    counts = block.sum(axis=1, keepdims=True)
+    return np.divide(block, np.sqrt(counts), out=block, where=counts > 0) * weight
+
+
+def load_features():
+    """Listing ids, their feature matrix and a mask of the active ones."""
+    rows = list(BuyProperties.objects.order_by('id').values_list(*FEATURE_COLUMNS))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    columns = list(zip(*rows)) if rows else [()] * len(FEATURE_COLUMNS)
+    prices = [
+        ((row[7] or row[8]) + (row[8] or row[7])) / 2 if row[7] or row[8] else None
+        for row in rows
+    ]
+    matrix = np.hstack([
+        one_hot(columns[1], FEATURE_WEIGHTS['property_type']),
+        one_hot(columns[2], FEATURE_WEIGHTS['configuration']),
+        one_hot(columns[3], FEATURE_WEIGHTS['commercial_type']),
+        one_hot(columns[4], FEATURE_WEIGHTS['status']),
+        one_hot(columns[5], FEATURE_WEIGHTS['location']),
+        coordinates_block(rows, FEATURE_WEIGHTS['coordinates']),
+        standardized(columns[6], FEATURE_WEIGHTS['area']),
+        standardized(prices, FEATURE_WEIGHTS['price']),
+        amenities_block(ids, FEATURE_WEIGHTS['amenities']),
+    ]) if rows else np.zeros((0, 1), dtype=np.float32)
+    active = np.array([bool(row[9]) for row in rows], dtype=bool)
+    return ids, matrix, active
+
+
+def nearest_neighbours(matrix, rows, active, k=SIMILAR_PROPERTIES_K):
+    """
+    For each row position in `rows`, the positions and distances of its k nearest
+    active listings (itself excluded), nearest first.
+    """
+    candidates = np.flatnonzero(active)
+    count = min(k, len(candidates))
+    if not count:
+        return [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in rows]
+    targets = matrix[candidates]
+    target_norms = np.einsum('ij,ij->i', targets, targets)
+    results = []
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block_rows = np.asarray(rows[start:start + BLOCK_SIZE])
+        block = matrix[block_rows]
+        norms = np.einsum('ij,ij->i', block, block)
+        squared = norms[:, None] + target_norms[None, :] - 2 * block @ targets.T
+        squared[block_rows[:, None] == candidates[None, :]] = np.inf
+        nearest = np.argpartition(squared, count - 1, axis=1)[:, :count]
+        for row_squared, row_nearest in zip(squared, nearest):
+            distances = row_squared[row_nearest]
+            order = np.argsort(distances, kind='stable')
+            row_nearest, distances = row_nearest[order], distances[order]
+            keep = np.isfinite(distances)
+            results.append((candidates[row_nearest[keep]], np.sqrt(np.maximum(distances[keep], 0))))
+    return results
+
+
+def write_neighbours(ids, rows, neighbours):
+    """Replace the stored lists of the listings at `rows`."""
+    entries = [
+        SimilarProperty(
+            property_id=int(ids[row]),
+            similar_id=int(ids[position]),
+            rank=rank,
+            distance=float(distance)
+        )
+        for row, (positions, distances) in zip(rows, neighbours)
+        for rank, (position, distance) in enumerate(zip(positions, distances), start=1)
+    ]
+    with transaction.atomic():
+        SimilarProperty.objects.filter(property_id__in=[int(ids[row]) for row in rows]).delete()
+        SimilarProperty.objects.bulk_create(entries, batch_size=1000)
+
+
+def rebuild_similar_properties():
+    """Recompute every listing's neighbours; returns the number of listings."""
+    ids, matrix, active = load_features()
+    rows = np.arange(len(ids))
+    neighbours = nearest_neighbours(matrix, rows, active)
+    with transaction.atomic():
+        SimilarProperty.objects.all().delete()
+        write_neighbours(ids, rows, neighbours)
+    return len(ids)
+
+
+def refresh_similar_properties(property_id):
+    """
+    Rewrite the neighbour lists that can have changed after one listing was saved or
+    deleted; returns how many were rewritten. The standardization of area and price
+    shifts slightly with every change, so the scheduled full rebuild still runs.
+    """
+    ids, matrix, active = load_features()
+    stored = {
+        row['property_id']: row
+        for row in SimilarProperty.objects.values('property_id').annotate(
+            count=Count('id'), furthest=Max('distance')
+        )
+    }
+    affected = set(SimilarProperty.objects.filter(similar_id=property_id).values_list('property_id', flat=True))
+    # Lists shorter than they could be, e.g. written when few listings were active.
+    active_count = int(active.sum())
+    for row, listing_id in enumerate(ids.tolist()):
+        possible = min(SIMILAR_PROPERTIES_K, active_count - int(active[row]))
+        if stored.get(listing_id, {}).get('count', 0) < possible:
+            affected.add(listing_id)
+    position = int(np.searchsorted(ids, property_id))
+    if position < len(ids) and ids[position] == property_id:
+        affected.add(property_id)
+        if active[position]:
+            # Lists whose furthest neighbour is further away than the changed listing.
+            distances = np.sqrt(((matrix - matrix[position]) ** 2).sum(axis=1))
+            furthest = np.array([stored.get(listing_id, {}).get('furthest', np.inf) for listing_id in ids.tolist()])
+            affected.update(ids[distances < furthest].tolist())
+    rows = [row for row, listing_id in enumerate(ids.tolist()) if listing_id in affected]
+    if rows:
+        write_neighbours(ids, rows, nearest_neighbours(matrix, rows, active))
+    return len(rows)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+'''
+Content-addressed media storage.
+
+Uploads used to land in flat directories (property_images/, property_inquiries/...)
+under MEDIA_ROOT, one copy per upload even when the same brochure or photo was sent
+for many listings. ContentAddressedStorage keeps every file once, named after the
+SHA-256 of its content and sharded two levels deep:
+
+    cas/3f/a2/3fa2...e9.jpg
+
+so a directory holds 1/65536th of the files. The upload_to directory of the field
+is not part of the name; the original extension is kept for content types.
+
+save() streams the content into a temporary file next to its final place while
+hashing it, then hard-links it into place: a name only ever appears complete, and
+when the content is already stored the link fails and the copy is dropped. Files
+that already sit on disk (chunked uploads) are hashed and linked without a copy.
+Each StoredFile row counts the saves that returned its name; delete() decrements
+the count and removes the file at zero. Reusing a stored file updates its
+modification time.
+
+Names outside cas/ (files from before this storage) are read and deleted as with
+FileSystemStorage. `manage.py migrate_media_to_cas` moves them over.
+'''
+
+CAS_PREFIX = 'cas'
+HASH_BLOCK_SIZE = 1024 * 1024
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def is_content_addressed(name):
+    return (name or '').startswith(CAS_PREFIX + '/')
+
+
+def content_name(digest, original_name):
+    """cas/<2 hex>/<2 hex>/<digest><ext> for content with `digest` uploaded as `original_name`."""
+    extension = os.path.splitext(original_name or '')[1].lower()
+    if not EXTENSION_RE.match(extension):
+        extension = ''
+    return posixpath.join(CAS_PREFIX, digest[:2], digest[2:4], digest + extension)
+
+
+@deconstructible(path='services.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct content once, by SHA-256, with a reference count."""
+
+    def get_available_name(self, name, max_length=None):
+        # The name is derived from the content in _save(); an existing file is reused.
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            digest, size = self.hash_file(content.temporary_file_path())
+            name = content_name(digest, name)
+            self.store(content.temporary_file_path(), name, size, copy_from=content)
+            return name
+        directory = self.path(CAS_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as handle:
+            try:
+                hasher = hashlib.sha256()
+                size = 0
+                content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    handle.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.unlink(handle.name)
+                raise
+        name = content_name(hasher.hexdigest(), name)
+        try:
+            self.store(handle.name, name, size)
+        finally:
+            os.unlink(handle.name)
+        return name
+
+    def store(self, source_path, name, size, copy_from=None):
+        """Count a reference to `name` and put the file there, holding its StoredFile row against delete()."""
+        from .models import StoredFile
+        with transaction.atomic():
+            stored, created = StoredFile.objects.select_for_update().get_or_create(
+                name=name, defaults={'size': size, 'refcount': 1}
+            )
+            if not created:
+                StoredFile.objects.filter(pk=stored.pk).update(refcount=F('refcount') + 1)
+            self.link_into_place(source_path, name, copy_from)
+
+    def hash_file(self, path):
+        hasher = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b''):
+                hasher.update(block)
+                size += len(block)
+        return hasher.hexdigest(), size
+
+    def link_into_place(self, source_path, name, copy_from=None):
+        """Hard-link `source_path` as `name` unless that content is already stored."""
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Fresh again for the grace period of services.media_gc.
+            os.utime(full_path)
+            return
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.chmod(source_path, self.file_permissions_mode or 0o644)
+        try:
+            os.link(source_path, full_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            if copy_from is None:
+                raise
+            # Another file system (or no hard links): copy through a temporary file.
+            copy_from.seek(0)
+            with tempfile.NamedTemporaryFile(dir=self.path(CAS_PREFIX), prefix='.upload-', delete=False) as handle:
+                for chunk in copy_from.chunks():
+                    handle.write(chunk)
+            try:
+                self.link_into_place(handle.name, name)
+            finally:
+                os.unlink(handle.name)
+            return
+        self._ensure_location_group_id(full_path)
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            return super().delete(name)
+        from .models import StoredFile
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                # Not saved through this storage: leave the file alone.
+                return
+            if stored.refcount > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(refcount=F('refcount') - 1)
+                return
+            stored.delete()
+            super().delete(name)
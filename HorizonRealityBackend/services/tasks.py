@@ -6,6 +6,11 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from .models import Newsletter, BuyProperties, CustomUser
+from .similarity import rebuild_similar_properties, refresh_similar_properties
+from .saved_searches import match_new_listings, send_saved_search_alerts
+from home.baking import bake_pages
+from .images import generate_image_derivatives
+from .uploads import clean_chunked_uploads
 
 @shared_task
 def send_weekly_property_newsletter():
@@ -56,3 +61,49 @@ def send_weekly_property_newsletter():
         return result_message
     except Exception as e:
         return f"Error: {str(e)}"
+
+
+@shared_task
+def rebuild_similar_properties_task():
+    """Recompute the similar properties of every buy listing"""
+    return f"Similar properties rebuilt for {rebuild_similar_properties()} properties"
+
+
+@shared_task
+def refresh_similar_properties_task(property_id):
+    """Recompute the similar-property lists affected by one changed buy listing"""
+    return f"Similar properties refreshed for {refresh_similar_properties(property_id)} properties"
+
+
+@shared_task
+def match_saved_searches_task():
+    """Match listings created or approved since the last run against every saved search"""
+    return f"Queued {match_new_listings()} saved search alerts"
+
+
+@shared_task
+def send_saved_search_alerts_task():
+    """Email users the new listings matching their saved searches"""
+    return f"Saved search alerts sent to {send_saved_search_alerts()} users"
+
+
+@shared_task
+def bake_pages_task(paths=None):
+    """Re-bake the given pages, or every bakeable page (see home.baking)"""
+    if not settings.BAKED_PAGES:
+        return "Page baking is disabled"
+    baked, removed = bake_pages(paths)
+    return f"Baked {len(baked)} pages, removed {len(removed)}"
+
+
+@shared_task
+def generate_image_derivatives_task(sources):
+    """Write the responsive derivatives of newly uploaded images (see services.images)"""
+    written = sum(generate_image_derivatives(source) for source in sources)
+    return f"Wrote {written} image derivatives for {len(sources)} images"
+
+
+@shared_task
+def clean_chunked_uploads_task():
+    """Delete resumable uploads that were abandoned or never claimed by a form"""
+    return f"Removed {clean_chunked_uploads()} expired uploads"
@@ -0,0 +1,39 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+from services.images import image_derivatives
+
+'''
+{% load responsive_images %}
+{% responsive_image property.image sizes="(min-width: 992px) 33vw, 100vw" class="img-fluid" alt=property %}
+
+Renders a <picture> offering the WebP derivatives of the image, with the JPEG ones
+in the <img> srcset, so the browser downloads the smallest copy that fills the slot
+described by `sizes`. Images without derivatives yet render as a plain <img> of the
+original. Other keyword arguments become attributes of the <img>.
+'''
+
+register = template.Library()
+
+
+def srcset(candidates):
+    return ', '.join(f"{default_storage.url(name)} {width}w" for name, width in candidates)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    if not image:
+        return ''
+    attributes = format_html_join('', ' {}="{}"', ((name, value) for name, value in attrs.items() if value is not None))
+    srcsets = image_derivatives(image.name)
+    if 'jpeg' not in srcsets:
+        return format_html('<img src="{}"{}>', image.url, attributes)
+    webp = srcsets.get('webp')
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        format_html('<source type="image/webp" srcset="{}" sizes="{}">', srcset(webp), sizes) if webp else '',
+        default_storage.url(srcsets['jpeg'][-1][0]),
+        srcset(srcsets['jpeg']),
+        sizes,
+        attributes,
+    )
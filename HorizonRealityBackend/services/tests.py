@@ -1,3 +1,404 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from home.baking import bake_pages, is_baked, load_manifest
+from home.forms import SellResidentialPropertyForm
+from .detail import PropertyDetailBundle, get_property_detail_bundle
+from .geo import haversine_km, locations_in_bounds, locations_near
+from .media_gc import delete_orphan, find_orphans
+from .tasks import bake_pages_task
+from .uploads import UploadOffsetMismatch, claim_upload, start_upload, upload_path, write_chunk
+from .models import (
+    BuyProperties, ChunkedUpload, FeatureAmenity, ImageDerivative, NearbyPlaces, PropertyImage, PropertyLocation,
+    PropertyVideo, SimilarProperty, StoredFile
+)
+from .storage import CAS_PREFIX
 
-# Create your tests here.
+
+def create_listing(name, location):
+    return BuyProperties.objects.create(
+        project_name=name,
+        property_type='residential',
+        configuration='2bhk',
+        area=1200,
+        min_budget=50,
+        min_budget_unit='lakhs',
+        max_budget=60,
+        max_budget_unit='lakhs',
+        locations=location,
+        is_property_active=True,
+    )
+
+
+@override_settings(PAGE_CACHE=False, BAKED_PAGES=False)
+class PropertyDetailBundleTests(TestCase):
+    """The detail page payload is loaded in a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = PropertyLocation.objects.create(name="Whitefield")
+        cls.property = create_listing("Lake View", cls.location)
+        cls.neighbours = [create_listing(f"Neighbour {i}", cls.location) for i in range(3)]
+        SimilarProperty.objects.bulk_create([
+            SimilarProperty(property=cls.property, similar=neighbour, rank=rank, distance=rank)
+            for rank, neighbour in enumerate(cls.neighbours, start=1)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def add_media(self, count):
+        for i in range(count):
+            PropertyImage.objects.create(property=self.property, image=f'property_images/{i}.jpg', caption=f"Image {i}")
+            PropertyVideo.objects.create(property=self.property, video=f'property_videos/{i}.mp4', title=f"Video {i}")
+            self.property.nearby_amenities.add(
+                NearbyPlaces.objects.create(name=f"School {i}", distance_value=i + 1)
+            )
+            self.property.feature_amenities.add(FeatureAmenity.objects.create(name=f"Pool {i}"))
+
+    def test_query_count_does_not_grow_with_related_rows(self):
+        self.add_media(1)
+        with self.assertNumQueries(6):
+            bundle = PropertyDetailBundle.load(self.property.slug)
+        self.add_media(5)
+        with self.assertNumQueries(6):
+            bundle = PropertyDetailBundle.load(self.property.slug)
+        self.assertEqual(len(bundle.images), 6)
+        self.assertEqual(len(bundle.feature_amenities), 6)
+        self.assertEqual([listing.pk for listing in bundle.related_properties], [listing.pk for listing in self.neighbours])
+
+    def test_fallback_related_properties_cost_one_query(self):
+        SimilarProperty.objects.all().delete()
+        with self.assertNumQueries(7):
+            bundle = PropertyDetailBundle.load(self.property.slug)
+        self.assertEqual({listing.pk for listing in bundle.related_properties}, {listing.pk for listing in self.neighbours})
+
+    def test_rendering_runs_no_queries_beyond_the_bundle(self):
+        self.add_media(3)
+        url = self.property.get_absolute_url()
+        self.client.get(url)
+        # Only the Last-Modified lookup of the conditional GET check.
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, "Neighbour 2")
+        self.assertContains(response, "Pool 2")
+
+    def test_cache_follows_the_listings_version(self):
+        get_property_detail_bundle(self.property.slug)
+        with self.assertNumQueries(0):
+            get_property_detail_bundle(self.property.slug)
+        PropertyImage.objects.create(property=self.property, image='property_images/new.jpg')
+        self.assertEqual(len(get_property_detail_bundle(self.property.slug).images), 1)
+
+
+class GeoSearchTests(TestCase):
+    """The geohash cell queries find exactly what a distance check over every row finds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(20):
+            for j in range(20):
+                PropertyLocation.objects.create(
+                    name=f"Point {i}-{j}", latitude=round(12.80 + i * 0.023, 6), longitude=round(77.45 + j * 0.031, 6)
+                )
+        cls.locations = list(PropertyLocation.objects.all())
+
+    def test_radius_search_matches_brute_force(self):
+        for latitude, longitude, radius_km in ((12.97, 77.59, 5), (13.05, 77.70, 12), (12.81, 77.46, 1.5), (13.2, 77.9, 30)):
+            expected = {
+                location.pk for location in self.locations
+                if haversine_km(latitude, longitude, location.latitude, location.longitude) <= radius_km
+            }
+            found = [location.pk for location, _ in locations_near(latitude, longitude, radius_km)]
+            self.assertEqual(set(found), expected, (latitude, longitude, radius_km))
+            self.assertEqual(len(found), len(expected))
+
+    def test_bounding_box_matches_brute_force(self):
+        south, west, north, east = 12.9, 77.5, 13.1, 77.8
+        expected = {
+            location.pk for location in self.locations
+            if south <= location.latitude <= north and west <= location.longitude <= east
+        }
+        self.assertTrue(expected)
+        self.assertEqual(set(locations_in_bounds(south, west, north, east).values_list('pk', flat=True)), expected)
+
+
+@override_settings(PAGE_CACHE=True, BAKED_PAGES=False)
+class PropertyPagePurgeTests(TestCase):
+    """Cached detail pages are dropped when the listing or what it shows changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.property = create_listing("Palm Grove", PropertyLocation.objects.create(name="Hebbal"))
+
+    def test_renamed_listing_is_not_served_at_its_old_url(self):
+        old_url = self.property.get_absolute_url()
+        self.assertEqual(self.client.get(old_url)['X-Page-Cache'], 'miss')
+        self.property.project_name = "Palm Grove Phase 2"
+        self.property.save()
+        self.assertNotEqual(self.property.get_absolute_url(), old_url)
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+
+    def test_renamed_amenity_purges_the_pages_showing_it(self):
+        amenity = FeatureAmenity.objects.create(name="Rooftop Pool")
+        self.property.feature_amenities.add(amenity)
+        url = self.property.get_absolute_url()
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        amenity.name = "Infinity Pool"
+        amenity.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, "Infinity Pool")
+
+
+@override_settings(PAGE_CACHE=False, BAKED_PAGES=True, BAKE_PROPERTY_PAGES=False)
+class PropertyPageBakingTests(TestCase):
+    """Baked detail pages follow renames and media changes."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(override_settings(BAKED_PAGES_DIR=directory))
+        # Run the bake task in-process instead of through the broker.
+        conf = bake_pages_task.app.conf
+        self.addCleanup(setattr, conf, 'task_always_eager', conf.task_always_eager)
+        conf.task_always_eager = True
+        self.property = create_listing("Cedar Court", PropertyLocation.objects.create(name="Yelahanka"))
+        self.path = self.property.get_absolute_url()
+        bake_pages([self.path])
+
+    def test_renamed_listing_is_unbaked_at_its_old_url(self):
+        self.assertTrue(is_baked(self.path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.project_name = "Cedar Court Towers"
+            self.property.save()
+        self.assertFalse(is_baked(self.path))
+
+    def test_media_saved_outside_the_admin_rebakes_the_page(self):
+        etag = load_manifest()[self.path]['etag']
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyImage.objects.create(property=self.property, image='property_images/garden.jpg', caption="Garden")
+        self.assertNotEqual(load_manifest()[self.path]['etag'], etag)
+
+
+@override_settings(PAGE_CACHE=False, BAKED_PAGES=False)
+class ListingsApiTests(TestCase):
+    """The public JSON API only lists active inventory."""
+
+    @classmethod
+    def setUpTestData(cls):
+        location = PropertyLocation.objects.create(name="Sarjapur")
+        cls.active = create_listing("Active Heights", location)
+        cls.withdrawn = create_listing("Withdrawn Heights", location)
+        cls.withdrawn.is_property_active = False
+        cls.withdrawn.save()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_no_scope_returns_inactive_listings(self):
+        for scope in ('all', 'list', 'residential'):
+            response = self.client.get(reverse('listings_api'), {'scope': scope, 'fields': 'slug'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['slug'] for row in response.json()['results']], [self.active.slug], scope)
+            self.assertEqual(response.json()['count'], 1, scope)
+        response = self.client.get(reverse('listings_api'), {'scope': 'commercial'})
+        self.assertEqual(response.json()['results'], [])
+
+
+class TemporaryMediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+
+class ContentAddressedStorageTests(TemporaryMediaRootMixin, TestCase):
+    """Identical uploads share one file, kept until the last reference is deleted."""
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('property_brochures/a.pdf', ContentFile(b'brochure'))
+        second = default_storage.save('property_documents/b.PDF', ContentFile(b'brochure'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(CAS_PREFIX + '/'))
+        self.assertTrue(first.endswith('.pdf'))
+        self.assertEqual(StoredFile.objects.get(name=first).refcount, 2)
+        files = [name for _, _, names in os.walk(default_storage.path(CAS_PREFIX)) for name in names]
+        self.assertEqual(files, [os.path.basename(first)])
+
+    def test_different_content_gets_different_names(self):
+        first = default_storage.save('a.jpg', ContentFile(b'one'))
+        second = default_storage.save('a.jpg', ContentFile(b'two'))
+        self.assertNotEqual(first, second)
+
+    def test_file_is_removed_with_its_last_reference(self):
+        name = default_storage.save('a.jpg', ContentFile(b'photo'))
+        default_storage.save('b.jpg', ContentFile(b'photo'))
+        default_storage.delete(name)
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete(name)
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_files_on_disk_are_linked_without_a_copy(self):
+        upload = TemporaryUploadedFile('tour.mp4', 'video/mp4', 5, None)
+        upload.write(b'video')
+        upload.flush()
+        name = default_storage.save('property_videos/tour.mp4', upload)
+        upload.close()
+        with default_storage.open(name) as handle:
+            self.assertEqual(handle.read(), b'video')
+        self.assertEqual(StoredFile.objects.get(name=name).size, 5)
+
+    def test_names_outside_the_store_are_deleted_as_before(self):
+        os.makedirs(default_storage.path('legacy'))
+        with open(default_storage.path('legacy/old.jpg'), 'wb') as handle:
+            handle.write(b'old')
+        default_storage.delete('legacy/old.jpg')
+        self.assertFalse(default_storage.exists('legacy/old.jpg'))
+
+
+class MediaGarbageCollectionTests(TemporaryMediaRootMixin, TestCase):
+    """Only unreferenced files older than the grace period are collected."""
+
+    def setUp(self):
+        super().setUp()
+        self.listing = create_listing("Orchid Park", PropertyLocation.objects.create(name="Hennur"))
+
+    def write_legacy(self, name, content=b'legacy'):
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        return name
+
+    def age(self, *names):
+        old = time.time() - 3 * 24 * 60 * 60
+        for name in names:
+            os.utime(default_storage.path(name), (old, old))
+
+    def orphans(self):
+        return dict(find_orphans())
+
+    def test_unreferenced_legacy_and_stored_files_are_orphans(self):
+        legacy = self.write_legacy('property_images/gone.jpg', b'12345')
+        stored = default_storage.save('property_images/gone.jpg', ContentFile(b'stored'))
+        self.age(legacy, stored)
+        self.assertEqual(self.orphans(), {legacy: 5, stored: 6})
+
+    def test_files_referenced_by_a_file_field_are_kept(self):
+        stored = default_storage.save('property_images/cover.jpg', ContentFile(b'cover'))
+        legacy = self.write_legacy('property_videos/tour.mp4')
+        BuyProperties.objects.filter(pk=self.listing.pk).update(image=stored)
+        PropertyVideo.objects.create(property=self.listing, video=legacy)
+        self.age(stored, legacy)
+        self.assertEqual(self.orphans(), {})
+
+    def test_image_derivatives_are_kept(self):
+        name = default_storage.save('derivatives/cover/320w.webp', ContentFile(b'webp'))
+        ImageDerivative.objects.create(source='cover.jpg', format='webp', width=320, height=200, file=name, size=4)
+        self.age(name)
+        self.assertEqual(self.orphans(), {})
+
+    def test_files_within_the_grace_period_are_not_reported(self):
+        self.write_legacy('property_images/new.jpg')
+        self.assertEqual(self.orphans(), {})
+
+    def test_delete_orphan_removes_the_file_and_its_row(self):
+        stored = default_storage.save('a.jpg', ContentFile(b'orphan'))
+        self.age(stored)
+        self.assertIn(stored, self.orphans())
+        self.assertTrue(delete_orphan(stored))
+        self.assertFalse(default_storage.exists(stored))
+        self.assertFalse(StoredFile.objects.filter(name=stored).exists())
+
+    def test_delete_orphan_spares_a_file_touched_since_the_scan(self):
+        stored = default_storage.save('a.jpg', ContentFile(b'orphan'))
+        self.age(stored)
+        self.assertIn(stored, self.orphans())
+        # Saving the same content again reuses the file and touches it.
+        default_storage.save('b.jpg', ContentFile(b'orphan'))
+        self.assertFalse(delete_orphan(stored))
+        self.assertTrue(default_storage.exists(stored))
+
+
+class ChunkedUploadTests(TestCase):
+    """Resumable video uploads: chunk placement, validation and claiming by the sell forms."""
+
+    VIDEO = b'\x00\x00\x00\x18ftypmp42' + bytes(range(52))
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(override_settings(CHUNKED_UPLOAD_DIR=directory))
+        self.user = get_user_model().objects.create_user(email='seller@example.com', password='Secret#123')
+        self.client.force_login(self.user)
+        self.upload = start_upload(self.user, 'tour.mp4', len(self.VIDEO))
+        self.url = reverse('chunked_upload', args=[self.upload.pk])
+
+    def put(self, start, end, data=None, size=None):
+        data = self.VIDEO[start:end] if data is None else data
+        return self.client.put(
+            self.url, data, content_type='application/octet-stream',
+            headers={'Content-Range': f"bytes {start}-{end - 1}/{size or len(self.VIDEO)}"},
+        )
+
+    def test_chunks_are_appended_in_order(self):
+        self.assertEqual(self.put(0, 32).json()['offset'], 32)
+        response = self.put(32, 64)
+        self.assertTrue(response.json()['complete'])
+        self.assertEqual(upload_path(self.upload).read_bytes(), self.VIDEO)
+
+    def test_out_of_order_chunk_gets_the_current_offset(self):
+        self.put(0, 32)
+        response = self.put(48, 64)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 32)
+
+    def test_chunk_past_the_declared_size_is_rejected(self):
+        response = self.put(0, 100, data=self.VIDEO + bytes(36))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get(pk=self.upload.pk).offset, 0)
+
+    def test_content_range_must_match_the_upload(self):
+        self.assertEqual(self.put(0, 32, size=128).status_code, 400)
+        response = self.client.put(self.url, self.VIDEO[:32], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400)
+
+    def test_first_bytes_must_look_like_a_video(self):
+        response = self.put(0, 32, data=b'%PDF-1.7' + bytes(24))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get(pk=self.upload.pk).offset, 0)
+
+    def test_stale_retry_does_not_truncate_confirmed_bytes(self):
+        stale = ChunkedUpload.objects.get(pk=self.upload.pk)
+        self.put(0, 32)
+        self.put(32, 64)
+        with self.assertRaises(UploadOffsetMismatch) as mismatch:
+            write_chunk(stale, 0, 32, BytesIO(self.VIDEO[:32]))
+        self.assertEqual(mismatch.exception.offset, 64)
+        self.assertEqual(upload_path(self.upload).read_bytes(), self.VIDEO)
+
+    def test_invalid_form_closes_the_claimed_file_and_can_claim_it_again(self):
+        self.put(0, 32)
+        self.put(32, 64)
+        form = SellResidentialPropertyForm(data={'video_upload': str(self.upload.pk)}, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.cleaned_data['video'].closed)
+        self.assertIsNone(form.chunked_video)
+        claimed = claim_upload(self.upload.pk, self.user)
+        self.addCleanup(claimed.close)
+        self.assertEqual(claimed.read(), self.VIDEO)
@@ -0,0 +1,65 @@
+'''
+Change tracking for model fields.
+
+TrackedFieldsMixin remembers the values of a model's `tracked_fields` as they were
+loaded from the database (in from_db) and as they were last saved. save() overrides
+and signal receivers can then ask what changed without re-fetching the row:
+
+    class Blog(TrackedFieldsMixin, models.Model):
+        tracked_fields = ('title',)
+
+        def save(self, *args, **kwargs):
+            if self.field_changed('title'):
+                self.slug = slugify(self.title)
+            super().save(*args, **kwargs)
+
+The snapshot is only refreshed once save() returns, so post_save receivers still
+see the previous values. Instances built by hand with an existing primary key have
+no snapshot; for them the old value is read from the database, as before (which,
+in a post_save receiver, is already the new value).
+'''
+
+
+class TrackedFieldsMixin:
+    """Put before models.Model in the bases and list the fields to watch in `tracked_fields`."""
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_values(field_names)
+        return instance
+
+    def _remember_values(self, field_names=None):
+        loaded = self.get_deferred_fields()
+        snapshot = self.__dict__.setdefault('_tracked_values', {})
+        for name in self.tracked_fields:
+            attname = self._meta.get_field(name).attname
+            if (field_names is None or attname in field_names or name in field_names) and attname not in loaded:
+                snapshot[name] = getattr(self, attname)
+
+    def loaded_value(self, name, default=None):
+        """Value of a tracked field in the database row, or `default` for unsaved instances."""
+        if self._state.adding or self.pk is None:
+            return default
+        snapshot = self.__dict__.get('_tracked_values', {})
+        if name in snapshot:
+            return snapshot[name]
+        values = type(self)._base_manager.using(self._state.db).filter(pk=self.pk).values_list(name, flat=True)
+        return next(iter(values), default)
+
+    def field_changed(self, name):
+        """True when the field differs from the database row, or the instance is not saved yet."""
+        if self._state.adding or self.pk is None:
+            return True
+        return self.loaded_value(name) != getattr(self, self._meta.get_field(name).attname)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._remember_values(None if update_fields is None else set(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember_values(None if fields is None else set(fields))
@@ -0,0 +1,189 @@
+import fcntl
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+from .models import ChunkedUpload, validate_video_extension, validate_video_size
+
+'''
+Resumable chunked uploads for the sell-property videos.
+
+A 50 MB video sent in one multipart POST holds a worker for the whole transfer on a
+slow connection, and a dropped connection means sending it all again. Instead,
+static/js/chunked-upload.js:
+
+1. POSTs the file name and size to start_chunked_upload; the extension and declared
+   size are validated before any byte is sent.
+2. PUTs the file in CHUNK_SIZE pieces, each with a `Content-Range: bytes
+   start-end/size` header. write_chunk() streams the body straight into
+   <CHUNKED_UPLOAD_DIR>/<id>.part and only then advances the upload's offset, so
+   the offset always counts confirmed bytes. The first chunk must start like a
+   video container.
+3. After a failure, GETs the upload to read its offset and resumes from there.
+4. Submits the form with only the upload id in `video_upload`. The form claims the
+   finished upload and the storage moves the assembled file into place.
+
+Uploads that are never claimed are removed by clean_chunked_uploads() after
+CHUNKED_UPLOAD_EXPIRY.
+'''
+
+CHUNK_SIZE = 2 * 1024 * 1024
+READ_SIZE = 64 * 1024
+CHUNKED_UPLOAD_EXPIRY = timedelta(days=1)
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+# Leading bytes of the containers behind VIDEO_EXTENSIONS.
+MP4_BOXES = (b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot')
+SIGNATURE_LENGTH = 16
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk does not start where the confirmed bytes end."""
+
+    def __init__(self, offset):
+        super().__init__(f"Expected a chunk starting at byte {offset}")
+        self.offset = offset
+
+
+def chunked_upload_dir():
+    return Path(getattr(settings, 'CHUNKED_UPLOAD_DIR', '') or Path(settings.BASE_DIR) / 'chunked_uploads')
+
+
+def upload_path(upload):
+    return chunked_upload_dir() / f"{upload.pk}.part"
+
+
+def looks_like_video(head):
+    return (
+        head[4:8] in MP4_BOXES
+        or head.startswith(b'\x1a\x45\xdf\xa3')  # Matroska / WebM
+        or (head.startswith(b'RIFF') and head[8:12] == b'AVI ')
+        or head.startswith(b'FLV')
+        or head.startswith(b'\x30\x26\xb2\x75\x8e\x66\xcf\x11')  # ASF (WMV)
+    )
+
+
+def start_upload(user, filename, size):
+    """A new ChunkedUpload of `filename`; raises ValidationError for files the sell forms would reject."""
+    filename = os.path.basename(filename or '')[:255]
+    if not filename:
+        raise ValidationError("A file name is required.")
+    if size <= 0:
+        raise ValidationError("The file is empty.")
+    validate_video_extension(filename)
+    validate_video_size(size)
+    upload = ChunkedUpload.objects.create(user=user, filename=filename, size=size)
+    path = upload_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch(exist_ok=False)
+    return upload
+
+
+def parse_content_range(header):
+    """(start, end) of a `bytes start-end/size` header, end exclusive, and the size; None when malformed."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        return None
+    start, last, size = (int(value) for value in match.groups())
+    if last < start:
+        return None
+    return start, last + 1, size
+
+
+def write_chunk(upload, start, end, stream):
+    """
+    Append the bytes [start, end) read from `stream` to the upload and advance its
+    offset. Raises UploadOffsetMismatch when `start` is not the confirmed offset,
+    or when another request is writing to the upload; ValidationError when the
+    chunk overruns the declared size, is cut short, or the file is not a video.
+    """
+    if start != upload.offset:
+        raise UploadOffsetMismatch(upload.offset)
+    if end > upload.size:
+        raise ValidationError("The chunk extends past the declared file size.")
+    if start == 0 and end < min(SIGNATURE_LENGTH, upload.size):
+        raise ValidationError("The first chunk is too small.")
+    with open(upload_path(upload), 'r+b') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadOffsetMismatch(upload.offset)
+        # `upload` may have been read before a concurrent chunk was confirmed: check
+        # the offset again under the lock, before anything is truncated.
+        try:
+            upload.refresh_from_db(fields=['offset'])
+        except ChunkedUpload.DoesNotExist:
+            raise ValidationError("The upload no longer exists.")
+        if start != upload.offset:
+            raise UploadOffsetMismatch(upload.offset)
+        # Drop whatever an interrupted attempt left past the confirmed bytes.
+        handle.seek(start)
+        handle.truncate()
+        remaining = end - start
+        head = b''
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            if start == 0 and len(head) < SIGNATURE_LENGTH:
+                head += data[:SIGNATURE_LENGTH - len(head)]
+                if len(head) >= min(SIGNATURE_LENGTH, upload.size) and not looks_like_video(head):
+                    raise ValidationError("The file is not a supported video.")
+            handle.write(data)
+            remaining -= len(data)
+        if remaining:
+            raise ValidationError("The chunk was cut short.")
+        handle.flush()
+        updated = ChunkedUpload.objects.filter(pk=upload.pk, offset=start).update(offset=end, updated_at=timezone.now())
+        if not updated:
+            raise UploadOffsetMismatch(ChunkedUpload.objects.get(pk=upload.pk).offset)
+    upload.offset = end
+    return upload
+
+
+class CompletedUpload(File):
+    """The assembled file of a finished upload; file system storages move it into place instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def claim_upload(upload_id, user):
+    """
+    The finished upload `upload_id` of `user` as a CompletedUpload to assign to a
+    FileField. Raises ValidationError if there is none; pass the result to
+    discard_upload() once the model is saved.
+    """
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user_id=getattr(user, 'pk', None)).first()
+    if upload is None or not upload.is_complete:
+        raise ValidationError("The uploaded video was not found or is incomplete. Please upload it again.")
+    try:
+        file = CompletedUpload(open(upload_path(upload), 'rb'), name=upload.filename)
+    except FileNotFoundError:
+        raise ValidationError("The uploaded video was not found or is incomplete. Please upload it again.")
+    file.upload = upload
+    return file
+
+
+def discard_upload(upload):
+    """Forget an upload and delete its file, unless a storage already moved it away."""
+    upload_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def clean_chunked_uploads(expiry=CHUNKED_UPLOAD_EXPIRY):
+    """Delete uploads, and stray part files, untouched for `expiry`. Returns how many uploads were removed."""
+    cutoff = timezone.now() - expiry
+    stale = list(ChunkedUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        discard_upload(upload)
+    directory = chunked_upload_dir()
+    if directory.is_dir():
+        known = {f"{pk}.part" for pk in ChunkedUpload.objects.values_list('pk', flat=True)}
+        for path in directory.glob('*.part'):
+            if path.name not in known and path.stat().st_mtime < cutoff.timestamp():
+                path.unlink(missing_ok=True)
+    return len(stale)
@@ -1,17 +1,47 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
-from . models import BuyProperties, PropertyInquiry,PropertyLocation, UserFavorite,InteriorDesignRequest,UserFavorite
-from users.models import ContactInformation
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from . models import BuyProperties, PropertyInquiry,PropertyLocation, UserFavorite,InteriorDesignRequest,UserFavorite, ListingIndex, SavedSearch, ChunkedUpload
+from django.template.loader import render_to_string
+from django.urls import reverse
+from home.page_cache import normalized_query, page_etag
+from home.site_content import get_site_content
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.middleware.csrf import get_token
 from .forms import *
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_http_methods, require_POST
+from django.core.exceptions import ValidationError
 from django.contrib import messages
 import re
-from django.db.models import Q
+from django.db.models import Max, Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .listings import (
+    API_LISTING_SCOPES, LISTING_SCOPES, RELEVANCE_ORDER, SEARCH_SORT_ORDERS, count_listings, filter_listings,
+    find_listings, get_listings_version, hydrate_listings, keyset_page, page_columns, parse_int, parse_listing_filters
+)
+from .api import LISTINGS_API_VERSION, dumps, index_columns, listings_api_etag, parse_api_fields, serialize_listings
+from .facets import get_facets
+from .detail import get_property_detail_bundle
+from .saved_searches import saved_search_query
+from .uploads import (
+    CHUNK_SIZE, UploadOffsetMismatch, discard_upload, parse_content_range, start_upload, write_chunk
+)
+
+def property_last_modified(request, slug):
+    """Last change to the listing, its media or its amenities: one query on the slug index."""
+    if not hasattr(request, '_property_last_modified'):
+        request._property_last_modified = (
+            BuyProperties.objects.filter(slug=slug).values_list('updated_at', flat=True).first()
+        )
+    return request._property_last_modified
+
+def property_detail_etag(request, slug):
+    updated_at = property_last_modified(request, slug)
+    return page_etag(request, slug, updated_at) if updated_at else None
 
 # Create your views here.
+@condition(etag_func=property_detail_etag, last_modified_func=property_last_modified)
 def property_detail_view(request, slug):
     """
     Detail view for a specific property.
@@ -20,31 +50,11 @@ def property_detail_view(request, slug):
     its location, configuration, area, budget, etc.
     """
     try:
-        property = get_object_or_404(BuyProperties, slug=slug)
+        bundle = get_property_detail_bundle(slug)
     except BuyProperties.DoesNotExist:
-        messages.error(request, "Property not found.")
-        return redirect('home')
-    related_properties = BuyProperties.objects.filter(
-        property_type=property.property_type,
-        locations=property.locations
-    ).exclude(slug=slug)
-    property_images = property.images.all()
-    property_videos = property.videos.all()
-    nearby_places = property.nearby_amenities.all()
-    feature_amenities = property.feature_amenities.all()
-    try:
-        contact_info = ContactInformation.objects.filter(is_main_office=True).first()
-    except:
-        contact_info = None
-    context = {
-        'property': property,
-        'related_properties': related_properties,
-        'property_images': property_images,
-        'property_videos': property_videos,
-        'nearby_places': nearby_places,
-        'feature_amenities': feature_amenities,
-        'contact_info': contact_info
-    }
+        raise Http404("No property matches the given query.")
+    context = bundle.context()
+    context['contact_info'] = get_site_content().main_office
     return render(request, 'services/property_detail.html', context)
 
 @ensure_csrf_cookie
@@ -67,8 +77,26 @@ def property_inquiry(request, slug):
         return redirect('property_detail', slug=slug)
     return redirect('property_detail', slug=slug)
 
+PROPERTY_LIST_PER_PAGE = 6
+
+def property_list_ordering(filters):
+    """Text searches are shown by relevance, everything else by id."""
+    return RELEVANCE_ORDER if 'search' in filters else SEARCH_SORT_ORDERS['default']
+
+def property_list_last_modified(request):
+    """Latest change to any listing; deletions are caught by the ETag's listings version."""
+    if not hasattr(request, '_property_list_last_modified'):
+        request._property_list_last_modified = BuyProperties.objects.aggregate(latest=Max('updated_at'))['latest']
+    return request._property_list_last_modified
+
+def property_list_etag(request):
+    return page_etag(
+        request, get_listings_version(), property_list_last_modified(request),
+        normalized_query(request.META.get('QUERY_STRING', ''))
+    )
+
+@condition(etag_func=property_list_etag, last_modified_func=property_list_last_modified)
 def property_list_view(request):
-    properties = BuyProperties.objects.filter(is_property_active=True)
     property_type = request.GET.get('property_type')
     category = request.GET.get('category')
     configuration = request.GET.get('configuration')
@@ -77,41 +105,17 @@ def property_list_view(request):
     min_budget = request.GET.get('min_budget')
     max_budget = request.GET.get('max_budget')
     search_query = request.GET.get('search', '').strip()
-    if search_query:
-        properties = properties.filter(
-            Q(project_name__icontains=search_query) |
-            Q(configuration__icontains=search_query) |
-            Q(locations__name__icontains=search_query)
-        ).distinct()
-    if property_type:
-        properties = properties.filter(property_type=property_type)
-    if category and category != 'all':
-        properties = properties.filter(category=category)
-    if configuration:
-        properties = properties.filter(configuration=configuration)
-    if location:
-        properties = properties.filter(locations=location)
-    if status:
-        properties = properties.filter(status=status)
-    if min_budget:
-        properties = properties.filter(
-            Q(min_budget__gte=min_budget, min_budget_unit='lakhs') |
-            Q(min_budget__gte=min_budget/100, min_budget_unit='crores')
-        )
-    if max_budget:
-        properties = properties.filter(
-            Q(max_budget__lte=max_budget, max_budget_unit='lakhs') |
-            Q(max_budget__lte=max_budget/100, max_budget_unit='crores')
-        )
-    properties = properties.order_by('id')
-    paginator = Paginator(properties, 6)
-    page_number = request.GET.get('page')
-    try:
-        paginated_properties = paginator.page(page_number)
-    except PageNotAnInteger:
-        paginated_properties = paginator.page(1)
-    except EmptyPage:
-        paginated_properties = paginator.page(paginator.num_pages)
+    filters = parse_listing_filters(request.GET, scope='list')
+    paginated_properties, counts = find_listings(
+        request.GET,
+        'list',
+        filters,
+        property_list_ordering(filters),
+        PROPERTY_LIST_PER_PAGE
+    )
+    total_properties = counts['total']
+    paginated_properties.object_list = hydrate_listings(paginated_properties.object_list)
+    cursor_mode = 'cursor' in request.GET
     locations = PropertyLocation.objects.all()
     context = {
         'properties': paginated_properties,
@@ -131,15 +135,47 @@ def property_list_view(request):
             'max_budget': max_budget,
             'search': search_query,
         },
-        'total_properties': paginator.count,
-        'total_pages': paginator.num_pages,
-        'current_page': paginated_properties.number,
-        'has_previous': paginated_properties.has_previous(),
+        'cursor_mode': cursor_mode,
+        'total_properties': total_properties,
         'has_next': paginated_properties.has_next(),
-        'page_range': paginator.page_range,
     }
+    if not cursor_mode:
+        context.update({
+            'total_pages': paginated_properties.paginator.num_pages,
+            'current_page': paginated_properties.number,
+            'has_previous': paginated_properties.has_previous(),
+            'page_range': paginated_properties.paginator.page_range,
+        })
     return render(request, 'services/property_list.html', context)
 
+def property_list_feed(request):
+    """
+    Infinite-scroll variant of the property list: the next page of rendered cards
+    after `cursor`, and the cursor to request after that.
+    """
+    filters = parse_listing_filters(request.GET, scope='list')
+    listings = filter_listings(ListingIndex.objects.filter(LISTING_SCOPES['list']), filters)
+    ordering = property_list_ordering(filters)
+    page = keyset_page(
+        page_columns(listings, ordering),
+        ordering,
+        request.GET.get('cursor'),
+        PROPERTY_LIST_PER_PAGE,
+        count_listings(listings, 'list', filters)['total']
+    )
+    properties = hydrate_listings(page.object_list)
+    html = ''.join(
+        render_to_string('services/property_card.html', {'property': property}, request=request)
+        for property in properties
+    )
+    return JsonResponse({
+        'html': html,
+        'ids': [property.id for property in properties],
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next(),
+        'total': page.total,
+    })
+
 def property_calculator_view(request):
     if request.method == 'POST':
         form = PropertyCalculatorForm(request.POST, request.FILES)
@@ -194,6 +230,43 @@ def my_favorites(request):
     }
     return render(request, 'services/favorites.html', context)
 
+@login_required
+@require_POST
+def save_search(request):
+    """Save the current search page query so new matching listings are emailed to the user."""
+    scope = request.POST.get('scope', 'residential')
+    if scope not in dict(SavedSearch.SCOPE_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Unknown search scope'}, status=400)
+    query = saved_search_query(QueryDict(request.POST.get('query', '')))
+    saved_search, created = SavedSearch.objects.get_or_create(
+        user=request.user,
+        scope=scope,
+        query=query,
+        defaults={'name': request.POST.get('name', '').strip()[:100]}
+    )
+    if not saved_search.is_active:
+        saved_search.is_active = True
+        saved_search.save()
+    return JsonResponse({
+        'success': True,
+        'saved_search_id': saved_search.id,
+        'message': "Search saved. We'll email you new matching properties." if created else "You have already saved this search."
+    })
+
+@login_required
+def my_saved_searches(request):
+    """Display the user's saved searches."""
+    saved_searches = SavedSearch.objects.filter(user=request.user)
+    return render(request, 'services/saved_searches.html', {'saved_searches': saved_searches})
+
+@login_required
+@require_POST
+def delete_saved_search(request, search_id):
+    saved_search = get_object_or_404(SavedSearch, id=search_id, user=request.user)
+    saved_search.delete()
+    messages.success(request, "Saved search deleted.")
+    return redirect('my_saved_searches')
+
 @login_required
 def get_favorite_status(request, property_id):
     """Check if a property is in the user's favorites."""
@@ -204,4 +277,121 @@ def get_favorite_status(request, property_id):
     ).exists()
     return JsonResponse({
         'is_favorite': is_favorite
-    })
\ No newline at end of file
+    })
+
+@never_cache
+def session_state(request):
+    """
+    The per-user parts of pages served from the full-page cache (home.page_cache):
+    login state, a CSRF token, and which of the `favorites` property ids the user
+    has favorited.
+    """
+    state = {'authenticated': request.user.is_authenticated, 'csrf_token': get_token(request), 'favorites': []}
+    if request.user.is_authenticated:
+        state['name'] = f"{request.user.first_name} {request.user.last_name}"
+        property_ids = [int(value) for value in request.GET.get('favorites', '').split(',') if value.isdigit()]
+        if property_ids:
+            state['favorites'] = list(
+                UserFavorite.objects.filter(user=request.user, property_id__in=property_ids[:100])
+                .values_list('property_id', flat=True)
+            )
+    return JsonResponse(state)
+
+
+def chunked_upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'url': reverse('chunked_upload', args=[upload.pk]),
+        'offset': upload.offset,
+        'size': upload.size,
+        'complete': upload.is_complete,
+        'chunk_size': CHUNK_SIZE,
+    }
+
+@login_required
+@require_POST
+def start_chunked_upload(request):
+    """Begin a resumable upload of a sell-property video from its `filename` and `size` (see services.uploads)."""
+    size = parse_int(request.POST.get('size'))
+    if size is None:
+        return JsonResponse({'success': False, 'error': 'A file size is required'}, status=400)
+    try:
+        upload = start_upload(request.user, request.POST.get('filename'), size)
+    except ValidationError as error:
+        return JsonResponse({'success': False, 'error': ' '.join(error.messages)}, status=400)
+    return JsonResponse({'success': True, **chunked_upload_state(upload)}, status=201)
+
+@never_cache
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def chunked_upload(request, upload_id):
+    """
+    GET: how many bytes of the upload were received. PUT: append the chunk in the
+    body, placed by its Content-Range header. DELETE: cancel the upload.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, user=request.user)
+    if request.method == 'DELETE':
+        discard_upload(upload)
+        return JsonResponse({'success': True})
+    if request.method == 'PUT':
+        content_range = parse_content_range(request.headers.get('Content-Range'))
+        if content_range is None or content_range[2] != upload.size:
+            return JsonResponse({'success': False, 'error': 'Invalid Content-Range header'}, status=400)
+        start, end, _ = content_range
+        if parse_int(request.META.get('CONTENT_LENGTH')) != end - start:
+            return JsonResponse({'success': False, 'error': 'Content-Length does not match Content-Range'}, status=400)
+        try:
+            write_chunk(upload, start, end, request)
+        except UploadOffsetMismatch as mismatch:
+            return JsonResponse({'success': False, 'error': str(mismatch), 'offset': mismatch.offset}, status=409)
+        except ValidationError as error:
+            return JsonResponse({'success': False, 'error': ' '.join(error.messages)}, status=400)
+    return JsonResponse({'success': True, **chunked_upload_state(upload)})
+
+def property_facets(request):
+    """
+    Per-choice result counts for the listing filter sidebars.
+    Accepts the same parameters as the page it serves, plus `scope`
+    (list, residential or commercial).
+    """
+    scope = request.GET.get('scope', 'list')
+    if scope not in LISTING_SCOPES:
+        return JsonResponse({'error': 'Unknown scope'}, status=400)
+    filters = parse_listing_filters(request.GET, scope=scope)
+    return JsonResponse(get_facets(scope, filters))
+
+LISTINGS_API_PAGE_SIZE = 20
+LISTINGS_API_MAX_PAGE_SIZE = 100
+
+@condition(etag_func=listings_api_etag)
+def listings_api(request):
+    """
+    Read-only JSON listings API. Takes the property list filters plus `scope`
+    (all, list, residential or commercial), `sort`, `fields` (comma-separated),
+    `limit` and `cursor`; responses carry an ETag tied to the listings version.
+    """
+    scope = request.GET.get('scope', 'list')
+    if scope not in API_LISTING_SCOPES:
+        return JsonResponse({'error': 'Unknown scope'}, status=400)
+    fields, unknown = parse_api_fields(request.GET.get('fields'))
+    if unknown:
+        return JsonResponse({'error': f"Unknown fields: {', '.join(unknown)}"}, status=400)
+    limit = parse_int(request.GET.get('limit')) or LISTINGS_API_PAGE_SIZE
+    limit = max(1, min(limit, LISTINGS_API_MAX_PAGE_SIZE))
+    filters = parse_listing_filters(request.GET, scope=scope)
+    if 'search' in filters:
+        ordering = RELEVANCE_ORDER
+    else:
+        ordering = SEARCH_SORT_ORDERS.get(request.GET.get('sort'), SEARCH_SORT_ORDERS['default'])
+    listings = filter_listings(ListingIndex.objects.filter(API_LISTING_SCOPES[scope]), filters)
+    # Counted apart from the pages' counts, which include inactive listings in some scopes.
+    total = count_listings(listings, f"api:{scope}", filters)['total']
+    columns = {'source', 'source_id'} | {order.lstrip('-') for order in ordering} | set(index_columns(fields))
+    page = keyset_page(listings.values(*columns), ordering, request.GET.get('cursor'), limit, total)
+    payload = {
+        'version': LISTINGS_API_VERSION,
+        'count': total,
+        'next_cursor': page.next_cursor,
+        'results': serialize_listings(page.object_list, fields),
+    }
+    return HttpResponse(dumps(payload), content_type='application/json')
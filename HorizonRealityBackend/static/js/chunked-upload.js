@@ -0,0 +1,147 @@
+// Resumable chunked uploads for large files on the sell-property forms (services.uploads).
+// File inputs opt in with data-chunked-upload="<start url>" and data-upload-field="<name
+// of the hidden input receiving the upload id>". The file is sent in pieces as soon as
+// it is chosen; interrupted pieces are retried from the last byte the server confirmed,
+// and choosing the same file again after a reload resumes it. Once it is complete the
+// input stops being submitted, so the form POST carries only the upload id.
+document.addEventListener('DOMContentLoaded', function() {
+    const MAX_RETRIES = 8;
+
+    document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach(function(input) {
+        const form = input.form;
+        const field = form.querySelector('input[name="' + input.dataset.uploadField + '"]');
+        const fieldName = input.name;
+        const status = document.createElement('div');
+        status.className = 'chunked-upload-status';
+        input.closest('.file-upload-wrapper').after(status);
+        let current = null;
+
+        input.addEventListener('change', function() {
+            if (current) {
+                current.cancelled = true;
+            }
+            field.value = '';
+            input.name = fieldName;
+            status.textContent = '';
+            if (input.files.length) {
+                current = {file: input.files[0], cancelled: false, done: false};
+                upload(current);
+            } else {
+                current = null;
+            }
+        });
+
+        form.addEventListener('submit', function(event) {
+            if (current && !current.done) {
+                event.preventDefault();
+                event.stopImmediatePropagation();
+                status.textContent = 'Please wait until the video has finished uploading.';
+            }
+        }, true);
+
+        function upload(task) {
+            const key = 'chunked-upload:' + [task.file.name, task.file.size, task.file.lastModified].join(':');
+            resume(key)
+                .then(function(state) { return state || start(key, task.file); })
+                .then(function(state) { return sendChunks(task, state, 0); })
+                .then(function(state) {
+                    if (task.cancelled) {
+                        return;
+                    }
+                    task.done = true;
+                    localStorage.removeItem(key);
+                    field.value = state.id;
+                    input.removeAttribute('name');
+                    status.textContent = '✓ ' + task.file.name + ' uploaded';
+                })
+                .catch(function(error) {
+                    if (task.cancelled) {
+                        return;
+                    }
+                    if (error.rejected) {
+                        localStorage.removeItem(key);
+                    }
+                    input.value = '';
+                    current = null;
+                    status.textContent = error.message || 'The video could not be uploaded, please choose it again.';
+                });
+        }
+
+        function resume(key) {
+            const saved = JSON.parse(localStorage.getItem(key) || 'null');
+            if (!saved) {
+                return Promise.resolve(null);
+            }
+            return request('GET', saved.url).catch(function() { return null; });
+        }
+
+        function start(key, file) {
+            const body = new URLSearchParams();
+            body.set('filename', file.name);
+            body.set('size', file.size);
+            return request('POST', input.dataset.chunkedUpload, body, {
+                'Content-Type': 'application/x-www-form-urlencoded'
+            }).then(function(state) {
+                localStorage.setItem(key, JSON.stringify({url: state.url}));
+                return state;
+            });
+        }
+
+        function sendChunks(task, state, retries) {
+            if (task.cancelled || state.complete) {
+                return Promise.resolve(state);
+            }
+            status.textContent = 'Uploading ' + task.file.name + '… ' + Math.floor(state.offset * 100 / state.size) + '%';
+            const end = Math.min(state.offset + state.chunk_size, state.size);
+            return request('PUT', state.url, task.file.slice(state.offset, end), {
+                'Content-Range': 'bytes ' + state.offset + '-' + (end - 1) + '/' + state.size
+            })
+                .then(function(next) { return sendChunks(task, Object.assign(state, next), 0); })
+                .catch(function(error) {
+                    if (error.offset !== undefined && error.offset !== state.offset) {
+                        // Out of step with the server: continue from the bytes it has.
+                        return sendChunks(task, Object.assign(state, {offset: error.offset}), retries);
+                    }
+                    if (error.rejected || retries >= MAX_RETRIES) {
+                        throw error;
+                    }
+                    status.textContent = 'Connection lost, retrying…';
+                    return wait(Math.min(1000 * Math.pow(2, retries), 30000))
+                        .then(function() { return request('GET', state.url); })
+                        .then(function(next) { return sendChunks(task, Object.assign(state, next), retries + 1); },
+                              function() { return sendChunks(task, state, retries + 1); });
+                });
+        }
+
+        function request(method, url, body, headers) {
+            return fetch(url, {
+                method: method,
+                credentials: 'same-origin',
+                headers: Object.assign({'X-CSRFToken': csrfToken()}, headers || {}),
+                body: body
+            }).then(function(response) {
+                return response.json().catch(function() { return {}; }).then(function(data) {
+                    if (response.ok) {
+                        return data;
+                    }
+                    const error = new Error(data.error || 'Upload failed');
+                    if (response.status === 409) {
+                        error.offset = data.offset;
+                    } else if (response.status < 500) {
+                        error.rejected = true;
+                    }
+                    throw error;
+                });
+            });
+        }
+
+        function csrfToken() {
+            const token = form.querySelector('input[name="csrfmiddlewaretoken"]');
+            return token ? token.value : '';
+        }
+    });
+
+    function wait(milliseconds) {
+        return new Promise(function(resolve) { setTimeout(resolve, milliseconds); });
+    }
+});
@@ -0,0 +1,74 @@
+// Show how many listings each filter choice would return.
+// Forms opt in with data-facets-url and data-facets-scope attributes.
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('form[data-facets-url]').forEach(function(form) {
+        let pending = null;
+
+        form.addEventListener('change', function() {
+            clearTimeout(pending);
+            pending = setTimeout(function() { loadFacetCounts(form); }, 250);
+        });
+        loadFacetCounts(form);
+    });
+});
+
+function facetNameFor(form, inputName) {
+    const scope = form.dataset.facetsScope;
+    if (inputName === 'location' || inputName === 'locations') {
+        return 'location';
+    }
+    if (inputName === 'configuration' && scope === 'commercial') {
+        return 'commercial_type';
+    }
+    return inputName;
+}
+
+function loadFacetCounts(form) {
+    const params = new URLSearchParams(new FormData(form));
+    params.delete('csrfmiddlewaretoken');
+    params.set('scope', form.dataset.facetsScope || 'list');
+
+    fetch(form.dataset.facetsUrl + '?' + params.toString(), {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+    .then(response => response.ok ? response.json() : null)
+    .then(data => {
+        if (data) {
+            applyFacetCounts(form, data.facets);
+        }
+    })
+    .catch(error => console.error('Error loading filter counts:', error));
+}
+
+function applyFacetCounts(form, facets) {
+    form.querySelectorAll('input[type="checkbox"][name]').forEach(function(input) {
+        const counts = facets[facetNameFor(form, input.name)];
+        const label = input.id ? form.querySelector('label[for="' + input.id + '"]') : null;
+        if (!counts || !label) {
+            return;
+        }
+        let badge = label.querySelector('.facet-count');
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'facet-count';
+            label.appendChild(badge);
+        }
+        badge.textContent = ' (' + (counts[input.value] || 0) + ')';
+    });
+
+    form.querySelectorAll('select[name]').forEach(function(select) {
+        const counts = facets[facetNameFor(form, select.name)];
+        if (!counts) {
+            return;
+        }
+        Array.from(select.options).forEach(function(option) {
+            if (!option.value) {
+                return;
+            }
+            if (option.dataset.label === undefined) {
+                option.dataset.label = option.textContent.trim();
+            }
+            option.textContent = option.dataset.label + ' (' + (counts[option.value] || 0) + ')';
+        });
+    });
+}
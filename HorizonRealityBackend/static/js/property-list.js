@@ -4,29 +4,34 @@ document.addEventListener('DOMContentLoaded', function() {
   // Initialize favorites functionality
   initFavorites();
   
-  function initFavorites() {
-    const favoriteButtons = document.querySelectorAll('.favorite-btn');
-    
-    // Check the status of each property and update UI accordingly
+  function initFavorites(root = document) {
+    const favoriteButtons = Array.from(root.querySelectorAll('.favorite-btn'));
     favoriteButtons.forEach(button => {
-        const propertyId = button.dataset.propertyId;
-        
-        // Only check status if user is logged in
-        if (isUserLoggedIn()) {
-            // Check if property is in favorites
-            fetch(`/favorite-status/${propertyId}/`)
-                .then(response => response.json())
-                .then(data => {
-                    updateFavoriteButtonState(button, data.is_favorite);
-                })
-                .catch(error => {
-                    console.error('Error checking favorite status:', error);
-                });
-        }
-        
-        // Add click event listener
         button.addEventListener('click', handleFavoriteClick);
     });
+
+    // Favorite states come from one session_state call (static/js/session-state.js):
+    // the page's own call for the initial cards, one more per page of cards added later.
+    if (root === document) {
+        document.addEventListener('sessionstate', event => {
+            if (event.detail.root === document) {
+                showFavoriteStates(favoriteButtons, event.detail.state);
+            }
+        });
+    } else if (window.loadSessionState) {
+        window.loadSessionState(root)
+            .then(state => showFavoriteStates(favoriteButtons, state))
+            .catch(error => {
+                console.error('Error checking favorite status:', error);
+            });
+    }
+  }
+
+  function showFavoriteStates(buttons, state) {
+    const favorites = new Set(state.favorites.map(String));
+    buttons.forEach(button => {
+        updateFavoriteButtonState(button, favorites.has(button.dataset.propertyId));
+    });
   }
 
   // Function to update favorite button state consistently
@@ -151,19 +156,6 @@ document.addEventListener('DOMContentLoaded', function() {
     if (section) section.appendChild(noResults);
   }
 
-  // Function to check if user is logged in
-  function isUserLoggedIn() {
-    // Check for a specific element that only exists when logged in
-    const authStatusElement = document.getElementById('user-authenticated');
-    if (authStatusElement) {
-        return authStatusElement.value === 'True';
-    }
-    
-    // Or check if a specific user element exists (like a profile dropdown)
-    const userProfileElement = document.querySelector('.user-profile-dropdown');
-    return !!userProfileElement;
-  }
-
   // Function to show toast notification
   function showToast(message, type = 'success') {
     // Create toast container if it doesn't exist
@@ -588,6 +580,60 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   }
   
+  // Cursor pagination: append the next page of cards instead of reloading
+  initInfiniteScroll();
+
+  function initInfiniteScroll() {
+    const loadMoreButton = document.querySelector('.load-more-btn');
+    const grid = document.querySelector('.property-grid');
+    if (!loadMoreButton || !grid) return;
+
+    let loading = false;
+
+    function loadNextPage(event) {
+      if (event) event.preventDefault();
+      const cursor = loadMoreButton.dataset.nextCursor;
+      if (loading || !cursor) return;
+      loading = true;
+
+      const params = new URLSearchParams(window.location.search);
+      params.set('cursor', cursor);
+
+      fetch(`${loadMoreButton.dataset.feedUrl}?${params.toString()}`)
+        .then(response => response.json())
+        .then(data => {
+          const page = document.createElement('div');
+          page.innerHTML = data.html;
+          initFavorites(page);
+          grid.append(...page.children);
+
+          if (data.has_next) {
+            loadMoreButton.dataset.nextCursor = data.next_cursor;
+            params.set('cursor', data.next_cursor);
+            loadMoreButton.href = `?${params.toString()}`;
+          } else {
+            observer.disconnect();
+            loadMoreButton.remove();
+          }
+        })
+        .catch(error => {
+          console.error('Error loading more properties:', error);
+        })
+        .finally(() => {
+          loading = false;
+        });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+      if (entries.some(entry => entry.isIntersecting)) {
+        loadNextPage();
+      }
+    }, { rootMargin: '400px' });
+
+    loadMoreButton.addEventListener('click', loadNextPage);
+    observer.observe(loadMoreButton);
+  }
+
   // Handle parallax effect on scroll
   window.addEventListener('scroll', function() {
     const heroSection = document.querySelector('.hero-section');
@@ -0,0 +1,34 @@
+// "Save this search" buttons on the search result pages.
+// Buttons opt in with data-save-search-url and data-scope attributes; the current
+// query string is saved, and new listings matching it are emailed to the user.
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-save-search-url]').forEach(function(button) {
+        button.addEventListener('click', function() {
+            const body = new URLSearchParams();
+            body.set('scope', button.dataset.scope || 'residential');
+            body.set('query', window.location.search.replace(/^\?/, ''));
+            button.disabled = true;
+            fetch(button.dataset.saveSearchUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'X-CSRFToken': saveSearchCsrfToken()
+                },
+                body: body
+            })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                button.textContent = data.success ? data.message : (data.error || 'Could not save this search');
+            })
+            .catch(function() {
+                button.disabled = false;
+                button.textContent = 'Could not save this search, try again';
+            });
+        });
+    });
+});
+
+function saveSearchCsrfToken() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
@@ -0,0 +1,56 @@
+// Per-user parts of pages served from the full-page cache (home.page_cache).
+// Cached pages are the same for everyone, so one call to the session_state view
+// fills in the navigation user menu, the CSRF token of forms and favorite hearts.
+// Scripts adding property cards later call window.loadSessionState(root) and listen
+// for the "sessionstate" event, whose detail is {state, root}.
+(function() {
+    const url = document.currentScript.dataset.url;
+
+    window.loadSessionState = function(root) {
+        root = root || document;
+        const ids = Array.from(root.querySelectorAll('.favorite-btn[data-property-id]'))
+            .map(function(button) { return button.dataset.propertyId; });
+        return fetch(url + (ids.length ? '?favorites=' + ids.join(',') : ''), {credentials: 'same-origin'})
+            .then(function(response) { return response.json(); })
+            .then(function(state) {
+                document.dispatchEvent(new CustomEvent('sessionstate', {detail: {state: state, root: root}}));
+                return state;
+            });
+    };
+
+    function showUserMenu(nav, state) {
+        const template = document.getElementById('session-nav-user');
+        if (!state.authenticated || !template) {
+            return;
+        }
+        const menu = template.content.cloneNode(true);
+        menu.querySelectorAll('[data-session-name]').forEach(function(element) {
+            element.textContent = state.name;
+        });
+        nav.replaceChildren(menu);
+    }
+
+    function fillCsrfTokens(state) {
+        document.querySelectorAll('[data-session-csrf]').forEach(function(input) {
+            input.value = state.csrf_token;
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const nav = document.getElementById('session-nav');
+        // Pages rendered per user only need the call for their favorite hearts.
+        if (!nav && !document.querySelector('.favorite-btn[data-property-id]')) {
+            return;
+        }
+        window.loadSessionState(document)
+            .then(function(state) {
+                if (nav) {
+                    showUserMenu(nav, state);
+                }
+                fillCsrfTokens(state);
+            })
+            .catch(function(error) {
+                console.error('Error loading session state:', error);
+            });
+    });
+})();
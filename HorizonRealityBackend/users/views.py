@@ -1,7 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import ContactForm,UserRegistrationForm, LoginForm, UpdateProfileForm
 from django.contrib import messages
-from .models import ContactSubmission, CustomUser, ContactInformation, Newsletter
+from .models import ContactSubmission, CustomUser, Newsletter
+from home.site_content import get_site_content
 from django.contrib.auth import login, authenticate, logout
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
@@ -174,9 +175,7 @@ def contact_us_view(request):
     - On GET: Shows the contact form with dynamic contact information.
     - On POST: Validates and saves the form submission and gives feedback.
     '''
-    contact_info = ContactInformation.objects.filter(is_main_office=True).first()
-    if not contact_info:
-        contact_info = ContactInformation.objects.first()
+    contact_info = get_site_content().contact_info
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():